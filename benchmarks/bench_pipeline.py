@@ -0,0 +1,377 @@
+"""
+Offline benchmark of the streaming dictation pipeline.
+
+Replays a WAV file (or synthetic speech-like audio) through
+``StreamingAudioCapture.get_callback`` from a fake sounddevice stream, at
+real time or faster, and transcribes the phrases the way the CLI's stream
+worker does. The VAD and the transcriber can be replaced by stubs so each
+stage can be measured on its own on a CPU-only machine.
+
+Usage:
+    python benchmarks/bench_pipeline.py --speed 10 --output results.json
+    python benchmarks/bench_pipeline.py --baseline benchmarks/baselines/cpu_stub.json
+    python benchmarks/bench_pipeline.py --wav recording.wav --speed 1 --vad silero --transcriber whisper
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import threading
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+import numpy as np
+
+from vibevoice.audio_capture import StreamingAudioCapture
+from vibevoice.telemetry import telemetry, trace_of
+from vibevoice.transcriber import StreamingTranscriber
+
+SAMPLE_RATE = 16000
+BLOCK_SIZE = 512
+
+# Callback duration histogram bucket upper bounds (microseconds)
+CALLBACK_BUCKETS_US = (10, 20, 50, 100, 200, 500, 1000, 5000)
+
+# Metrics compared against a baseline (all lower-is-better), with the
+# multiple of --tolerance each may regress by: tail percentiles of a few
+# hundred samples move a lot between runs even as medians over runs
+REGRESSION_METRICS = {
+    "wall_rtf": 1,
+    "emit_to_text_p50_ms": 1,
+    "emit_to_text_p99_ms": 4,
+    "callback_p50_us": 1,
+    "callback_p99_us": 4,
+    "peak_traced_mb": 1,
+}
+
+# Run settings a baseline is only comparable under
+BASELINE_SETTINGS = ("input", "audio_s", "speed", "vad", "transcriber", "stub_costs_ms")
+
+
+def synthesize(seconds: float, seed: int = 0) -> np.ndarray:
+    """
+    Speech-like test signal: 1-4 s bursts of modulated harmonics separated by 0.5-1.5 s pauses.
+
+    Returns:
+        float32 mono audio at 16kHz
+    """
+    rng = np.random.default_rng(seed)
+    audio = (rng.standard_normal(int(seconds * SAMPLE_RATE)) * 0.002).astype(np.float32)
+    pos = int(0.5 * SAMPLE_RATE)
+    while pos < len(audio):
+        length = int(rng.uniform(1.0, 4.0) * SAMPLE_RATE)
+        t = np.arange(min(length, len(audio) - pos)) / SAMPLE_RATE
+        f0 = rng.uniform(100, 220)
+        voice = sum(np.sin(2 * np.pi * f0 * k * t) / k for k in range(1, 5))
+        envelope = 0.5 + 0.5 * np.sin(2 * np.pi * 4 * t)  # Syllable rate
+        audio[pos:pos + len(t)] += (0.2 * voice * envelope).astype(np.float32)
+        pos += length + int(rng.uniform(0.5, 1.5) * SAMPLE_RATE)
+    return audio
+
+
+def load_wav(path: str) -> np.ndarray:
+    """Read a WAV file as 16kHz mono float32."""
+    from vibevoice.audio_io import open_audio
+    return np.concatenate(list(open_audio(path).blocks()))
+
+
+class StubVAD:
+    """Energy-based stand-in for SileroVAD, driving the real StreamingVAD state machine."""
+
+    def __init__(self, threshold: float = 0.5, min_silence_ms: int = 400):
+        self.threshold = threshold
+        self.min_silence_ms = min_silence_ms
+
+    def speech_probability(self, chunk: np.ndarray, sample_rate: int = SAMPLE_RATE) -> float:
+        return min(1.0, float(np.sqrt(np.mean(chunk * chunk))) * 20)
+
+    def reset_states(self):
+        pass
+
+    def stream(self, speech_pad_ms: int = 30):
+        from vibevoice.vad import StreamingVAD
+        return StreamingVAD(self, speech_pad_ms=speech_pad_ms)
+
+
+class StubTranscriber:
+    """Stand-in for StreamingTranscriber with a fixed cost plus a cost per second of audio."""
+
+    def __init__(self, base_ms: float = 20.0, per_second_ms: float = 10.0):
+        self.base_ms = base_ms
+        self.per_second_ms = per_second_ms
+
+    def transcribe(self, audio: np.ndarray) -> str:
+        return self.transcribe_batch([audio])[0]
+
+    def transcribe_batch(self, audios) -> list:
+        seconds = sum(len(audio) for audio in audios) / SAMPLE_RATE
+        time.sleep((self.base_ms + self.per_second_ms * seconds) / 1000)
+        return ["word " * max(1, int(len(audio) / SAMPLE_RATE * 2)) for audio in audios]
+
+
+class FakeInputStream:
+    """
+    Replays int16 audio to a sounddevice-style callback from a thread.
+
+    Blocks are delivered on a fixed schedule at ``speed`` times real time
+    (0 delivers them as fast as possible). The duration of every callback
+    call is recorded.
+    """
+
+    def __init__(self, audio: np.ndarray, callback, speed: float = 1.0, blocksize: int = BLOCK_SIZE):
+        self.audio = audio
+        self.callback = callback
+        self.speed = speed
+        self.blocksize = blocksize
+        n_blocks = -(-len(audio) // blocksize)
+        self.callback_durations = np.zeros(n_blocks, dtype=np.float64)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def join(self):
+        self._thread.join()
+
+    def _run(self):
+        block = np.zeros((self.blocksize, 1), dtype=np.int16)
+        start = time.perf_counter()
+        for i, pos in enumerate(range(0, len(self.audio), self.blocksize)):
+            if self.speed > 0:
+                delay = start + pos / SAMPLE_RATE / self.speed - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            chunk = self.audio[pos:pos + self.blocksize]
+            block[:len(chunk), 0] = chunk
+            block[len(chunk):, 0] = 0
+            t0 = time.perf_counter()
+            self.callback(block, self.blocksize, None, None)
+            self.callback_durations[i] = time.perf_counter() - t0
+
+
+def percentile_ms(values, q):
+    return float(np.percentile(values, q) * 1000) if len(values) else None
+
+
+def run(audio: np.ndarray, speed: float, vad: str, transcriber, batch_size: int = 4, trace_memory: bool = False) -> dict:
+    """
+    Replay ``audio`` through capture, segmentation and transcription.
+
+    Args:
+        trace_memory: Measure peak allocations with tracemalloc (slows every
+            allocation, so timings from such a pass are not representative)
+
+    Returns:
+        Benchmark results (``peak_traced_mb`` is None without ``trace_memory``)
+    """
+    vad_factory = StubVAD if vad == "stub" else None
+    capture = StreamingAudioCapture(sample_rate=SAMPLE_RATE, channels=1, vad_factory=vad_factory)
+    records = []
+
+    def deliver(phrase, decode_s):
+        trace = trace_of(phrase)
+        if trace is not None:
+            trace.decode_s = decode_s
+            trace.typing_s = 0.0
+            record = trace.to_dict()
+            telemetry.finish_phrase(trace)
+            records.append(record)
+
+    def worker():
+        while True:
+            phrases = capture.get_phrase_batch(batch_size, 0.02)
+            if phrases is None:
+                break
+            start = time.perf_counter()
+            transcriber.transcribe_batch([StreamingTranscriber.normalize_audio(p) for p in phrases])
+            decode_s = time.perf_counter() - start
+            for phrase in phrases:
+                deliver(phrase, decode_s)
+
+    # The real stream delivers int16; quantize before tracing allocations
+    pcm = np.clip(np.round(audio * 32768), -32768, 32767).astype(np.int16)
+
+    if trace_memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+    capture.start_recording()
+    worker_thread = threading.Thread(target=worker, daemon=True)
+    worker_thread.start()
+
+    stream = FakeInputStream(pcm, capture.get_callback(), speed=speed)
+    stream.start()
+    stream.join()
+
+    tail = capture.stop_recording()
+    worker_thread.join()
+    if len(tail) > 1000:
+        start = time.perf_counter()
+        transcriber.transcribe(StreamingTranscriber.normalize_audio(tail))
+        deliver(tail, time.perf_counter() - start)
+    wall = time.perf_counter() - started
+    peak_traced = None
+    if trace_memory:
+        _, peak_traced = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    durations_us = stream.callback_durations * 1e6
+    histogram = {}
+    lower = 0
+    for bound in CALLBACK_BUCKETS_US:
+        histogram[f"<={bound}us"] = int(np.count_nonzero((durations_us > lower) & (durations_us <= bound)))
+        lower = bound
+    histogram[f">{CALLBACK_BUCKETS_US[-1]}us"] = int(np.count_nonzero(durations_us > lower))
+
+    emit_to_text = [r["queue_wait_s"] + r["decode_s"] for r in records if r["queue_wait_s"] is not None]
+    speech_end_to_text = [r["speech_end_to_text_s"] for r in records]
+    audio_s = len(audio) / SAMPLE_RATE
+    decode_total = sum(r["decode_s"] for r in records)
+
+    import resource
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    max_rss_mb = max_rss / (1024 * 1024) if sys.platform == "darwin" else max_rss / 1024
+
+    return {
+        "audio_s": audio_s,
+        "speed": speed,
+        "vad": vad,
+        "transcriber": type(transcriber).__name__,
+        "phrases": len(records),
+        "wall_s": wall,
+        # Processing time over audio time; at speed 1 this cannot go below ~1
+        "wall_rtf": wall / audio_s,
+        "decode_rtf": decode_total / audio_s,
+        "emit_to_text_p50_ms": percentile_ms(emit_to_text, 50),
+        "emit_to_text_p90_ms": percentile_ms(emit_to_text, 90),
+        "emit_to_text_p99_ms": percentile_ms(emit_to_text, 99),
+        # Assumes real-time capture, so only meaningful at --speed 1
+        "speech_end_to_text_p50_ms": percentile_ms(speech_end_to_text, 50),
+        "speech_end_to_text_p99_ms": percentile_ms(speech_end_to_text, 99),
+        "vad_ms_per_phrase": float(np.mean([r["vad_s"] for r in records]) * 1000) if records else None,
+        "callback_p50_us": float(np.percentile(durations_us, 50)),
+        "callback_p99_us": float(np.percentile(durations_us, 99)),
+        "callback_max_us": float(durations_us.max()),
+        "callback_histogram": histogram,
+        "segmenter": capture.get_stats(),
+        "peak_traced_mb": peak_traced / (1024 * 1024) if peak_traced is not None else None,
+        "max_rss_mb": max_rss_mb,
+        "machine": {"platform": platform.platform(), "python": platform.python_version(), "cpus": os.cpu_count()},
+    }
+
+
+def measure(audio: np.ndarray, speed: float, vad: str, transcriber, runs: int = 3) -> dict:
+    """
+    Run ``runs`` timing passes without tracemalloc and one memory pass with it.
+
+    Returns:
+        Results of the first timing pass with every float metric replaced by
+        its median over the timing passes, and peak memory from the memory pass
+    """
+    passes = [run(audio, speed, vad, transcriber) for _ in range(runs)]
+    traced = run(audio, speed, vad, transcriber, trace_memory=True)
+
+    results = dict(passes[0], runs=runs)
+    for name, value in passes[0].items():
+        if name in BASELINE_SETTINGS or not isinstance(value, float):
+            continue
+        values = [p[name] for p in passes if p[name] is not None]
+        results[name] = float(np.median(values)) if values else None
+    results["peak_traced_mb"] = traced["peak_traced_mb"]
+    results["max_rss_mb"] = traced["max_rss_mb"]
+    return results
+
+
+def settings_mismatch(results: dict, baseline: dict) -> list:
+    """
+    List run settings that differ from the baseline's (a setting missing from the baseline differs too).
+    """
+    return [
+        f"{name}: {results.get(name)!r} vs baseline {baseline.get(name)!r}"
+        for name in BASELINE_SETTINGS
+        if results.get(name) != baseline.get(name)
+    ]
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """
+    List metrics that regressed by more than ``tolerance`` (relative, scaled per metric) against the baseline.
+    """
+    regressions = []
+    for metric, scale in REGRESSION_METRICS.items():
+        old, new = baseline.get(metric), results.get(metric)
+        if old is None or new is None:
+            continue
+        if new > old * (1 + tolerance * scale):
+            regressions.append(f"{metric}: {new:.3f} vs baseline {old:.3f} (+{(new / old - 1) * 100:.0f}%)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the streaming pipeline offline")
+    parser.add_argument("--wav", help="Audio file to replay (default: synthetic speech-like audio)")
+    parser.add_argument("--seconds", type=float, default=60.0, help="Length of the synthetic audio (default: 60)")
+    parser.add_argument("--speed", type=float, default=10.0, help="Replay speed, 1 = real time, 0 = unthrottled (default: 10)")
+    parser.add_argument("--vad", choices=("stub", "silero"), default="stub")
+    parser.add_argument("--transcriber", choices=("stub", "whisper"), default="stub")
+    parser.add_argument("--stub-base-ms", type=float, default=20.0, help="Stub decode cost per call (default: 20)")
+    parser.add_argument("--stub-per-second-ms", type=float, default=10.0, help="Stub decode cost per audio second (default: 10)")
+    parser.add_argument("--output", help="Write results as JSON (use as a new baseline)")
+    parser.add_argument("--baseline", help="Baseline JSON to compare against")
+    parser.add_argument("--runs", type=int, default=3, help="Timing passes whose medians are reported (default: 3)")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed relative regression, 4x for p99 metrics (default: 0.25)")
+    parser.add_argument("--ignore-settings", action="store_true",
+                        help="Compare against a baseline recorded with other settings (warn instead of exiting 2)")
+    args = parser.parse_args()
+
+    audio = load_wav(args.wav) if args.wav else synthesize(args.seconds)
+
+    if args.transcriber == "stub":
+        transcriber = StubTranscriber(args.stub_base_ms, args.stub_per_second_ms)
+    else:
+        from vibevoice.backends import backend_options_from_env
+        transcriber = StreamingTranscriber(
+            model_size=os.environ.get("WHISPER_MODEL", "small"),
+            language=os.environ.get("WHISPER_LANGUAGE", None),
+            backend=os.environ.get("WHISPER_BACKEND") or None,
+            backend_options=backend_options_from_env(),
+        )
+
+    results = {
+        "input": os.path.basename(args.wav) if args.wav else "synthetic",
+        "stub_costs_ms": [args.stub_base_ms, args.stub_per_second_ms] if args.transcriber == "stub" else None,
+        **measure(audio, args.speed, args.vad, transcriber, args.runs),
+    }
+    print(json.dumps(results, indent=2))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+            f.write("\n")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        mismatches = settings_mismatch(results, baseline)
+        if mismatches:
+            print("Baseline was recorded with different settings:")
+            for line in mismatches:
+                print(f"  {line}")
+            if not args.ignore_settings:
+                print("Rerun with the baseline's settings, or pass --ignore-settings to compare anyway.")
+                sys.exit(2)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print("Regressions against baseline:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print("No regressions against baseline.")
+
+
+if __name__ == "__main__":
+    main()
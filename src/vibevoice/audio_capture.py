@@ -1,39 +1,221 @@
 """Audio capture module for real-time streaming speech-to-text with VAD."""
 
 import numpy as np
-import sounddevice as sd
-from typing import Callable, Optional, List
+import os
+from typing import Callable, Dict, Optional, List, Union
 import threading
 import time
-from queue import Queue
+from queue import Queue, Empty
+
+from vibevoice.audio_io import StreamResampler
+from vibevoice.ring_buffer import AudioRingBuffer
+from vibevoice.segmenter import PhraseSegmenter
+from vibevoice.telemetry import trace_of
+
+# Sample format from PortAudio to the model boundary; converted to float32 only
+# once, by StreamingTranscriber.normalize_audio
+SAMPLE_DTYPE = np.int16
+
+# Samples per callback block at 16kHz: one StreamingVAD frame
+DEFAULT_BLOCKSIZE = 512
+
+# Native-rate audio held until the segmenter worker has resampled it
+CAPTURE_BUFFER_SECONDS = 10.0
+
+
+def device_sample_rate(device: Optional[Union[int, str]] = None) -> int:
+    """
+    Native sample rate of an input device.
+
+    Args:
+        device: Device index or name substring (None for the default input)
+
+    Returns:
+        Default sample rate reported by PortAudio in Hz
+    """
+    import sounddevice as sd
+
+    return int(sd.query_devices(device, "input")["default_samplerate"])
+
+
+class CallbackTimer:
+    """
+    Wraps a stream callback to record when it is called and how long it runs.
+
+    Timestamps go into preallocated arrays, so timing adds no allocation to
+    the callback. Used by ``callback_self_test``.
+    """
+
+    def __init__(self, callback: Callable, capacity: int = 65536):
+        self.callback = callback
+        self.arrivals = np.zeros(capacity)
+        self.durations = np.zeros(capacity)
+        self.count = 0
+        self.overflows = 0
+
+    def __call__(self, indata, frames, time_info, status):
+        start = time.perf_counter()
+        self.callback(indata, frames, time_info, status)
+        if status and status.input_overflow:
+            self.overflows += 1
+        if self.count < len(self.arrivals):
+            self.arrivals[self.count] = start
+            self.durations[self.count] = time.perf_counter() - start
+            self.count += 1
+
+    def report(self, expected_interval: float) -> Dict[str, float]:
+        """
+        Summarize the recorded calls.
+
+        Args:
+            expected_interval: Block duration in seconds (blocksize / stream rate, 0 if variable)
+
+        Returns:
+            Dict of call count, overflows, interval jitter and callback duration statistics (ms)
+        """
+        durations = self.durations[:self.count] * 1000
+        intervals = np.diff(self.arrivals[:self.count]) * 1000
+        if expected_interval <= 0 and len(intervals):
+            expected_interval = float(np.median(intervals)) / 1000  # PortAudio chose the block size
+        jitter = np.abs(intervals - expected_interval * 1000) if len(intervals) else np.zeros(1)
+        return {
+            "calls": self.count,
+            "overflows": self.overflows,
+            "interval_ms": expected_interval * 1000,
+            "jitter_p50_ms": float(np.percentile(jitter, 50)),
+            "jitter_p99_ms": float(np.percentile(jitter, 99)),
+            "jitter_max_ms": float(jitter.max()),
+            "callback_p50_ms": float(np.percentile(durations, 50)) if self.count else 0.0,
+            "callback_p99_ms": float(np.percentile(durations, 99)) if self.count else 0.0,
+            "callback_max_ms": float(durations.max()) if self.count else 0.0,
+        }
+
+
+def _parse_latency(value: Union[str, float]) -> Union[str, float]:
+    """PortAudio latency: "low", "high" or seconds."""
+    try:
+        return float(value)
+    except ValueError:
+        return value
+
+
+def create_input_stream(
+    callback: Callable,
+    sample_rate: int = 16000,
+    channels: int = 1,
+    blocksize: Optional[int] = None,
+    latency: Optional[Union[str, float]] = None,
+    device: Optional[Union[int, str]] = None,
+    capture_rate: Optional[Union[str, int]] = None,
+    timer: Optional[Callable[[Callable], Callable]] = None,
+):
+    """
+    Open an int16 sounddevice input stream for ``sample_rate`` audio.
+
+    Unset arguments come from VIBEVOICE_BLOCKSIZE, VIBEVOICE_LATENCY,
+    VIBEVOICE_AUDIO_DEVICE and VIBEVOICE_CAPTURE_RATE. By default a mono
+    stream runs at the device's native rate instead of relying on the host
+    API's resampler (or failing on devices without 16kHz support); the
+    callback receives native-rate blocks and the capture classes resample
+    them off the callback thread (see their ``create_stream``). The device
+    block size is scaled so each callback still covers ``blocksize``
+    samples at ``sample_rate``.
+
+    Args:
+        callback: sounddevice-style callback
+        sample_rate: Rate the audio is wanted at in Hz
+        channels: Number of channels (resampling applies to mono streams)
+        blocksize: Samples per callback at ``sample_rate`` (default: 512, one VAD frame; 0 lets PortAudio choose)
+        latency: PortAudio latency, "low", "high" or seconds, as a number or string (default: "low")
+        device: Input device index or name substring, digits meaning an index (default: system default)
+        capture_rate: "native" or a rate in Hz to run the device at (default: "native")
+        timer: Wrapper applied to the outermost callback, e.g. CallbackTimer
+
+    Returns:
+        sounddevice.InputStream (not started)
+    """
+    # Imported here so the module loads without PortAudio (tests, batch mode)
+    import sounddevice as sd
+
+    if blocksize is None:
+        blocksize = int(os.environ.get("VIBEVOICE_BLOCKSIZE", str(DEFAULT_BLOCKSIZE)))
+    latency = _parse_latency(latency if latency is not None else os.environ.get("VIBEVOICE_LATENCY", "low"))
+    if device is None:
+        device = os.environ.get("VIBEVOICE_AUDIO_DEVICE") or None
+    if isinstance(device, str) and device.isdigit():
+        device = int(device)
+    if capture_rate is None:
+        capture_rate = os.environ.get("VIBEVOICE_CAPTURE_RATE", "native")
+    capture_rate = device_sample_rate(device) if capture_rate == "native" else int(capture_rate)
+
+    stream_rate = sample_rate
+    if capture_rate != sample_rate and channels == 1:
+        stream_rate = capture_rate
+        blocksize = round(blocksize * capture_rate / sample_rate)
+    if timer is not None:
+        callback = timer(callback)
+
+    return sd.InputStream(
+        callback=callback,
+        channels=channels,
+        samplerate=stream_rate,
+        dtype="int16",
+        blocksize=blocksize,
+        latency=latency,
+        device=device,
+    )
 
 
 class AudioCapture:
     """Captures audio from microphone for batch transcription."""
 
-    def __init__(self, sample_rate: int = 16000, channels: int = 1):
-        """Initialize audio capture."""
+    def __init__(self, sample_rate: int = 16000, channels: int = 1, max_seconds: float = 600.0):
+        """
+        Initialize audio capture.
+
+        Args:
+            sample_rate: Sample rate in Hz (default 16000 for Whisper)
+            channels: Number of audio channels (default 1 for mono)
+            max_seconds: Capacity of the preallocated audio buffer in seconds
+        """
         self.sample_rate = sample_rate
         self.channels = channels
+        self.max_seconds = max_seconds
+        self.capture_rate = sample_rate
         self.recording = False
-        self.audio_buffer = []
+        self.audio_buffer = AudioRingBuffer(int(sample_rate * max_seconds), channels=channels, dtype=SAMPLE_DTYPE)
         self.lock = threading.Lock()
 
+    def set_capture_rate(self, capture_rate: int):
+        """
+        Record at the device rate; ``stop_recording`` resamples to ``sample_rate``.
+
+        Args:
+            capture_rate: Rate the stream runs at in Hz
+        """
+        if capture_rate == self.capture_rate or self.channels != 1:
+            return
+        self.capture_rate = capture_rate
+        self.audio_buffer = AudioRingBuffer(int(capture_rate * self.max_seconds), dtype=SAMPLE_DTYPE)
+
     def start_recording(self):
         """Start recording audio."""
         with self.lock:
+            self.audio_buffer.reset()
             self.recording = True
-            self.audio_buffer = []
 
     def stop_recording(self) -> np.ndarray:
-        """Stop recording and return captured audio."""
+        """Stop recording and return captured audio at ``sample_rate``."""
         with self.lock:
             self.recording = False
-            if self.audio_buffer:
-                audio_data = np.concatenate(self.audio_buffer, axis=0)
-                audio_int16 = (audio_data * np.iinfo(np.int16).max).astype(np.int16)
-                return audio_int16
-            return np.array([], dtype=np.int16)
+            audio = self.audio_buffer.read(self.audio_buffer.oldest_pos, copy=True)
+        if self.capture_rate == self.sample_rate:
+            return audio
+        resampler = StreamResampler(self.capture_rate, self.sample_rate)
+        out = np.concatenate((resampler.process(audio), resampler.flush()))
+        np.rint(out, out=out)
+        np.clip(out, -32768, 32767, out=out)
+        return out.astype(SAMPLE_DTYPE)
 
     def get_callback(self):
         """Get the callback function for sounddevice InputStream."""
@@ -41,33 +223,49 @@ class AudioCapture:
         def callback(indata, frames, time, status):
             if status:
                 print(f"Audio callback status: {status}")
-            with self.lock:
-                if self.recording:
-                    self.audio_buffer.append(indata.copy())
+            if self.recording:
+                self.audio_buffer.write(indata)
 
         return callback
 
-    @staticmethod
-    def create_stream(callback, sample_rate: int = 16000, channels: int = 1):
-        """Create a sounddevice input stream."""
-        return sd.InputStream(
-            callback=callback,
-            channels=channels,
-            samplerate=sample_rate,
-        )
+    def create_stream(self, callback, sample_rate: int = 16000, channels: int = 1, **stream_options):
+        """
+        Create an int16 sounddevice input stream and record at its rate.
+
+        Args:
+            callback: Stream callback (see ``get_callback``)
+            sample_rate: Rate the audio is wanted at in Hz
+            channels: Number of channels
+            **stream_options: blocksize, latency, device, capture_rate, timer (see ``create_input_stream``)
+        """
+        stream = create_input_stream(callback, sample_rate, channels, **stream_options)
+        self.set_capture_rate(int(stream.samplerate))
+        return stream
 
 
 class StreamingAudioCapture:
     """
     Captures audio with VAD-based phrase detection for real-time streaming.
     Emits phrases as they are detected during recording.
+
+    The audio callback only copies samples into the ring buffer; resampling
+    from the device rate, silence detection and VAD run on a PhraseSegmenter
+    worker. Samples stay int16 from the stream to the phrase queue.
+    Consumers block on ``get_phrase``/``get_phrase_batch`` and receive
+    END_OF_RECORDING once ``stop_recording`` has flushed the last phrase.
     """
 
+    # Queued after the last phrase of a recording
+    END_OF_RECORDING = object()
+
     def __init__(
         self,
         sample_rate: int = 16000,
         channels: int = 1,
         chunk_size: int = 512,
+        max_seconds: float = 600.0,
+        queue_size: int = 256,
+        vad_factory: Optional[Callable] = None,
     ):
         """
         Initialize streaming audio capture.
@@ -76,64 +274,123 @@ class StreamingAudioCapture:
             sample_rate: Sample rate in Hz (default 16000 for Whisper)
             channels: Number of audio channels (default 1 for mono)
             chunk_size: Audio chunk size in samples (default 512 = ~32ms)
+            max_seconds: Capacity of the preallocated audio buffer in seconds
+            queue_size: Capacity of the callback-to-segmenter queue (in blocks)
+            vad_factory: Callable returning a SileroVAD-like object (default: SileroVAD)
         """
         self.sample_rate = sample_rate
         self.channels = channels
         self.chunk_size = chunk_size
 
         self.recording = False
-        self.audio_buffer = []
-        self.last_transcribed_pos = 0
-        self.silence_chunks = 0
-        self._vad = None  # Lazy-loaded VAD instance
+        self.audio_buffer = AudioRingBuffer(int(sample_rate * max_seconds), channels=channels, dtype=SAMPLE_DTYPE)
+        # Written by the callback; a separate native-rate ring once set_capture_rate is called
+        self.capture_buffer = self.audio_buffer
 
         self.lock = threading.Lock()
         self.phrase_queue = Queue()
+        self._ended = False
+        self.segmenter = PhraseSegmenter(
+            self.audio_buffer,
+            self.phrase_queue,
+            sample_rate=sample_rate,
+            queue_size=queue_size,
+            vad_factory=vad_factory,
+        )
+
+    def set_capture_rate(self, capture_rate: int):
+        """
+        Capture at the device rate into a native-rate ring buffer.
+
+        The segmenter worker resamples it into ``audio_buffer``. Call while
+        not recording.
+
+        Args:
+            capture_rate: Rate the stream runs at in Hz
+        """
+        if capture_rate == self.segmenter.capture_rate or self.channels != 1:
+            return
+        if capture_rate == self.sample_rate:
+            self.capture_buffer = self.audio_buffer
+        else:
+            self.capture_buffer = AudioRingBuffer(int(capture_rate * CAPTURE_BUFFER_SECONDS), dtype=SAMPLE_DTYPE)
+        self.segmenter.set_capture_buffer(self.capture_buffer, capture_rate)
+
+    @property
+    def last_transcribed_pos(self) -> int:
+        """Absolute sample position up to which audio has been handed out."""
+        return self.segmenter.last_transcribed_pos
+
+    @last_transcribed_pos.setter
+    def last_transcribed_pos(self, value: int):
+        self.segmenter.last_transcribed_pos = value
 
     def start_recording(self):
         """Start recording audio."""
         with self.lock:
+            self.audio_buffer.reset()
+            self.capture_buffer.reset()
+            self.segmenter.reset()
+            self.segmenter.start()
+            # Drop anything left over from the previous recording
+            while True:
+                try:
+                    self.phrase_queue.get_nowait()
+                except Empty:
+                    break
+            self._ended = False
             self.recording = True
-            self.audio_buffer = []
-            self.last_transcribed_pos = 0
-            self.silence_chunks = 0
 
     def stop_recording(self) -> np.ndarray:
         """
-        Stop recording and return all remaining audio.
+        Stop recording and return the audio that has not been handed out yet.
+
+        Phrases already closed by the segmenter are queued before
+        END_OF_RECORDING, so a consumer sees every phrase and then the end.
+        The in-flight phrase (speech still open when recording stopped) is
+        returned instead of the whole recording, so the final pass only
+        decodes the last utterance.
 
         Returns:
-            Audio data as numpy array (int16)
+            Audio data after ``last_transcribed_pos`` as numpy array (int16)
         """
         with self.lock:
             self.recording = False
-            if self.audio_buffer:
-                audio_data = np.concatenate(self.audio_buffer, axis=0)
-                audio_int16 = (audio_data * np.iinfo(np.int16).max).astype(np.int16)
-                return audio_int16
-            return np.array([], dtype=np.int16)
+            self.segmenter.drain()
+            self.phrase_queue.put(self.END_OF_RECORDING)
+            return self.segmenter.take_tail()
 
     def get_current_phrase(self) -> Optional[np.ndarray]:
         """
         Get new audio since last transcription (for streaming).
 
         Returns:
-            New audio segment as numpy array, or None if no new audio
+            New audio segment as numpy array, or None if no new audio.
+            The segment is a view into the ring buffer whenever possible.
         """
         with self.lock:
-            if not self.audio_buffer:
+            end = self.audio_buffer.write_pos
+            start = max(self.last_transcribed_pos, self.audio_buffer.oldest_pos)
+            if start >= end:
                 return None
 
-            # Concatenate all audio
-            full_audio = np.concatenate(self.audio_buffer, axis=0)
+            new_audio = self.audio_buffer.read(start, end)
+            self.last_transcribed_pos = end
+            return new_audio
 
-            # Get audio from last transcribed position
-            if self.last_transcribed_pos < len(full_audio):
-                new_audio = full_audio[self.last_transcribed_pos:]
-                self.last_transcribed_pos = len(full_audio)
-                return new_audio
+    def get_open_phrase(self):
+        """
+        Get the speech segment that is still in progress (for partial results).
 
+        Returns:
+            Tuple of (absolute start position, audio so far as int16 array),
+            or None when no speech is in progress. The audio is a view into
+            the ring buffer whenever possible: use it before it is overwritten.
+        """
+        start = self.segmenter.speech_start
+        if start is None:
             return None
+        return start, self.audio_buffer.read(start)
 
     def mark_as_transcribed(self, samples: int):
         """
@@ -145,81 +402,185 @@ class StreamingAudioCapture:
         with self.lock:
             self.last_transcribed_pos += samples
 
-    def _get_vad(self):
+    def get_stats(self) -> dict:
         """
-        Lazy-load the Silero VAD instance.
+        Get segmenter counters (overruns, overflows, queue depth).
 
         Returns:
-            SileroVAD instance
+            Dict of counter name to value
         """
-        if self._vad is None:
-            from vibevoice.vad import SileroVAD
-            self._vad = SileroVAD()
-        return self._vad
+        return self.segmenter.stats()
 
     def get_callback(self):
         """Get the callback function for sounddevice InputStream."""
 
         def callback(indata, frames, time_info, status):
-            if status:
-                print(f"Audio callback status: {status}")
-
-            with self.lock:
-                if self.recording:
-                    self.audio_buffer.append(indata.copy())
-
-                    # Check for silence (simple energy-based detection)
-                    audio_energy = np.mean(np.abs(indata))
-                    if audio_energy < 0.01:  # Silence threshold
-                        self.silence_chunks += 1
-                    else:
-                        self.silence_chunks = 0
-
-                    # If enough silence, check for phrase to transcribe
-                    chunk_duration_ms = int(frames * 1000 / self.sample_rate)
-                    silence_ms = self.silence_chunks * chunk_duration_ms
-
-                    # Trigger phrase detection after ~400ms of silence
-                    if silence_ms >= 400:
-                        self.silence_chunks = 0
-                        new_audio = self.get_current_phrase()
-                        if new_audio is not None and len(new_audio) > 0:
-                            # Use VAD to verify speech before queuing
-                            try:
-                                vad = self._get_vad()
-                                if vad.has_speech(new_audio):
-                                    # Convert to int16 and queue
-                                    audio_int16 = (new_audio * np.iinfo(np.int16).max).astype(np.int16)
-                                    self.phrase_queue.put(audio_int16)
-                            except Exception as e:
-                                # Fallback: queue if VAD fails
-                                print(f"VAD error: {e}, using energy-based detection")
-                                audio_int16 = (new_audio * np.iinfo(np.int16).max).astype(np.int16)
-                                self.phrase_queue.put(audio_int16)
+            if self.recording:
+                self.capture_buffer.write(indata)
+                self.segmenter.submit(status)
 
         return callback
 
     def get_pending_phrases(self) -> List[np.ndarray]:
         """
-        Get all pending phrases from the queue.
+        Get all pending phrases from the queue without blocking.
 
         Returns:
             List of audio phrases ready for transcription
         """
         phrases = []
-        while not self.phrase_queue.empty():
+        while True:
             try:
                 phrase = self.phrase_queue.get_nowait()
-                phrases.append(phrase)
-            except:
+            except Empty:
+                break
+            if phrase is self.END_OF_RECORDING:
+                self._ended = True
                 break
+            phrases.append(self._dequeued(phrase))
         return phrases
 
+    def get_phrase(self, timeout: Optional[float] = None):
+        """
+        Block until the next phrase is segmented.
+
+        Args:
+            timeout: Maximum time to wait in seconds (None waits indefinitely)
+
+        Returns:
+            Audio phrase as numpy array (int16), or END_OF_RECORDING once the
+            recording has stopped and every phrase has been handed out
+
+        Raises:
+            queue.Empty: If no phrase arrived within ``timeout``
+        """
+        if self._ended:
+            return self.END_OF_RECORDING
+        phrase = self.phrase_queue.get(timeout=timeout)
+        if phrase is self.END_OF_RECORDING:
+            self._ended = True
+            return phrase
+        return self._dequeued(phrase)
+
     @staticmethod
-    def create_stream(callback, sample_rate: int = 16000, channels: int = 1):
-        """Create a sounddevice input stream."""
-        return sd.InputStream(
-            callback=callback,
-            channels=channels,
-            samplerate=sample_rate,
-        )
+    def _dequeued(phrase: np.ndarray) -> np.ndarray:
+        """Mark the end of the phrase's queue wait in its trace."""
+        trace = trace_of(phrase)
+        if trace is not None:
+            trace.dequeued_t = time.monotonic()
+        return phrase
+
+    def iter_phrases(self):
+        """
+        Yield phrases as they are segmented until the recording ends.
+
+        Yields:
+            Audio phrases as numpy arrays (int16)
+        """
+        while True:
+            phrase = self.get_phrase()
+            if phrase is self.END_OF_RECORDING:
+                return
+            yield phrase
+
+    def get_phrase_batch(
+        self,
+        max_batch_size: int = 4,
+        max_wait: float = 0.02,
+        timeout: Optional[float] = None,
+    ) -> Optional[List[np.ndarray]]:
+        """
+        Block for the next phrase, then take up to ``max_batch_size`` phrases.
+
+        Phrases already queued are added without waiting. Only when several
+        phrases are already in the batch does it stay open for up to
+        ``max_wait`` seconds to fill up, so a lone phrase never pays extra
+        latency.
+
+        Args:
+            max_batch_size: Maximum number of phrases in the batch
+            max_wait: Extra time to wait for more phrases once a batch has formed (s)
+            timeout: Maximum time to wait for the first phrase (None waits indefinitely)
+
+        Returns:
+            List of audio phrases in the order they were segmented (empty on
+            timeout), or None once the recording has ended
+        """
+        try:
+            first = self.get_phrase(timeout=timeout)
+        except Empty:
+            return []
+        if first is self.END_OF_RECORDING:
+            return None
+
+        batch = [first]
+        deadline = time.monotonic() + max_wait
+        while len(batch) < max_batch_size and not self._ended:
+            # Queued phrases join at once; waiting only starts with two or more
+            remaining = max(0.0, deadline - time.monotonic()) if len(batch) > 1 else 0.0
+            try:
+                phrase = self.get_phrase(timeout=remaining)
+            except Empty:
+                break
+            if phrase is self.END_OF_RECORDING:
+                break
+            batch.append(phrase)
+
+        return batch
+
+    def create_stream(self, callback, sample_rate: int = 16000, channels: int = 1, **stream_options):
+        """
+        Create an int16 sounddevice input stream covering ``chunk_size`` samples per callback.
+
+        The capture is switched to the stream's rate (see ``set_capture_rate``).
+
+        Args:
+            callback: Stream callback (see ``get_callback``)
+            sample_rate: Rate the audio is wanted at in Hz
+            channels: Number of channels
+            **stream_options: blocksize, latency, device, capture_rate (see ``create_input_stream``)
+        """
+        if "blocksize" not in stream_options and "VIBEVOICE_BLOCKSIZE" not in os.environ:
+            stream_options["blocksize"] = self.chunk_size
+        stream = create_input_stream(callback, sample_rate, channels, **stream_options)
+        self.set_capture_rate(int(stream.samplerate))
+        return stream
+
+
+def callback_self_test(seconds: float = 5.0, **stream_options) -> Dict[str, float]:
+    """
+    Record from the input device and measure callback timing.
+
+    The callback does the same work as during dictation (the ring buffer
+    copy at the device rate); the report shows how regularly PortAudio calls it and
+    how much of each block's time budget it uses.
+
+    Args:
+        seconds: Recording length
+        **stream_options: blocksize, latency, device, capture_rate (see ``create_input_stream``)
+
+    Returns:
+        Timing report (see ``CallbackTimer.report``) plus the stream settings
+    """
+    capture = AudioCapture(max_seconds=seconds + 1)
+    timer = None
+
+    def make_timer(callback):
+        nonlocal timer
+        timer = CallbackTimer(callback, capacity=int(seconds * 2000) + 100)
+        return timer
+
+    stream = capture.create_stream(capture.get_callback(), timer=make_timer, **stream_options)
+    capture.start_recording()
+    with stream:
+        time.sleep(seconds)
+    capture.stop_recording()
+
+    report = timer.report(stream.blocksize / stream.samplerate)
+    report.update({
+        "device_rate": stream.samplerate,
+        "blocksize": stream.blocksize,
+        "latency_ms": stream.latency * 1000,
+        "budget_used_p99": report["callback_p99_ms"] / report["interval_ms"] if report["interval_ms"] else None,
+    })
+    return report
@@ -0,0 +1,337 @@
+"""Bounded-memory reading of audio files: memory-mapped PCM, block decoding and windowing."""
+
+import os
+import wave
+from abc import ABC, abstractmethod
+from math import gcd
+from typing import Iterator, Optional, Tuple
+
+import numpy as np
+
+from vibevoice.ring_buffer import AudioRingBuffer
+
+SAMPLE_RATE = 16000
+
+# Extensions read as headerless 16kHz mono int16 little-endian PCM
+RAW_EXTENSIONS = {".pcm", ".raw", ".s16"}
+
+# int16 full scale; dividing by it is exact in float32 (a power of two)
+INT16_SCALE = 32768.0
+
+
+def int16_to_float32(audio: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Convert int16 samples to float32 in [-1, 1) in one pass.
+
+    The cast and the scaling are fused into a single ufunc call, so the
+    result is the only array allocated (none with ``out``).
+
+    Args:
+        audio: int16 samples (any shape; ndarray subclasses are dropped)
+        out: Optional float32 array of the same shape to write into
+
+    Returns:
+        float32 samples
+    """
+    return np.multiply(np.asarray(audio), np.float32(1.0 / INT16_SCALE), out=out, dtype=np.float32)
+
+
+class StreamResampler:
+    """
+    Polyphase resampler that converts a signal block by block.
+
+    Uses the same Kaiser-windowed FIR as ``scipy.signal.resample_poly`` and
+    keeps just enough input history between blocks that the concatenated
+    output matches resampling the whole signal at once.
+    """
+
+    def __init__(self, orig_rate: int, target_rate: int = SAMPLE_RATE):
+        """
+        Initialize the resampler.
+
+        Args:
+            orig_rate: Input sample rate in Hz
+            target_rate: Output sample rate in Hz
+        """
+        from scipy.signal import firwin
+
+        g = gcd(orig_rate, target_rate)
+        self.up = target_rate // g
+        self.down = orig_rate // g
+
+        max_rate = max(self.up, self.down)
+        # Half length rounded to whole output samples so the filter delay can be dropped exactly
+        half_len = -(-10 * max_rate // self.down) * self.down
+        self._filter = firwin(2 * half_len + 1, 1.0 / max_rate, window=("kaiser", 5.0)) * self.up
+        self._delay = half_len // self.down  # Filter delay in output samples
+
+        self._history = np.zeros(0, dtype=np.float32)
+        self._history_start = 0  # Input position of the first history sample
+        self._consumed = 0       # Input samples seen
+        self._emitted = 0        # Output samples returned
+
+    def process(self, audio: np.ndarray) -> np.ndarray:
+        """
+        Resample the next block.
+
+        Args:
+            audio: float32 input samples
+
+        Returns:
+            float32 output samples that are complete so far (may be empty)
+        """
+        from scipy.signal import upfirdn
+
+        if self.up == self.down:
+            return audio.astype(np.float32, copy=False)
+
+        buffer = np.concatenate((self._history, audio.astype(np.float32, copy=False)))
+        self._consumed += len(audio)
+
+        # Outputs are final once the input reaching their filter centre has arrived
+        first_raw = self._history_start * self.up // self.down
+        end_raw = (self._consumed * self.up - 1) // self.down + 1
+        end = end_raw - self._delay
+        if end <= self._emitted:
+            self._history = buffer
+            return np.zeros(0, dtype=np.float32)
+
+        out = upfirdn(self._filter, buffer, self.up, self.down)
+        result = out[self._emitted + self._delay - first_raw:end + self._delay - first_raw]
+        self._emitted = end
+
+        # Keep the inputs the next output still depends on, starting on a
+        # multiple of ``down`` so the output grid stays aligned
+        needed = max(0, ((end + self._delay) * self.down - len(self._filter) + 1) // self.up)
+        needed -= needed % self.down
+        self._history = buffer[needed - self._history_start:]
+        self._history_start = needed
+        return result.astype(np.float32)
+
+    def flush(self) -> np.ndarray:
+        """
+        Return the outputs held back by the filter delay.
+
+        Returns:
+            Remaining float32 samples; the total output length matches resample_poly
+        """
+        total = -(-self._consumed * self.up // self.down)
+        if self.up == self.down or total <= self._emitted:
+            return np.zeros(0, dtype=np.float32)
+        emitted = self._emitted
+        padding = np.zeros(-(-len(self._filter) // self.up) + self.down, dtype=np.float32)
+        tail = self.process(padding)[:total - emitted]
+        self._emitted = total
+        return tail
+
+
+class AudioReader(ABC):
+    """
+    Sequential reader yielding an audio file as bounded blocks of 16kHz mono float32.
+
+    Use ``open_audio`` to pick the reader for a file.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    @property
+    def duration(self) -> Optional[float]:
+        """Duration in seconds, None when unknown before decoding."""
+        return None
+
+    @abstractmethod
+    def blocks(self, block_size: int = SAMPLE_RATE) -> Iterator[np.ndarray]:
+        """
+        Iterate over the file as float32 blocks of ``block_size`` samples (the last may be shorter).
+
+        Args:
+            block_size: Output samples per block
+        """
+
+
+class PCMReader(AudioReader):
+    """
+    Reads 16-bit PCM WAV or raw int16 files through a memory map.
+
+    Only the block being converted is paged in, so memory does not grow
+    with the file length.
+    """
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        if os.path.splitext(path)[1].lower() in RAW_EXTENSIONS:
+            self.channels, self.sample_rate, offset = 1, SAMPLE_RATE, 0
+            frames = os.path.getsize(path) // 2
+        else:
+            with open(path, "rb") as f:
+                with wave.open(f) as wav:
+                    if wav.getsampwidth() != 2:
+                        raise ValueError("Only 16-bit PCM WAV files can be memory-mapped")
+                    self.channels = wav.getnchannels()
+                    self.sample_rate = wav.getframerate()
+                    frames = wav.getnframes()
+                    # The header has been parsed up to the start of the data chunk
+                    offset = f.tell()
+
+        self.frames = frames
+        self._pcm = np.memmap(path, dtype="<i2", mode="r", offset=offset, shape=(frames, self.channels)) if frames else None
+
+    @property
+    def duration(self) -> float:
+        return self.frames / self.sample_rate
+
+    def blocks(self, block_size: int = SAMPLE_RATE) -> Iterator[np.ndarray]:
+        if self._pcm is None:
+            return
+        resampler = StreamResampler(self.sample_rate) if self.sample_rate != SAMPLE_RATE else None
+        # Native frames per block, so the resampled blocks come out near block_size
+        step = max(1, block_size * self.sample_rate // SAMPLE_RATE)
+        pending = []
+
+        for start in range(0, self.frames, step):
+            pcm = self._pcm[start:start + step]
+            if self.channels > 1:
+                block = pcm.mean(axis=1, dtype=np.float32)
+                block *= 1.0 / INT16_SCALE
+            else:
+                block = int16_to_float32(pcm[:, 0])
+            if resampler is None:
+                yield block
+                continue
+            pending.append(resampler.process(block))
+            yield from _rechunk(pending, block_size)
+
+        if resampler is not None:
+            pending.append(resampler.flush())
+            yield from _rechunk(pending, block_size, final=True)
+
+
+class DecodedReader(AudioReader):
+    """Decodes compressed formats block by block with PyAV (installed with faster-whisper)."""
+
+    def blocks(self, block_size: int = SAMPLE_RATE) -> Iterator[np.ndarray]:
+        import av
+
+        pending = []
+        with av.open(self.path, metadata_errors="ignore") as container:
+            resampler = av.AudioResampler(format="s16", layout="mono", rate=SAMPLE_RATE)
+            for frame in container.decode(audio=0):
+                for resampled in resampler.resample(frame):
+                    pending.append(int16_to_float32(resampled.to_ndarray().reshape(-1)))
+                yield from _rechunk(pending, block_size)
+            for resampled in resampler.resample(None):
+                pending.append(int16_to_float32(resampled.to_ndarray().reshape(-1)))
+        yield from _rechunk(pending, block_size, final=True)
+
+
+def _rechunk(pending: list, block_size: int, final: bool = False) -> Iterator[np.ndarray]:
+    """Yield ``block_size`` blocks from the arrays accumulated in ``pending`` (consumed in place)."""
+    available = sum(len(part) for part in pending)
+    while available >= block_size or (final and available):
+        joined = np.concatenate(pending) if len(pending) > 1 else pending[0]
+        n = min(block_size, len(joined))
+        yield joined[:n]
+        pending[:] = [joined[n:]] if len(joined) > n else []
+        available -= n
+
+
+def open_audio(path: str) -> AudioReader:
+    """
+    Open an audio file for block-wise reading.
+
+    16-bit PCM WAV and raw PCM (.pcm/.raw/.s16) files are memory-mapped;
+    everything else is decoded in blocks with PyAV.
+
+    Args:
+        path: Audio file path
+
+    Returns:
+        AudioReader for the file
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext in RAW_EXTENSIONS:
+        return PCMReader(path)
+    if ext == ".wav":
+        try:
+            return PCMReader(path)
+        except (ValueError, wave.Error):
+            pass  # Compressed or float WAV: decode instead
+    return DecodedReader(path)
+
+
+def _quietest_cut(audio: np.ndarray, frame: int = 320) -> int:
+    """Offset of the start of the lowest-energy frame in ``audio``."""
+    n = len(audio) // frame
+    if n == 0:
+        return len(audio)
+    energy = np.square(audio[:n * frame].reshape(n, frame)).sum(axis=1)
+    return int(np.argmin(energy)) * frame
+
+
+def iter_windows(
+    blocks: Iterator[np.ndarray],
+    vad=None,
+    max_window_s: float = 30.0,
+    cut_search_s: float = 2.0,
+) -> Iterator[Tuple[int, np.ndarray]]:
+    """
+    Cut a block stream into bounded windows for transcription.
+
+    With a VAD, windows are the detected speech segments; without one, the
+    whole signal is covered. Any stretch longer than ``max_window_s`` is split
+    at the quietest 20 ms within its last ``cut_search_s`` seconds, so the cut
+    falls between words rather than through one. Consecutive windows share
+    no samples, so no text is transcribed twice. Only the open window is held
+    in memory.
+
+    Args:
+        blocks: float32 16kHz blocks, e.g. ``open_audio(path).blocks()``
+        vad: SileroVAD for speech segmentation, None to window the whole signal
+        max_window_s: Maximum window length in seconds
+        cut_search_s: Region at the end of a full window searched for the cut
+
+    Yields:
+        (start sample, float32 audio) per window, in order
+    """
+    max_window = int(max_window_s * SAMPLE_RATE)
+    cut_search = min(int(cut_search_s * SAMPLE_RATE), max_window - 1)
+    stream = None
+    margin = 0
+    if vad is not None:
+        stream = vad.stream()
+        stream.reset()
+        # Speech ends are confirmed after min_silence_ms of silence
+        margin = int((vad.min_silence_ms + 100) * SAMPLE_RATE / 1000)
+
+    ring = None
+    start = None if stream is not None else 0
+
+    for block in blocks:
+        if ring is None:
+            ring = AudioRingBuffer(max_window + margin + 2 * len(block))
+        ring.write(block)
+
+        if stream is not None:
+            for event in stream.process(block):
+                if 'start' in event:
+                    start = max(event['start'], ring.oldest_pos)
+                elif start is not None:
+                    end = min(event['end'], ring.write_pos)
+                    if end > start:
+                        yield start, ring.read(start, end, copy=True)
+                    start = None
+
+        while start is not None and ring.write_pos - start > max_window:
+            search_from = start + max_window - cut_search
+            cut = search_from + _quietest_cut(ring.read(search_from, start + max_window))
+            yield start, ring.read(start, cut, copy=True)
+            start = cut
+
+    if ring is None:
+        return
+    if stream is not None:
+        stream.flush()
+    if start is not None and ring.write_pos > start:
+        yield start, ring.read(start, copy=True)
+
@@ -0,0 +1,423 @@
+"""Transcription backends: MLX Whisper (Apple Silicon) and faster-whisper (CTranslate2)."""
+
+import os
+import platform
+import threading
+import zlib
+from abc import ABC, abstractmethod
+import numpy as np
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+class TranscriptionBackend(ABC):
+    """
+    Base class for Whisper inference engines.
+
+    A backend owns one loaded model and turns float32 16kHz audio into text.
+    Subclasses define MODELS (size name -> model id) and implement
+    ``load`` and ``transcribe``.
+    """
+
+    name = None
+    MODELS: Dict[str, str] = {}
+    # Whether the engine honours beam_size > 1 (otherwise it always decodes greedily)
+    BEAM_SEARCH = False
+
+    def __init__(self, model_size: str = "small", **options):
+        """
+        Initialize the backend (the model is loaded by ``load``).
+
+        Args:
+            model_size: Model size (tiny, base, small, medium, large)
+            **options: Backend-specific engine options
+        """
+        if model_size not in self.MODELS:
+            raise ValueError(f"Model size must be one of: {list(self.MODELS.keys())}")
+
+        self.model_size = model_size
+        self.model_path = self.MODELS[model_size]
+        self.options = options
+        self.model = None
+
+    @abstractmethod
+    def load(self):
+        """Load the model and keep it resident."""
+
+    @abstractmethod
+    def transcribe(self, audio: np.ndarray, language: Optional[str] = None) -> str:
+        """
+        Transcribe audio to text.
+
+        Args:
+            audio: Audio data as float32 numpy array normalized to [-1, 1]
+            language: Language code, None for auto-detect
+
+        Returns:
+            Transcribed text
+        """
+
+    def transcribe_batch(self, audios: List[np.ndarray], language: Optional[str] = None) -> List[str]:
+        """
+        Transcribe several clips, in order.
+
+        The default implementation decodes them one by one; backends that can
+        run a padded batch through the model override it.
+
+        Args:
+            audios: List of float32 numpy arrays normalized to [-1, 1]
+            language: Language code, None for auto-detect
+
+        Returns:
+            List of transcribed texts, one per clip
+        """
+        return [self.transcribe(audio, language=language) for audio in audios]
+
+    def transcribe_words(
+        self,
+        audio: np.ndarray,
+        language: Optional[str] = None,
+        initial_prompt: Optional[str] = None,
+    ) -> List[Tuple[Optional[float], Optional[float], str]]:
+        """
+        Transcribe audio into words with timestamps.
+
+        The default implementation splits the plain transcript and has no
+        timestamps; backends with word timing override it.
+
+        Args:
+            audio: Audio data as float32 numpy array normalized to [-1, 1]
+            language: Language code, None for auto-detect
+            initial_prompt: Text preceding the audio, used as decoder context
+
+        Returns:
+            List of (start_seconds, end_seconds, word) tuples
+        """
+        return [(None, None, word) for word in self.transcribe(audio, language=language).split()]
+
+
+# Serializes MLX decodes, which share mlx_whisper's global ModelHolder
+_MLX_LOCK = threading.Lock()
+
+
+class MLXWhisperBackend(TranscriptionBackend):
+    """MLX Whisper, optimized for Apple Silicon."""
+
+    name = "mlx"
+    MODELS = {
+        "tiny": "mlx-community/whisper-tiny",
+        "base": "mlx-community/whisper-base",
+        "small": "mlx-community/whisper-small",
+        "medium": "mlx-community/whisper-medium",
+        "large": "mlx-community/whisper-large-v3",
+    }
+
+    def load(self):
+        import mlx.core as mx
+        from mlx_whisper.load_models import load_model
+
+        # Held by this backend, not in mlx_whisper's single ModelHolder slot,
+        # so backends of different sizes (adaptive fallbacks) stay resident
+        # side by side instead of evicting each other.
+        self.model = load_model(self.model_path, dtype=mx.float16)
+        return self.model
+
+    def transcribe(self, audio: np.ndarray, language: Optional[str] = None) -> str:
+        result = self._transcribe(audio, language=language)
+        return result.get("text", "").strip()
+
+    def transcribe_words(self, audio, language=None, initial_prompt=None):
+        result = self._transcribe(
+            audio,
+            language=language,
+            initial_prompt=initial_prompt,
+            word_timestamps=True,
+        )
+        return [
+            (word["start"], word["end"], word["word"].strip())
+            for segment in result.get("segments", [])
+            for word in segment.get("words", [])
+        ]
+
+    def _transcribe(self, audio: np.ndarray, **options) -> dict:
+        """Run mlx_whisper.transcribe on this backend's model."""
+        import mlx_whisper
+        from mlx_whisper.transcribe import ModelHolder
+
+        if self.model is None:
+            self.load()
+        # transcribe() only decodes with the model in ModelHolder: put this
+        # backend's model there for the duration of the call
+        with _MLX_LOCK:
+            ModelHolder.model, ModelHolder.model_path = self.model, self.model_path
+            return mlx_whisper.transcribe(audio, path_or_hf_repo=self.model_path, **options)
+
+
+class FasterWhisperBackend(TranscriptionBackend):
+    """
+    faster-whisper on CTranslate2, for Linux/Windows CPUs and CUDA GPUs.
+
+    Options:
+        device: "cpu", "cuda" or "auto" (default "cpu")
+        compute_type: CTranslate2 quantization, e.g. "int8", "float16" (default "int8")
+        cpu_threads: Threads per CPU worker, 0 lets CTranslate2 decide
+        num_workers: Number of model workers for concurrent transcribe calls
+        beam_size: Beam size used for decoding (default 1)
+    """
+
+    name = "faster-whisper"
+    BEAM_SEARCH = True
+
+    # Longest clip that fits in one Whisper window without seeking
+    MAX_BATCH_SAMPLES = 30 * 16000
+
+    # Checks applied to batched results, with WhisperModel.transcribe's defaults
+    THRESHOLDS = {
+        "compression_ratio_threshold": 2.4,
+        "log_prob_threshold": -1.0,
+        "no_speech_threshold": 0.6,
+    }
+
+    # Options only the sequential pipeline implements
+    SEQUENTIAL_OPTIONS = ("vad_filter", "initial_prompt", "prefix", "hotwords", "word_timestamps", "clip_timestamps")
+
+    MODELS = {
+        "tiny": "tiny",
+        "base": "base",
+        "small": "small",
+        "medium": "medium",
+        "large": "large-v3",
+    }
+
+    def load(self):
+        from faster_whisper import WhisperModel
+
+        self.model = WhisperModel(
+            self.model_path,
+            device=self.options.get("device", "cpu"),
+            compute_type=self.options.get("compute_type", "int8"),
+            cpu_threads=self.options.get("cpu_threads", 0),
+            num_workers=self.options.get("num_workers", 1),
+        )
+        return self.model
+
+    def transcribe_segments(self, audio, language: Optional[str] = None, **decode_options) -> Iterator:
+        """
+        Transcribe audio lazily, yielding faster-whisper segments as they are decoded.
+
+        Args:
+            audio: float32 numpy array, or a path / file-like object
+            language: Language code, None for auto-detect
+            **decode_options: Extra options for WhisperModel.transcribe
+
+        Returns:
+            Generator of faster-whisper Segment objects
+        """
+        decode_options.setdefault("beam_size", self.options.get("beam_size", 1))
+        decode_options.setdefault("condition_on_previous_text", False)
+        segments, _info = self.model.transcribe(audio, language=language, **decode_options)
+        return segments
+
+    def transcribe(self, audio: np.ndarray, language: Optional[str] = None) -> str:
+        return self._decode_text(audio, language, {})
+
+    def transcribe_words(self, audio, language=None, initial_prompt=None):
+        segments = self.transcribe_segments(
+            audio,
+            language=language,
+            initial_prompt=initial_prompt,
+            word_timestamps=True,
+        )
+        return [
+            (word.start, word.end, word.word.strip())
+            for segment in segments
+            for word in (segment.words or [])
+        ]
+
+    def transcribe_batch(self, audios: List[np.ndarray], language: Optional[str] = None, **decode_options) -> List[str]:
+        """
+        Decode short clips as one padded batch through the CTranslate2 model.
+
+        The batch is the first (temperature 0) pass of WhisperModel.transcribe
+        for all clips at once, and each result goes through the same checks as
+        the sequential path: a clip judged silent by ``no_speech_threshold``
+        and ``log_prob_threshold`` yields "", and a clip failing the
+        compression-ratio or log-probability check is decoded again on its own
+        with the usual temperature fallback. A phrase therefore reads the same
+        whether or not it was batched.
+
+        Falls back to sequential decoding for a single clip, when the language
+        is not fixed (detection is per clip), when a clip exceeds one
+        30-second window or when an option needs the full pipeline.
+
+        Args:
+            audios: List of float32 numpy arrays normalized to [-1, 1]
+            language: Language code, None for auto-detect
+            **decode_options: Options for WhisperModel.transcribe (beam_size,
+                no_speech_threshold, ...), applied on both paths
+
+        Returns:
+            List of transcribed texts, one per clip
+        """
+        decode_options.setdefault("beam_size", self.options.get("beam_size", 1))
+        temperature = decode_options.get("temperature", 0.0)
+        first_temperature = temperature[0] if isinstance(temperature, (list, tuple)) else temperature
+        if (
+            len(audios) < 2
+            or language is None
+            or first_temperature > 0
+            or any(decode_options.get(name) for name in self.SEQUENTIAL_OPTIONS)
+            or any(len(audio) > self.MAX_BATCH_SAMPLES for audio in audios)
+        ):
+            return [self._decode_text(audio, language, decode_options) for audio in audios]
+
+        thresholds = {name: decode_options.get(name, default) for name, default in self.THRESHOLDS.items()}
+        texts = []
+        for audio, (text, avg_logprob, no_speech_prob) in zip(
+            audios, self._generate_batch(audios, language, decode_options)
+        ):
+            if is_silence(no_speech_prob, avg_logprob, thresholds):
+                texts.append("")
+            elif needs_fallback(text, avg_logprob, thresholds):
+                texts.append(self._decode_text(audio, language, decode_options))
+            else:
+                texts.append(text)
+        return texts
+
+    def _decode_text(self, audio: np.ndarray, language: Optional[str], decode_options: Dict) -> str:
+        """Sequential decode of one clip joined into a single string."""
+        segments = self.transcribe_segments(audio, language=language, **decode_options)
+        return " ".join(segment.text.strip() for segment in segments).strip()
+
+    def _generate_batch(self, audios: List[np.ndarray], language: str, decode_options: Dict) -> List[Tuple[str, float, float]]:
+        """
+        Run the temperature-0 pass for all clips in one padded generate call.
+
+        Returns:
+            (text, average log-probability, no-speech probability) per clip
+        """
+        from faster_whisper.audio import pad_or_trim
+        from faster_whisper.tokenizer import Tokenizer
+        from faster_whisper.transcribe import get_suppressed_tokens
+
+        features = np.stack([
+            pad_or_trim(self.model.feature_extractor(audio)) for audio in audios
+        ])
+        encoder_output = self.model.encode(features)
+
+        tokenizer = Tokenizer(
+            self.model.hf_tokenizer,
+            self.model.model.is_multilingual,
+            task="transcribe",
+            language=language,
+        )
+        prompt = self.model.get_prompt(tokenizer, [], without_timestamps=True)
+        suppress_tokens = decode_options.get("suppress_tokens", [-1])
+        length_penalty = decode_options.get("length_penalty", 1)
+        results = self.model.model.generate(
+            encoder_output,
+            [prompt] * len(audios),
+            beam_size=decode_options["beam_size"],
+            patience=decode_options.get("patience", 1),
+            length_penalty=length_penalty,
+            repetition_penalty=decode_options.get("repetition_penalty", 1),
+            no_repeat_ngram_size=decode_options.get("no_repeat_ngram_size", 0),
+            suppress_blank=decode_options.get("suppress_blank", True),
+            suppress_tokens=get_suppressed_tokens(tokenizer, list(suppress_tokens)) if suppress_tokens else [],
+            max_length=self.model.max_length,
+            return_scores=True,
+            return_no_speech_prob=True,
+        )
+
+        decoded = []
+        for result in results:
+            tokens = result.sequences_ids[0]
+            # Same average log-probability as WhisperModel.generate_with_fallback
+            avg_logprob = result.scores[0] * len(tokens) ** length_penalty / (len(tokens) + 1)
+            decoded.append((tokenizer.decode(tokens).strip(), avg_logprob, result.no_speech_prob))
+        return decoded
+
+
+def is_silence(no_speech_prob: float, avg_logprob: float, thresholds: Dict) -> bool:
+    """
+    WhisperModel's no-speech check: a likely silent window is skipped unless
+    its text is confident enough.
+
+    Args:
+        no_speech_prob: Probability of the no-speech token
+        avg_logprob: Average log-probability of the decoded tokens
+        thresholds: no_speech_threshold and log_prob_threshold (None disables)
+    """
+    if thresholds["no_speech_threshold"] is None or no_speech_prob <= thresholds["no_speech_threshold"]:
+        return False
+    return thresholds["log_prob_threshold"] is None or avg_logprob <= thresholds["log_prob_threshold"]
+
+
+def needs_fallback(text: str, avg_logprob: float, thresholds: Dict) -> bool:
+    """
+    WhisperModel's temperature-fallback check: too repetitive or too improbable.
+
+    Args:
+        text: Decoded text
+        avg_logprob: Average log-probability of the decoded tokens
+        thresholds: compression_ratio_threshold and log_prob_threshold (None disables)
+    """
+    if thresholds["compression_ratio_threshold"] is not None and text:
+        text_bytes = text.encode("utf-8")
+        if len(text_bytes) / len(zlib.compress(text_bytes)) > thresholds["compression_ratio_threshold"]:
+            return True
+    return thresholds["log_prob_threshold"] is not None and avg_logprob < thresholds["log_prob_threshold"]
+
+BACKENDS = {
+    MLXWhisperBackend.name: MLXWhisperBackend,
+    FasterWhisperBackend.name: FasterWhisperBackend,
+}
+
+
+def default_backend_name() -> str:
+    """MLX on Apple Silicon, faster-whisper everywhere else."""
+    if platform.system() == "Darwin" and platform.machine() == "arm64":
+        return MLXWhisperBackend.name
+    return FasterWhisperBackend.name
+
+
+def backend_options_from_env(defaults: Optional[Dict] = None) -> Dict:
+    """
+    Read engine options from WHISPER_DEVICE, WHISPER_COMPUTE_TYPE,
+    WHISPER_CPU_THREADS, WHISPER_NUM_WORKERS and WHISPER_BEAM_SIZE.
+
+    Args:
+        defaults: Options used when the variable is not set
+
+    Returns:
+        Dict of backend options
+    """
+    options = dict(defaults or {})
+    for key, env, cast in (
+        ("device", "WHISPER_DEVICE", str),
+        ("compute_type", "WHISPER_COMPUTE_TYPE", str),
+        ("cpu_threads", "WHISPER_CPU_THREADS", int),
+        ("num_workers", "WHISPER_NUM_WORKERS", int),
+        ("beam_size", "WHISPER_BEAM_SIZE", int),
+    ):
+        value = os.environ.get(env)
+        if value:
+            options[key] = cast(value)
+    return options
+
+
+def create_backend(name: Optional[str] = None, model_size: str = "small", **options) -> TranscriptionBackend:
+    """
+    Create a (not yet loaded) backend by name.
+
+    Args:
+        name: Backend name ("mlx" or "faster-whisper"), None for the platform default
+        model_size: Model size (tiny, base, small, medium, large)
+        **options: Backend-specific engine options
+
+    Returns:
+        TranscriptionBackend instance
+    """
+    name = name or default_backend_name()
+    if name not in BACKENDS:
+        raise ValueError(f"Backend must be one of: {list(BACKENDS.keys())}")
+    return BACKENDS[name](model_size, **options)
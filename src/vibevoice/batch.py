@@ -0,0 +1,235 @@
+"""Offline transcription of audio files and directories on a process pool."""
+
+import hashlib
+import json
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Iterable, List, Optional, Set
+
+from vibevoice.audio_io import SAMPLE_RATE, iter_windows, open_audio
+
+AUDIO_EXTENSIONS = {".wav", ".mp3", ".m4a", ".flac", ".ogg", ".opus", ".webm", ".aac", ".mp4", ".mkv"}
+
+MANIFEST_NAME = "transcripts.jsonl"
+
+# Per-process models, loaded once by the pool initializer
+_vad = None
+_transcriber = None
+_batch_size = 4
+
+
+def find_audio_files(paths: Iterable[str]) -> List[str]:
+    """
+    Expand files and directories (recursively) into a sorted list of audio files.
+
+    Args:
+        paths: Files or directories
+
+    Returns:
+        Absolute paths of audio files
+    """
+    files = set()
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                for name in names:
+                    if os.path.splitext(name)[1].lower() in AUDIO_EXTENSIONS:
+                        files.add(os.path.abspath(os.path.join(root, name)))
+        elif os.path.isfile(path):
+            files.add(os.path.abspath(path))
+        else:
+            print(f"Skipping missing path: {path}")
+    return sorted(files)
+
+
+def completed_files(output_dir: str) -> Set[str]:
+    """
+    Read the paths already transcribed into the manifest of ``output_dir``.
+
+    A line cut short by an interrupted run is ignored, so that file is redone.
+    """
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                done.add(json.loads(line)["path"])
+            except (ValueError, KeyError):
+                continue
+    return done
+
+
+def format_srt_time(seconds: float) -> str:
+    """Format seconds as an SRT timestamp (HH:MM:SS,mmm)."""
+    ms = int(round(seconds * 1000))
+    hours, ms = divmod(ms, 3600000)
+    minutes, ms = divmod(ms, 60000)
+    secs, ms = divmod(ms, 1000)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d},{ms:03d}"
+
+
+def write_srt(path: str, segments: List[Dict]):
+    """Write segments as an SRT file, atomically so a partial file is never left behind."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        for i, segment in enumerate(segments, 1):
+            f.write(f"{i}\n{format_srt_time(segment['start'])} --> {format_srt_time(segment['end'])}\n")
+            f.write(f"{segment['text']}\n\n")
+    os.replace(tmp_path, path)
+
+
+def _init_worker(model_size: str, language: Optional[str], backend: Optional[str], backend_options: Dict, batch_size: int):
+    """Load the VAD and Whisper model once per worker process."""
+    global _vad, _transcriber, _batch_size
+    from vibevoice.transcriber import StreamingTranscriber
+    from vibevoice.vad import SileroVAD
+
+    _vad = SileroVAD()
+    _transcriber = StreamingTranscriber(
+        model_size=model_size,
+        language=language,
+        warmup_seconds=0,
+        backend=backend,
+        backend_options=backend_options,
+    )
+    _batch_size = batch_size
+
+
+def transcribe_file(path: str) -> Dict:
+    """
+    Segment one file into phrases with Silero VAD and transcribe them in batches.
+
+    The file is read block by block and phrases are decoded as they close,
+    so memory stays bounded by the longest window, not the file length.
+    Runs in a worker process.
+
+    Returns:
+        Dict with path, duration (seconds), segments ({start, end, text}) and text
+    """
+    samples = 0
+
+    def blocks():
+        nonlocal samples
+        for block in open_audio(path).blocks():
+            samples += len(block)
+            yield block
+
+    segments = []
+
+    def flush(starts, phrases):
+        for start, phrase, text in zip(starts, phrases, _transcriber.transcribe_batch(phrases)):
+            if text.strip():
+                segments.append({
+                    "start": start / SAMPLE_RATE,
+                    "end": (start + len(phrase)) / SAMPLE_RATE,
+                    "text": text.strip(),
+                })
+
+    starts, phrases = [], []
+    for start, phrase in iter_windows(blocks(), vad=_vad):
+        starts.append(start)
+        phrases.append(phrase)
+        if len(phrases) == _batch_size:
+            flush(starts, phrases)
+            starts, phrases = [], []
+    if phrases:
+        flush(starts, phrases)
+
+    return {
+        "path": path,
+        "duration": samples / SAMPLE_RATE,
+        "segments": segments,
+        "text": " ".join(segment["text"] for segment in segments),
+    }
+
+
+def srt_path(output_dir: str, path: str) -> str:
+    """SRT output path for an input file (named after it, with a short path hash against collisions)."""
+    stem = os.path.splitext(os.path.basename(path))[0]
+    digest = hashlib.blake2b(path.encode(), digest_size=3).hexdigest()
+    return os.path.join(output_dir, f"{stem}.{digest}.srt")
+
+
+def run_batch(
+    paths: List[str],
+    output_dir: str,
+    formats: Iterable[str] = ("jsonl",),
+    jobs: int = 1,
+    model_size: str = "small",
+    language: Optional[str] = None,
+    backend: Optional[str] = None,
+    backend_options: Optional[Dict] = None,
+    batch_size: int = 4,
+) -> int:
+    """
+    Transcribe files and directories into ``output_dir``.
+
+    Each finished file is appended to ``transcripts.jsonl`` (its SRT, if
+    requested, is written first), so an interrupted run picks up where it
+    stopped: files already in the manifest are skipped.
+
+    Args:
+        paths: Audio files or directories
+        output_dir: Directory for the manifest and SRT files
+        formats: Output formats ("jsonl", "srt"); the JSONL manifest is always written
+        jobs: Number of worker processes, each holding its own model
+        model_size: Model size (tiny, base, small, medium, large)
+        language: Language code, None for auto-detect
+        backend: Backend name, None for the platform default
+        backend_options: Engine options (cpu_threads, compute_type, ...)
+        batch_size: Phrases decoded together per batch
+
+    Returns:
+        Number of files that failed
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    files = find_audio_files(paths)
+    done = completed_files(output_dir)
+    todo = [path for path in files if path not in done]
+    print(f"{len(files)} files, {len(files) - len(todo)} already transcribed, {len(todo)} to go ({jobs} workers)")
+    if not todo:
+        return 0
+
+    # Spawn rather than fork: torch and the inference engines are not fork-safe
+    executor = ProcessPoolExecutor(
+        max_workers=jobs,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(model_size, language, backend, dict(backend_options or {}), batch_size),
+    )
+    failed = 0
+    finished = 0
+    try:
+        with open(os.path.join(output_dir, MANIFEST_NAME), "a+", encoding="utf-8") as manifest:
+            # Terminate a line cut short by an interrupted run before appending
+            if manifest.tell() > 0:
+                manifest.seek(manifest.tell() - 1)
+                if manifest.read(1) != "\n":
+                    manifest.write("\n")
+            futures = {executor.submit(transcribe_file, path): path for path in todo}
+            for future in as_completed(futures):
+                path = futures[future]
+                finished += 1
+                try:
+                    result = future.result()
+                except Exception as e:
+                    failed += 1
+                    print(f"[{finished}/{len(todo)}] Failed {path}: {e}")
+                    continue
+
+                if "srt" in formats:
+                    result["srt"] = srt_path(output_dir, path)
+                    write_srt(result["srt"], result["segments"])
+                manifest.write(json.dumps(result, ensure_ascii=False) + "\n")
+                manifest.flush()
+                print(f"[{finished}/{len(todo)}] {path} ({result['duration']:.1f}s)")
+    except KeyboardInterrupt:
+        print("\nInterrupted; run the same command again to resume.")
+        executor.shutdown(wait=False, cancel_futures=True)
+        sys.exit(130)
+    executor.shutdown()
+    return failed
@@ -0,0 +1,196 @@
+"""Content-addressed cache of transcription results."""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+import numpy as np
+
+
+class TranscriptionCache:
+    """
+    Two-tier cache keyed by a hash of the PCM samples plus the decoding parameters.
+
+    The memory tier is an LRU bounded by the size of the stored values. The
+    optional disk tier is a sqlite database under ``cache_dir``, evicted
+    least-recently-accessed first once it exceeds ``max_disk_bytes``. Disk
+    hits are promoted to memory. Values must be JSON-serializable.
+    """
+
+    DB_NAME = "transcriptions.sqlite"
+
+    def __init__(
+        self,
+        max_memory_bytes: int = 16 * 1024 * 1024,
+        cache_dir: Optional[str] = None,
+        max_disk_bytes: int = 256 * 1024 * 1024,
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            max_memory_bytes: Size budget of the in-memory tier
+            cache_dir: Directory of the on-disk tier (None disables it)
+            max_disk_bytes: Size budget of the on-disk tier
+        """
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+
+        self._memory: "OrderedDict[str, str]" = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+
+        self._db = None
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+            self._db = sqlite3.connect(os.path.join(cache_dir, self.DB_NAME), check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, accessed REAL NOT NULL)"
+            )
+            self._db.commit()
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(audio: np.ndarray, **params) -> str:
+        """
+        Build a cache key from audio samples and decoding parameters.
+
+        Args:
+            audio: PCM samples (any dtype; the dtype is part of the key)
+            **params: Model and decoding parameters that affect the result
+
+        Returns:
+            Hex digest
+        """
+        digest = hashlib.blake2b(digest_size=20)
+        digest.update(str(audio.dtype).encode())
+        digest.update(memoryview(np.ascontiguousarray(audio)).cast("B"))
+        digest.update(json.dumps(params, sort_keys=True, default=str).encode())
+        return digest.hexdigest()
+
+    @staticmethod
+    def file_key(path: str, **params) -> str:
+        """
+        Build a cache key from a file's bytes and decoding parameters.
+
+        The file is hashed in 1 MB chunks, so nothing is decoded or held in memory.
+
+        Args:
+            path: Audio file path
+            **params: Model and decoding parameters that affect the result
+
+        Returns:
+            Hex digest
+        """
+        digest = hashlib.blake2b(digest_size=20)
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+        digest.update(json.dumps(params, sort_keys=True, default=str).encode())
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Look up a cached result.
+
+        Returns:
+            Cached value, or None on a miss
+        """
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return json.loads(self._memory[key])
+
+            if self._db is not None:
+                row = self._db.execute("SELECT value FROM cache WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    self._db.execute("UPDATE cache SET accessed = ? WHERE key = ?", (time.time(), key))
+                    self._db.commit()
+                    self.disk_hits += 1
+                    self._put_memory(key, row[0])
+                    return json.loads(row[0])
+
+            self.misses += 1
+            return None
+
+    def put(self, key: str, value: Any):
+        """Store a result in both tiers."""
+        data = json.dumps(value)
+        with self._lock:
+            self._put_memory(key, data)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO cache (key, value, size, accessed) VALUES (?, ?, ?, ?)",
+                    (key, data, len(data), time.time()),
+                )
+                self._evict_disk()
+                self._db.commit()
+
+    def _put_memory(self, key: str, data: str):
+        if key in self._memory:
+            self._memory_bytes -= len(self._memory.pop(key))
+        self._memory[key] = data
+        self._memory_bytes += len(data)
+        while self._memory_bytes > self.max_memory_bytes and self._memory:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+
+    def _evict_disk(self):
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM cache").fetchone()[0]
+        if total <= self.max_disk_bytes:
+            return
+        rows = self._db.execute("SELECT key, size FROM cache ORDER BY accessed").fetchall()
+        stale = []
+        for key, size in rows:
+            if total <= self.max_disk_bytes:
+                break
+            stale.append((key,))
+            total -= size
+        self._db.executemany("DELETE FROM cache WHERE key = ?", stale)
+
+    def stats(self) -> dict:
+        """Hit/miss counters and tier sizes."""
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            stats = {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else None,
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+            }
+            if self._db is not None:
+                entries, size = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache").fetchone()
+                stats.update(disk_entries=entries, disk_bytes=size)
+            return stats
+
+
+def cache_from_env(prefix: str = "VIBEVOICE", enabled_by_default: bool = False) -> Optional[TranscriptionCache]:
+    """
+    Build a cache from <prefix>_CACHE, <prefix>_CACHE_MB, <prefix>_CACHE_DIR and <prefix>_CACHE_DISK_MB.
+
+    Setting <prefix>_CACHE_DIR enables the cache with a disk tier.
+
+    Returns:
+        TranscriptionCache, or None when disabled
+    """
+    cache_dir = os.environ.get(f"{prefix}_CACHE_DIR")
+    default = "true" if enabled_by_default or cache_dir else "false"
+    if os.environ.get(f"{prefix}_CACHE", default).lower() != "true":
+        return None
+    return TranscriptionCache(
+        max_memory_bytes=int(float(os.environ.get(f"{prefix}_CACHE_MB", "16")) * 1024 * 1024),
+        cache_dir=cache_dir,
+        max_disk_bytes=int(float(os.environ.get(f"{prefix}_CACHE_DISK_MB", "256")) * 1024 * 1024),
+    )
@@ -9,20 +9,52 @@ parent_dir = os.path.dirname(current_dir)
 if parent_dir not in sys.path:
     sys.path.insert(0, parent_dir)
 
+import argparse
+import importlib
 import threading
 import time
-import numpy as np
-import sounddevice as sd
-from pynput.keyboard import Controller as KeyboardController, Key, Listener
-from dotenv import load_dotenv
+from contextlib import contextmanager
+from queue import Empty
 
-from vibevoice.audio_capture import StreamingAudioCapture
-from vibevoice.transcriber import StreamingTranscriber
-from vibevoice.loading_indicator import LoadingIndicator
+# numpy, sounddevice, pynput and the inference engines are imported where
+# they are first needed, so argument parsing and subcommands stay fast and
+# the model can load while the audio device and keyboard hook are set up.
+
+
+class StartupProfile:
+    """Records how long each startup step takes, including steps on other threads."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.steps = []  # (name, thread name, seconds)
+
+    @contextmanager
+    def step(self, name: str):
+        """Time the enclosed block as one step."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def record(self, name: str, seconds: float):
+        """Record a step measured elsewhere."""
+        self.steps.append((name, threading.current_thread().name, seconds))
+
+    def report(self) -> str:
+        """Table of steps plus the wall time until ready."""
+        lines = ["Startup profile:"]
+        for name, thread, seconds in self.steps:
+            lines.append(f"  {name:<32} {seconds * 1000:8.0f} ms  [{thread}]")
+        lines.append(f"  {'ready after':<32} {(time.perf_counter() - self.start) * 1000:8.0f} ms")
+        return "\n".join(lines)
 
 
 def play_start_sound():
     """Play a modern ascending sound when starting recording"""
+    import numpy as np
+    import sounddevice as sd
+
     # Ascending tone: 880Hz (A5) -> 1108Hz (C#6)
     duration = 0.15
     sample_rate = 44100
@@ -44,6 +76,9 @@ def play_start_sound():
 
 def play_stop_sound():
     """Play a modern descending sound when stopping recording"""
+    import numpy as np
+    import sounddevice as sd
+
     # Descending tone: 1108Hz (C#6) -> 659Hz (E5)
     duration = 0.2
     sample_rate = 44100
@@ -63,69 +98,424 @@ def play_stop_sound():
     sd.play(audio, 44100)
 
 
+def transcribe_files(args):
+    """Run the ``transcribe`` subcommand: offline transcription of files and directories."""
+    from vibevoice.backends import backend_options_from_env, default_backend_name
+    from vibevoice.batch import run_batch
+
+    backend = os.environ.get("WHISPER_BACKEND") or default_backend_name()
+    # One process per 4 cores on CPU; MLX shares a single GPU, so one process there
+    jobs = args.jobs or (1 if backend == "mlx" else max(1, (os.cpu_count() or 1) // 4))
+    # Split the cores between the workers unless the thread count is set explicitly
+    backend_options = backend_options_from_env({"cpu_threads": max(1, (os.cpu_count() or 1) // jobs)})
+
+    failed = run_batch(
+        args.paths,
+        output_dir=args.output,
+        formats=args.format.split(","),
+        jobs=jobs,
+        model_size=os.environ.get("WHISPER_MODEL", "small"),
+        language=os.environ.get("WHISPER_LANGUAGE", None),
+        backend=backend,
+        backend_options=backend_options,
+        batch_size=int(os.environ.get("WHISPER_BATCH_SIZE", "4")),
+    )
+    if failed:
+        sys.exit(1)
+
+
+def audio_self_test(args):
+    """Run the ``audio-test`` subcommand: callback timing for each block size and latency."""
+    from vibevoice.audio_capture import callback_self_test
+
+    blocksizes = [int(b) for b in args.blocksize.split(",")] if args.blocksize else [None]
+    latencies = args.latency.split(",") if args.latency else [None]
+
+    print(f"{'dev block':>9} {'latency':>8} {'rate':>6} {'stream ms':>9} {'jitter p99':>10} "
+          f"{'cb p50':>8} {'cb p99':>8} {'cb max':>8} {'budget':>7} {'overflows':>9}")
+    for blocksize in blocksizes:
+        for latency in latencies:
+            report = callback_self_test(
+                args.seconds, blocksize=blocksize, latency=latency, device=args.device, capture_rate=args.capture_rate
+            )
+            budget = report["budget_used_p99"]
+            print(f"{report['blocksize']:>9} {str(latency or 'low'):>8} {report['device_rate']:>6.0f} "
+                  f"{report['latency_ms']:>9.1f} {report['jitter_p99_ms']:>8.2f}ms "
+                  f"{report['callback_p50_ms']:>6.3f}ms {report['callback_p99_ms']:>6.3f}ms "
+                  f"{report['callback_max_ms']:>6.3f}ms {budget * 100 if budget is not None else 0:>6.1f}% "
+                  f"{report['overflows']:>9}")
+
+
 def main():
     """Main entry point for vibevoice with real-time streaming and sound feedback."""
+    from dotenv import load_dotenv
+
     load_dotenv()
 
+    parser = argparse.ArgumentParser(prog="vibevoice", description="Voice-to-text with a local Whisper model")
+    parser.add_argument("--profile-startup", action="store_true", help="Print import and load time per component")
+    subcommands = parser.add_subparsers(dest="command")
+    transcribe_parser = subcommands.add_parser("transcribe", help="Transcribe audio files or directories")
+    transcribe_parser.add_argument("paths", nargs="+", help="Audio files or directories (searched recursively)")
+    transcribe_parser.add_argument("-o", "--output", default="transcripts", help="Output directory (default: transcripts)")
+    transcribe_parser.add_argument("--format", default="jsonl", help="Comma-separated outputs: jsonl, srt (default: jsonl)")
+    transcribe_parser.add_argument("-j", "--jobs", type=int, default=None, help="Worker processes (default: one per 4 cores, 1 with MLX)")
+    audio_test_parser = subcommands.add_parser("audio-test", help="Measure audio callback timing for stream settings")
+    audio_test_parser.add_argument("--seconds", type=float, default=5.0, help="Recording time per setting (default: 5)")
+    audio_test_parser.add_argument("--blocksize", default=None, help="Comma-separated block sizes at 16kHz to compare (default: 512)")
+    audio_test_parser.add_argument("--latency", default=None, help="Comma-separated latencies: low, high or seconds (default: low)")
+    audio_test_parser.add_argument("--device", default=None, help="Input device index or name (default: system default)")
+    audio_test_parser.add_argument("--capture-rate", default=None, help="native or a rate in Hz (default: native)")
+    args = parser.parse_args()
+
+    if args.command == "transcribe":
+        transcribe_files(args)
+        return
+    if args.command == "audio-test":
+        audio_self_test(args)
+        return
+
+    dictate(profile_startup=args.profile_startup)
+
+
+def dictate(profile_startup: bool = False):
+    """
+    Run live push-to-talk dictation.
+
+    The Whisper model loads on a background thread while the audio stream
+    and keyboard listener are set up; recording can start right away and
+    transcription waits for the model.
+
+    Args:
+        profile_startup: Print the time spent per startup step once ready
+    """
+    profile = StartupProfile()
+    with profile.step("import numpy"):
+        import numpy as np
+    with profile.step("import vibevoice modules"):
+        from vibevoice.audio_capture import StreamingAudioCapture
+        from vibevoice.transcriber import StreamingTranscriber
+        from vibevoice.backends import backend_options_from_env, default_backend_name
+        from vibevoice.cache import cache_from_env
+        from vibevoice.loading_indicator import LoadingIndicator
+        from vibevoice.telemetry import telemetry, trace_of
+
     # Configuration from environment variables
     key_label = os.environ.get("VOICEKEY", "cmd_r")
+    command_key_label = os.environ.get("VOICEKEY_CMD", "scroll_lock")
     model_size = os.environ.get("WHISPER_MODEL", "small")
     language = os.environ.get("WHISPER_LANGUAGE", None)
+    warmup_seconds = float(os.environ.get("WHISPER_WARMUP_SECONDS", "1.0"))
+    backend = os.environ.get("WHISPER_BACKEND") or default_backend_name()
+    max_batch_size = int(os.environ.get("WHISPER_BATCH_SIZE", "4"))
+    max_batch_wait = float(os.environ.get("WHISPER_BATCH_WAIT_MS", "20")) / 1000
+    partials = os.environ.get("VIBEVOICE_PARTIALS", "false").lower() == "true"
+    partial_interval = float(os.environ.get("VIBEVOICE_PARTIAL_INTERVAL_MS", "300")) / 1000
+    adaptive = os.environ.get("VIBEVOICE_ADAPTIVE", "false").lower() == "true"
+    telemetry.configure(os.environ.get("VIBEVOICE_TELEMETRY_FILE"))
+
+    # Initialize the Whisper transcriber (MLX on Apple Silicon, faster-whisper elsewhere)
+    transcriber = None
+    controller = None  # ModelController when VIBEVOICE_ADAPTIVE is on
+    load_error = None
+    transcriber_ready = threading.Event()
+    backend_options = backend_options_from_env()
+    cache = cache_from_env("VIBEVOICE")
+
+    def load_transcriber():
+        nonlocal transcriber, controller, load_error
+        try:
+            print(f"Initializing Whisper (backend: {backend}, model: {model_size})...")
+            with profile.step(f"import {backend} engine"):
+                importlib.import_module("mlx_whisper" if backend == "mlx" else "faster_whisper")
+            transcriber = StreamingTranscriber(
+                model_size=model_size,
+                language=language,
+                warmup_seconds=warmup_seconds,
+                backend=backend,
+                backend_options=backend_options,
+                cache=cache,
+            )
+            profile.record("model load", transcriber.load_time)
+            if transcriber.warmup_decode_s is not None:
+                profile.record("warm-up decode", transcriber.warmup_decode_s)
+            print(f"Model loaded successfully! (load {transcriber.load_time:.2f}s", end="")
+            if transcriber.warmup_decode_s is not None:
+                print(f", warm-up decode {transcriber.warmup_decode_s:.2f}s", end="")
+            print(")")
+            if adaptive:
+                from vibevoice.model_controller import ModelController, decode_levels
+
+                controller = ModelController.from_env(decode_levels(model_size, transcriber))
+        except Exception as e:
+            load_error = e
+            print(f"Failed to load the Whisper model: {e}")
+        finally:
+            transcriber_ready.set()
+
+        if controller is not None:
+            load_fallback_models()
+
+    def load_fallback_models():
+        """Preload the smaller models the controller can fall back to, while dictation runs."""
+        from vibevoice.model_controller import fallback_sizes
+
+        for size in fallback_sizes(model_size, list(StreamingTranscriber.MODELS)):
+            try:
+                fallback = StreamingTranscriber(
+                    model_size=size,
+                    language=language,
+                    warmup_seconds=warmup_seconds,
+                    backend=backend,
+                    backend_options=backend_options,
+                    cache=cache,
+                )
+            except Exception as e:
+                print(f"Failed to load fallback model {size}: {e}")
+                continue
+            controller.add_level(size, fallback)
+            print(f"Fallback model {size} ready (load {fallback.load_time:.2f}s)")
+
+    loader = threading.Thread(target=load_transcriber, name="model-loader", daemon=True)
+    loader.start()
+
+    def get_transcriber() -> StreamingTranscriber:
+        """The loaded transcriber, waiting for the background load if needed."""
+        transcriber_ready.wait()
+        if load_error is not None:
+            raise load_error
+        return controller.current if controller is not None else transcriber
+
+    def observe_decode(phrases: list, decode_s: float):
+        """Report a decode to the adaptive controller with the number of phrases still queued."""
+        if controller is not None:
+            audio_s = sum(len(phrase) for phrase in phrases) / 16000
+            controller.observe(audio_s, decode_s, audio_capture.phrase_queue.qsize())
+
+    with profile.step("import pynput"):
+        from pynput.keyboard import Key, Listener
+    with profile.step("import sounddevice"):
+        import sounddevice  # noqa: F401 (PortAudio initialization)
+    from vibevoice.output_sinks import TypingQueue, create_sink
+    with profile.step("import command mode"):
+        from vibevoice.command_mode import CommandMode
+        from vibevoice.screenshot import ScreenshotPrefetcher
 
     RECORD_KEY = Key[key_label]
-    keyboard_controller = KeyboardController()
+    COMMAND_KEY = Key.__members__.get(command_key_label)
+    if COMMAND_KEY is None:
+        print(f"Key {command_key_label} is not available on this platform, AI command mode disabled (set VOICEKEY_CMD)")
+    # Text is emitted on its own thread so decoding never waits for keystrokes
+    typing_queue = TypingQueue(create_sink())
+    command_mode = CommandMode(typing_queue)
+    screenshots = ScreenshotPrefetcher.from_env() if COMMAND_KEY is not None else None
     loading_indicator = LoadingIndicator()
 
-    # Initialize MLX Whisper transcriber (M1 optimized)
-    print(f"Initializing MLX Whisper (model: {model_size})...")
-    transcriber = StreamingTranscriber(model_size=model_size, language=language)
-    print("Model loaded successfully!")
-
     # Initialize streaming audio capture
     audio_capture = StreamingAudioCapture(sample_rate=16000, channels=1)
 
     recording = False
+    command_recording = False  # The current recording is a spoken AI command
     transcription_lock = threading.Lock()
     stop_streaming = False
+    typed_context = ""  # Recent typed text, used as prompt for partial decoding
+    open_partial = None  # Partial session still open when the recording ended
+
+    def type_text(text: str, tag: str, on_done=None):
+        """Queue transcribed text for output at the cursor."""
+        nonlocal typed_context
+        print(f"[{tag}] {text}")
+        typing_queue.put(text + " ", on_done)
+        typed_context = (typed_context + " " + text)[-200:]
+
+    def deliver(phrase: np.ndarray, text: str, decode_s: float, tag: str):
+        """Queue a phrase's text and close its latency trace once it is typed."""
+        trace = trace_of(phrase)
+        if trace is not None:
+            trace.decode_s = decode_s
+            trace.chars = len(text)
+        queued_at = time.perf_counter()
+
+        def finish():
+            if trace is not None:
+                trace.typing_s = time.perf_counter() - queued_at
+                telemetry.finish_phrase(trace)
+
+        if text:
+            type_text(text, tag, on_done=finish)
+        else:
+            finish()
 
     def transcribe_phrase(audio_phrase: np.ndarray) -> str:
         """Transcribe a single audio phrase."""
         try:
-            audio_float32 = StreamingTranscriber.normalize_audio(audio_phrase)
-            return transcriber.transcribe(audio_float32)
+            return get_transcriber().transcribe(audio_phrase)
         except Exception as e:
             print(f"Transcription error: {e}")
             return ""
 
-    def stream_worker():
-        """Background thread that processes phrases while recording."""
-        nonlocal recording
-
-        while recording:
-            # Check for new phrases
-            phrases = audio_capture.get_pending_phrases()
-
-            for phrase in phrases:
-                if len(phrase) > 1000:  # Only transcribe if > ~60ms of audio
-                    # Transcribe in background
-                    result = transcribe_phrase(phrase)
-
-                    if result:
-                        # Type the text immediately
-                        print(f"[STREAM] {result}")
-                        keyboard_controller.type(result + " ")
+    def transcribe_phrases(audio_phrases: list) -> list:
+        """Transcribe several phrases as one batch, preserving order."""
+        try:
+            return get_transcriber().transcribe_batch(audio_phrases)
+        except Exception as e:
+            print(f"Transcription error: {e}")
+            return [""] * len(audio_phrases)
 
-            # Sleep briefly to avoid busy-waiting
-            time.sleep(0.05)
+    def stream_worker():
+        """Background thread that transcribes phrases as soon as they are segmented."""
+        while True:
+            # Block until the next phrase(s); None marks the end of the recording
+            phrases = audio_capture.get_phrase_batch(max_batch_size, max_batch_wait)
+            if phrases is None:
+                break
+
+            # Only transcribe if > ~60ms of audio
+            phrases = [phrase for phrase in phrases if len(phrase) > 1000]
+            if not phrases:
+                continue
+
+            # Transcribe in background, typing results in phrase order
+            decode_start = time.perf_counter()
+            results = transcribe_phrases(phrases)
+            decode_s = time.perf_counter() - decode_start
+            observe_decode(phrases, decode_s)
+            for phrase, result in zip(phrases, results):
+                # Type the text immediately
+                deliver(phrase, result, decode_s, "STREAM")
+
+    def partial_worker():
+        """
+        Background thread that types stable words while a phrase is still spoken.
+
+        Between phrases it re-decodes the open utterance every
+        partial_interval and types only the words committed by local
+        agreement; when the phrase closes, the rest of it is typed.
+        """
+        nonlocal open_partial
+        session = None
+        session_start = None
+
+        while True:
+            try:
+                phrase = audio_capture.get_phrase(timeout=partial_interval)
+            except Empty:
+                opened = audio_capture.get_open_phrase()
+                if opened is None:
+                    continue
+                start, audio = opened
+                if session is not None and start != session_start:
+                    continue  # The previous phrase has not been delivered yet
+                if len(audio) < 8000:  # Wait for ~0.5s of speech
+                    continue
+                try:
+                    if session is None:
+                        session = get_transcriber().start_partial(context=typed_context)
+                        session_start = start
+                    delta = session.update(audio)
+                except Exception as e:
+                    print(f"Transcription error: {e}")
+                    continue
+                if delta:
+                    type_text(delta, "PARTIAL")
+                continue
+
+            if phrase is audio_capture.END_OF_RECORDING:
+                break
+
+            decode_start = time.perf_counter()
+            if session is not None:
+                try:
+                    result = session.finish(phrase)
+                except Exception as e:
+                    print(f"Transcription error: {e}")
+                    result = ""
+                session = None
+            elif len(phrase) > 1000:  # Only transcribe if > ~60ms of audio
+                result = transcribe_phrase(phrase)
+            else:
+                result = ""
+
+            decode_s = time.perf_counter() - decode_start
+            if result:
+                observe_decode([phrase], decode_s)
+            deliver(phrase, result, decode_s, "STREAM")
+
+        open_partial = session
 
     streaming_thread = None
+    finalize_thread = None  # Finishes the last recording off the key listener thread
+
+    def finalize_command(remaining_audio: np.ndarray):
+        """Transcribe a spoken AI command and hand it to command mode."""
+        # Every phrase of the command, in order, then the in-flight tail
+        phrases = [p for p in audio_capture.get_pending_phrases() + [remaining_audio] if len(p) > 1000]
+        if not phrases:
+            return
+        loading_indicator.show(message="Transcribing command...")
+        prompt = " ".join(text for text in transcribe_phrases(phrases) if text).strip()
+        loading_indicator.hide()
+        screenshot = screenshots.result() if screenshots is not None else None
+        # Generation and typing run on the command thread
+        command_mode.submit(prompt, images=[screenshot] if screenshot else None)
+
+    def finalize_recording(worker_thread: threading.Thread, remaining_audio: np.ndarray):
+        """Wait for the streaming worker, then transcribe and type the last utterance."""
+        nonlocal open_partial
+
+        # The worker exits after the end-of-recording marker, which can take
+        # until the model has loaded
+        worker_thread.join()
+
+        decode_start = time.perf_counter()
+        if open_partial is not None:
+            # Part of the last utterance is already typed: finish it
+            try:
+                result = open_partial.finish(remaining_audio)
+            except Exception as e:
+                print(f"Transcription error: {e}")
+                result = ""
+            open_partial = None
+            deliver(remaining_audio, result, time.perf_counter() - decode_start, "FINAL")
+
+        elif len(remaining_audio) > 1000:
+            loading_indicator.show(message="Final transcription...")
+
+            result = transcribe_phrase(remaining_audio)
+
+            loading_indicator.hide()
+
+            deliver(remaining_audio, result, time.perf_counter() - decode_start, "FINAL")
+
+    def start_finalize(target, *args):
+        """Run the end of a recording on its own thread so key handling never waits on decoding."""
+        nonlocal finalize_thread
+        finalize_thread = threading.Thread(target=target, args=args, name="finalize", daemon=True)
+        finalize_thread.start()
 
     def on_press(key):
         """Handle key press events."""
-        nonlocal recording, streaming_thread, stop_streaming
+        nonlocal recording, command_recording, streaming_thread, stop_streaming, open_partial
+
+        if finalize_thread is not None and finalize_thread.is_alive():
+            # A new recording would drop the phrases the last one has not transcribed yet
+            return
+
+        if COMMAND_KEY is not None and key == COMMAND_KEY and not recording:
+            recording = True
+            command_recording = True
+            # The screenshot is captured and encoded, and Ollama loads the
+            # model if needed, while the command is spoken
+            if screenshots is not None:
+                screenshots.start()
+            command_mode.warm_up_async()
+            audio_capture.start_recording()
+            print("Listening for a command...")
+            play_start_sound()
 
-        if key == RECORD_KEY and not recording:
+        elif key == RECORD_KEY and not recording:
             recording = True
+            open_partial = None
             stop_streaming = False
             audio_capture.start_recording()
             print("Listening... (text will appear as you speak)")
@@ -134,14 +524,22 @@ def main():
             play_start_sound()
 
             # Start streaming worker thread
-            streaming_thread = threading.Thread(target=stream_worker, daemon=True)
+            worker = partial_worker if partials else stream_worker
+            streaming_thread = threading.Thread(target=worker, daemon=True)
             streaming_thread.start()
 
     def on_release(key):
         """Handle key release events."""
-        nonlocal recording, stop_streaming, streaming_thread
+        nonlocal recording, command_recording, stop_streaming
 
-        if key == RECORD_KEY and recording:
+        if command_recording and key == COMMAND_KEY:
+            recording = False
+            command_recording = False
+            play_stop_sound()
+
+            start_finalize(finalize_command, audio_capture.stop_recording())
+
+        elif key == RECORD_KEY and recording and not command_recording:
             recording = False
             stop_streaming = True
             print("Finalizing...")
@@ -149,48 +547,48 @@ def main():
             # Play stop sound
             play_stop_sound()
 
-            # Wait for streaming thread to finish
-            if streaming_thread:
-                streaming_thread.join(timeout=1.0)
-
-            # Get any remaining audio and transcribe
+            # Flush pending phrases; only the in-flight utterance comes back
             remaining_audio = audio_capture.stop_recording()
-
-            if len(remaining_audio) > 1000:
-                loading_indicator.show(message="Final transcription...")
-
-                result = transcribe_phrase(remaining_audio)
-
-                loading_indicator.hide()
-
-                if result:
-                    # Check if this was already transcribed
-                    print(f"[FINAL] {result}")
-                    keyboard_controller.type(result + " ")
+            start_finalize(finalize_recording, streaming_thread, remaining_audio)
 
     # Create audio stream with callback
-    audio_stream = audio_capture.create_stream(
-        callback=audio_capture.get_callback(),
-        sample_rate=16000,
-        channels=1
-    )
+    with profile.step("open audio stream"):
+        audio_stream = audio_capture.create_stream(
+            callback=audio_capture.get_callback(),
+            sample_rate=16000,
+            channels=1
+        )
+        audio_stream.start()
+
+    # Start keyboard listener; key presses record right away, even while the model loads
+    with profile.step("start keyboard listener"):
+        listener = Listener(on_press=on_press, on_release=on_release)
+        listener.start()
 
     try:
+        transcriber_ready.wait()
+        if load_error is not None:
+            return
+
         print(f"vibevoice is ready for real-time streaming!")
         print(f"Model: {model_size} | Hold {key_label} to speak")
+        if COMMAND_KEY is not None:
+            print(f"Hold {command_key_label} to ask {command_mode.client.model}")
         print("Press Ctrl+C to quit.")
+        if profile_startup:
+            print(profile.report())
         print("-" * 50)
 
-        # Start keyboard listener and audio stream
-        with Listener(on_press=on_press, on_release=on_release) as listener:
-            with audio_stream:
-                listener.join()
+        listener.join()
 
     except KeyboardInterrupt:
         print("\nStopping vibevoice...")
     finally:
+        listener.stop()
         if audio_stream:
+            audio_stream.stop()
             audio_stream.close()
+        typing_queue.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,363 @@
+"""AI command mode: stream an Ollama response to the cursor as it is generated."""
+
+import json
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from vibevoice.telemetry import telemetry
+
+SYSTEM_PROMPT = (
+    "You are a voice assistant. The user speaks a question or an instruction, "
+    "possibly about the attached screenshot of their screen. Your answer is typed "
+    "at their cursor, so reply with only the text to insert: no preamble, no markdown."
+)
+
+
+class NDJSONParser:
+    """
+    Incremental newline-delimited JSON parser.
+
+    Network chunks are fed as they arrive; complete lines are decoded and
+    the trailing partial line is kept for the next chunk. Lines are found
+    with ``bytes.find`` on the pending buffer, so the cost is linear in the
+    bytes received however the stream is chunked. A line that is not valid
+    JSON is reported and skipped instead of ending the stream.
+    """
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self.bad_lines = 0
+
+    def feed(self, data: bytes) -> List[Dict]:
+        """
+        Add received bytes and decode every line completed by them.
+
+        Args:
+            data: Next chunk of the response body
+
+        Returns:
+            Decoded objects, in order (empty and malformed lines are skipped)
+        """
+        self._buffer += data
+        objects = []
+        start = 0
+        while True:
+            end = self._buffer.find(b"\n", start)
+            if end < 0:
+                break
+            self._decode(self._buffer[start:end], objects)
+            start = end + 1
+        del self._buffer[:start]
+        return objects
+
+    def flush(self) -> List[Dict]:
+        """Decode a final line that was not newline-terminated."""
+        objects = []
+        self._decode(self._buffer, objects)
+        self._buffer.clear()
+        return objects
+
+    def _decode(self, line: bytes, objects: List[Dict]):
+        line = line.strip()
+        if not line:
+            return
+        try:
+            obj = json.loads(line)
+        except ValueError as e:
+            self.bad_lines += 1
+            print(f"Skipping malformed JSON line ({e}): {bytes(line[:80])!r}")
+            return
+        if not isinstance(obj, dict):
+            self.bad_lines += 1
+            print(f"Skipping JSON line that is not an object: {bytes(line[:80])!r}")
+            return
+        objects.append(obj)
+
+
+class TokenBuffer:
+    """
+    Groups streamed tokens into words before handing them to the typing queue.
+
+    Sub-word tokens would each be a separate keystroke burst (or clipboard
+    paste); text is passed on once it reaches a word boundary, or when a
+    token arrives after the buffer has waited ``max_delay`` seconds, so long
+    runs without whitespace still show progress. Models put the space at the
+    start of a word's token (" word"), so a token starting with whitespace
+    first emits the word buffered before it.
+    """
+
+    def __init__(self, emit: Callable[[str], None], max_delay: float = 0.05):
+        """
+        Initialize the buffer.
+
+        Args:
+            emit: Called with each group of text (e.g. ``TypingQueue.put``)
+            max_delay: Time after which buffered text is emitted without a word boundary (s)
+        """
+        self.emit = emit
+        self.max_delay = max_delay
+        self._parts = []
+        self._since = None
+
+    def add(self, token: str):
+        """Buffer a token, emitting the buffer at a word boundary."""
+        if not token:
+            return
+        if token[0].isspace():
+            self.flush()
+        if not self._parts:
+            self._since = time.perf_counter()
+        self._parts.append(token)
+        if token[-1].isspace() or time.perf_counter() - self._since >= self.max_delay:
+            self.flush()
+
+    def flush(self):
+        """Emit whatever is buffered."""
+        if self._parts:
+            self.emit("".join(self._parts))
+            self._parts = []
+
+
+class CommandResult:
+    """Response text and timing of one command."""
+
+    def __init__(self):
+        self.text = ""
+        self.ttft = None            # Request sent to first token (s)
+        self.total = None           # Request sent to last chunk (s)
+        self.tokens = 0             # Generated tokens (eval_count, else streamed chunks)
+        self.tokens_per_second = None
+        self.load_duration = None   # Model load time reported by Ollama (s)
+
+    def summary(self) -> str:
+        """One-line timing report."""
+        parts = [f"{self.tokens} tokens"]
+        if self.ttft is not None:
+            parts.append(f"first token {self.ttft * 1000:.0f}ms")
+        if self.tokens_per_second is not None:
+            parts.append(f"{self.tokens_per_second:.1f} tok/s")
+        if self.load_duration:
+            parts.append(f"model load {self.load_duration:.2f}s")
+        return ", ".join(parts)
+
+
+class OllamaClient:
+    """
+    Streaming client for Ollama's ``/api/generate`` over one pooled HTTP session.
+
+    The session keeps its connection to Ollama open between commands, so a
+    command does not pay for a new TCP connection, and every request passes
+    ``keep_alive`` so the model stays loaded between commands.
+    """
+
+    def __init__(
+        self,
+        url: Optional[str] = None,
+        model: Optional[str] = None,
+        keep_alive: Optional[str] = None,
+        timeout: float = 120.0,
+    ):
+        """
+        Initialize the client.
+
+        Args:
+            url: Ollama base URL (default: $OLLAMA_URL or http://localhost:11434)
+            model: Model name (default: $OLLAMA_MODEL or gemma3:27b)
+            keep_alive: How long Ollama keeps the model loaded (default: $OLLAMA_KEEP_ALIVE or 30m)
+            timeout: Read timeout between response chunks (s)
+        """
+        self.url = (url or os.environ.get("OLLAMA_URL", "http://localhost:11434")).rstrip("/")
+        self.model = model or os.environ.get("OLLAMA_MODEL", "gemma3:27b")
+        self.keep_alive = keep_alive or os.environ.get("OLLAMA_KEEP_ALIVE", "30m")
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=2)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def warm_up(self) -> Optional[float]:
+        """
+        Ask Ollama to load the model now (a generate request without a prompt).
+
+        Returns:
+            Seconds taken, or None if Ollama could not be reached
+        """
+        start = time.perf_counter()
+        try:
+            response = self.session.post(
+                f"{self.url}/api/generate",
+                json={"model": self.model, "keep_alive": self.keep_alive},
+                timeout=(5, self.timeout),
+            )
+            response.raise_for_status()
+        except requests.RequestException as e:
+            print(f"Ollama warm-up failed: {e}")
+            return None
+        return time.perf_counter() - start
+
+    def generate(
+        self,
+        prompt: str,
+        images: Optional[List[str]] = None,
+        system: Optional[str] = SYSTEM_PROMPT,
+        on_token: Optional[Callable[[str], None]] = None,
+    ) -> CommandResult:
+        """
+        Stream a completion, passing each token to ``on_token`` as it arrives.
+
+        Args:
+            prompt: User prompt (the spoken command)
+            images: Base64-encoded images for vision models
+            system: System prompt (None uses the model's own)
+            on_token: Called on this thread with every non-empty token
+
+        Returns:
+            CommandResult with the full text and timings
+
+        Raises:
+            requests.RequestException: If the request fails
+            RuntimeError: If Ollama reports an error in the stream
+        """
+        payload = {"model": self.model, "prompt": prompt, "stream": True, "keep_alive": self.keep_alive}
+        if system:
+            payload["system"] = system
+        if images:
+            payload["images"] = images
+
+        result = CommandResult()
+        parser = NDJSONParser()
+        parts = []
+        start = time.perf_counter()
+        first = None
+
+        with self.session.post(
+            f"{self.url}/api/generate", json=payload, stream=True, timeout=(5, self.timeout)
+        ) as response:
+            response.raise_for_status()
+            # chunk_size=None yields data as soon as it arrives, whatever its size
+            chunks = response.iter_content(chunk_size=None)
+            for chunk in _with_final(chunks, parser):
+                if "error" in chunk:
+                    raise RuntimeError(chunk["error"])
+                token = chunk.get("response", "")
+                if token:
+                    if first is None:
+                        first = time.perf_counter()
+                        result.ttft = first - start
+                    result.tokens += 1
+                    parts.append(token)
+                    if on_token is not None:
+                        on_token(token)
+                if chunk.get("done"):
+                    # Keep reading to the end of the body so the connection returns to the pool
+                    _read_final_stats(chunk, result)
+
+        end = time.perf_counter()
+        result.total = end - start
+        result.text = "".join(parts)
+        if result.tokens_per_second is None and first is not None and result.tokens > 1 and end > first:
+            result.tokens_per_second = (result.tokens - 1) / (end - first)
+
+        if result.ttft is not None:
+            telemetry.observe("command_first_token", result.ttft)
+        telemetry.observe("command_total", result.total)
+        telemetry.count("command_tokens", result.tokens)
+        return result
+
+    def close(self):
+        """Close the pooled connection."""
+        self.session.close()
+
+
+def _with_final(chunks, parser: NDJSONParser):
+    """Objects decoded from a stream of byte chunks, including an unterminated last line."""
+    for data in chunks:
+        yield from parser.feed(data)
+    yield from parser.flush()
+
+
+def _read_final_stats(chunk: Dict, result: CommandResult):
+    """Take token counts and durations (nanoseconds) from Ollama's final chunk."""
+    if chunk.get("eval_count"):
+        result.tokens = chunk["eval_count"]
+        if chunk.get("eval_duration"):
+            result.tokens_per_second = chunk["eval_count"] / (chunk["eval_duration"] / 1e9)
+    if chunk.get("load_duration"):
+        result.load_duration = chunk["load_duration"] / 1e9
+
+
+class CommandMode:
+    """
+    Runs spoken commands through Ollama and types the answer as it streams in.
+
+    Commands run one at a time on a background thread, so the keyboard
+    listener is never blocked by generation.
+    """
+
+    def __init__(self, typing_queue, client: Optional[OllamaClient] = None):
+        """
+        Initialize command mode.
+
+        Args:
+            typing_queue: TypingQueue the response is typed through
+            client: Ollama client (default: configured from the environment)
+        """
+        self.typing_queue = typing_queue
+        self.client = client or OllamaClient()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def warm_up_async(self):
+        """Load the model in Ollama in the background."""
+        threading.Thread(target=self.client.warm_up, name="ollama-warmup", daemon=True).start()
+
+    def submit(self, prompt: str, images: Optional[List[str]] = None):
+        """
+        Run a command in the background (ignored while another one is running).
+
+        Args:
+            prompt: Transcribed command
+            images: Base64-encoded screenshots to attach
+        """
+        if not prompt.strip():
+            return
+        if self._thread is not None and self._thread.is_alive():
+            print("A command is still running, ignoring")
+            return
+        self._thread = threading.Thread(target=self.run, args=(prompt, images), name="command", daemon=True)
+        self._thread.start()
+
+    def run(self, prompt: str, images: Optional[List[str]] = None) -> Optional[CommandResult]:
+        """
+        Run one command, typing the response as it streams in.
+
+        Args:
+            prompt: Transcribed command
+            images: Base64-encoded screenshots to attach
+
+        Returns:
+            CommandResult, or None if the request failed
+        """
+        with self._lock:
+            print(f"[COMMAND] {prompt}")
+            buffer = TokenBuffer(self.typing_queue.put)
+            try:
+                result = self.client.generate(prompt, images=images, on_token=buffer.add)
+            except (requests.RequestException, RuntimeError) as e:
+                buffer.flush()
+                print(f"Ollama error: {e}")
+                return None
+            buffer.flush()
+            print(f"[COMMAND] {result.summary()}")
+            return result
+
+    def join(self):
+        """Wait for the running command, if any."""
+        if self._thread is not None:
+            self._thread.join()
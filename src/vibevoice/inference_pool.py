@@ -0,0 +1,241 @@
+"""Bounded worker pool with dynamic request batching for the transcription server."""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Callable, Hashable, List
+
+import numpy as np
+
+from vibevoice.telemetry import telemetry
+
+
+class QueueFullError(Exception):
+    """Raised when the pool cannot accept more work (backpressure)."""
+
+
+class LatencyStats:
+    """Thread-safe request counters with a sliding window for rate and percentiles."""
+
+    def __init__(self, window_seconds: float = 60.0, max_samples: int = 10000):
+        """
+        Initialize the stats.
+
+        Args:
+            window_seconds: Time window for requests/sec and latency percentiles
+            max_samples: Maximum number of latencies kept in the window
+        """
+        self.window_seconds = window_seconds
+        self._samples = deque(maxlen=max_samples)  # (finish time, latency seconds)
+        self._lock = threading.Lock()
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    def record(self, latency: float, ok: bool = True):
+        """Record one finished request."""
+        with self._lock:
+            self._samples.append((time.monotonic(), latency))
+            if ok:
+                self.completed += 1
+            else:
+                self.failed += 1
+
+    def record_rejected(self):
+        """Record one request turned away because the queue was full."""
+        with self._lock:
+            self.rejected += 1
+
+    def snapshot(self) -> dict:
+        """
+        Get current counters.
+
+        Returns:
+            Dict with totals, requests_per_sec and p50/p99 latency in ms over the window
+        """
+        now = time.monotonic()
+        with self._lock:
+            recent = [latency for t, latency in self._samples if now - t <= self.window_seconds]
+            stats = {
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+            }
+
+        stats["requests_per_sec"] = len(recent) / self.window_seconds
+        if recent:
+            stats["p50_ms"] = float(np.percentile(recent, 50) * 1000)
+            stats["p99_ms"] = float(np.percentile(recent, 99) * 1000)
+        else:
+            stats["p50_ms"] = stats["p99_ms"] = None
+        return stats
+
+
+class InferencePool:
+    """
+    Runs model calls on a fixed set of worker threads behind a bounded queue.
+
+    Plain jobs (``submit``) run one at a time per worker. Batchable jobs
+    (``submit_batched``) that share a batch key are grouped: a worker that
+    picks one up collects further queued jobs with the same key, waiting at
+    most ``max_wait`` for the batch to fill, and hands them to ``batch_fn``
+    in one call. Jobs with other keys stay in the shared queue for the other
+    workers, so the queue depth always counts every job not yet started.
+    When the queue is full, submissions raise QueueFullError so the caller
+    can answer with 503 instead of piling up work.
+    """
+
+    def __init__(
+        self,
+        batch_fn: Callable[[Hashable, List], List],
+        workers: int = 1,
+        queue_size: int = 16,
+        max_batch_size: int = 4,
+        max_wait: float = 0.01,
+    ):
+        """
+        Initialize and start the pool.
+
+        Args:
+            batch_fn: Called as batch_fn(key, items) and returns one result per item
+            workers: Number of worker threads (concurrent model calls)
+            queue_size: Maximum number of queued jobs before rejecting
+            max_batch_size: Maximum number of jobs grouped into one batch
+            max_wait: Time a worker waits for a batch to fill (seconds)
+        """
+        self.batch_fn = batch_fn
+        self.workers = workers
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.queue_size = queue_size
+
+        # (key, item, future, queued_at) in arrival order, shared by all workers
+        self._jobs = deque()
+        self._cond = threading.Condition()
+        self.stats = LatencyStats()
+        self.batches = 0
+        self.batched_jobs = 0
+
+        self._threads = []
+        for i in range(workers):
+            thread = threading.Thread(target=self._run, name=f"inference-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of jobs waiting for a worker."""
+        with self._cond:
+            return len(self._jobs)
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        """
+        Queue a plain job.
+
+        Raises:
+            QueueFullError: If the queue is full
+        """
+        return self._enqueue((None, (fn, args, kwargs)))
+
+    def submit_batched(self, key: Hashable, item) -> Future:
+        """
+        Queue an item that may be batched with others sharing ``key``.
+
+        Raises:
+            QueueFullError: If the queue is full
+        """
+        return self._enqueue((key, item))
+
+    def get_stats(self) -> dict:
+        """Latency and throughput counters plus queue and batching state."""
+        stats = self.stats.snapshot()
+        stats.update(
+            workers=self.workers,
+            queue_depth=self.queue_depth,
+            batches=self.batches,
+            avg_batch_size=self.batched_jobs / self.batches if self.batches else None,
+        )
+        return stats
+
+    def _enqueue(self, job) -> Future:
+        future = Future()
+        with self._cond:
+            if len(self._jobs) >= self.queue_size:
+                self.stats.record_rejected()
+                raise QueueFullError("Inference queue is full")
+            self._jobs.append((job[0], job[1], future, time.monotonic()))
+            # Wake idle workers and workers waiting for their batch to fill
+            self._cond.notify_all()
+        return future
+
+    def _run(self):
+        """Worker loop."""
+        while True:
+            with self._cond:
+                while not self._jobs:
+                    self._cond.wait()
+                job = self._jobs.popleft()
+                key = job[0]
+                batch = [job]
+                if key is not None:
+                    deadline = time.monotonic() + self.max_wait
+                    while True:
+                        self._take_matching(key, batch)
+                        remaining = deadline - time.monotonic()
+                        if len(batch) >= self.max_batch_size or remaining <= 0:
+                            break
+                        self._cond.wait(remaining)
+
+            if key is None:
+                self._run_plain(job)
+            else:
+                self._run_batch(key, batch)
+
+    def _take_matching(self, key, batch: List):
+        """Move queued jobs with ``key`` into ``batch``, leaving the others queued (lock held)."""
+        if len(batch) >= self.max_batch_size or not any(job[0] == key for job in self._jobs):
+            return
+        others = deque()
+        for job in self._jobs:
+            if job[0] == key and len(batch) < self.max_batch_size:
+                batch.append(job)
+            else:
+                others.append(job)
+        self._jobs = others
+
+    def _run_plain(self, job):
+        _, (fn, args, kwargs), future, queued_at = job
+        if not future.set_running_or_notify_cancel():
+            return
+        started = time.monotonic()
+        telemetry.observe("inference_queue_wait", started - queued_at)
+        try:
+            future.set_result(fn(*args, **kwargs))
+            self.stats.record(time.monotonic() - queued_at)
+        except Exception as e:
+            future.set_exception(e)
+            self.stats.record(time.monotonic() - queued_at, ok=False)
+        telemetry.observe("inference_run", time.monotonic() - started)
+
+    def _run_batch(self, key, batch):
+        batch = [job for job in batch if job[2].set_running_or_notify_cancel()]
+        if not batch:
+            return
+        self.batches += 1
+        self.batched_jobs += len(batch)
+        started = time.monotonic()
+        for job in batch:
+            telemetry.observe("inference_queue_wait", started - job[3])
+        try:
+            results = self.batch_fn(key, [job[1] for job in batch])
+        except Exception as e:
+            for job in batch:
+                job[2].set_exception(e)
+                self.stats.record(time.monotonic() - job[3], ok=False)
+            return
+        finally:
+            telemetry.observe("inference_run", time.monotonic() - started)
+        for job, result in zip(batch, results):
+            job[2].set_result(result)
+            self.stats.record(time.monotonic() - job[3])
@@ -0,0 +1,204 @@
+"""Adaptive model selection: step down to cheaper models when decoding falls behind real time."""
+
+import os
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional
+
+from vibevoice.telemetry import telemetry
+
+
+class ModelController:
+    """
+    Chooses which preloaded transcriber decodes the next phrases.
+
+    Levels are ordered from the most accurate to the cheapest. After every
+    decode the worker reports the audio length, the decode time and the
+    number of phrases still waiting. The controller steps down one level when
+    the recent real-time factor (decode time / audio time) exceeds
+    ``downgrade_rtf`` or the backlog exceeds ``max_backlog``, and steps back
+    up when the RTF has stayed below ``upgrade_rtf`` with an empty queue.
+
+    Hysteresis: the two RTF thresholds are apart, each decision needs a full
+    window of observations on the current level (two when the backlog is
+    over the limit), and a level that was left for lagging is not retried
+    for ``cooldown_s``. Every switch is kept in ``decisions``, printed and
+    written to the telemetry JSONL file.
+    """
+
+    def __init__(
+        self,
+        levels: List,
+        downgrade_rtf: float = 0.8,
+        upgrade_rtf: float = 0.35,
+        max_backlog: int = 2,
+        window: int = 4,
+        cooldown_s: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Initialize the controller.
+
+        Args:
+            levels: (name, transcriber) pairs, most accurate first
+            downgrade_rtf: Mean RTF above which the next cheaper level is used
+            upgrade_rtf: Mean RTF below which the next better level is tried
+            max_backlog: Queued phrases above which the next cheaper level is used
+            window: Observations averaged per decision
+            cooldown_s: Time before returning to a level that was left for lagging
+            clock: Time source (seconds)
+        """
+        if not levels:
+            raise ValueError("At least one level is required")
+        if upgrade_rtf >= downgrade_rtf:
+            raise ValueError("upgrade_rtf must be below downgrade_rtf")
+
+        self.levels = list(levels)
+        self.downgrade_rtf = downgrade_rtf
+        self.upgrade_rtf = upgrade_rtf
+        self.max_backlog = max_backlog
+        self.window = window
+        self.cooldown_s = cooldown_s
+        self.clock = clock
+
+        self.level = 0
+        self.decisions: Deque[Dict] = deque(maxlen=200)
+        self._rtfs: Deque[float] = deque(maxlen=window)
+        self._left_at: Dict[int, float] = {}  # Level -> when it was left for lagging
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, levels: List) -> "ModelController":
+        """
+        Build a controller with thresholds from VIBEVOICE_ADAPTIVE_* variables.
+
+        Args:
+            levels: (name, transcriber) pairs, most accurate first
+
+        Returns:
+            ModelController
+        """
+        return cls(
+            levels,
+            downgrade_rtf=float(os.environ.get("VIBEVOICE_ADAPTIVE_DOWN_RTF", "0.8")),
+            upgrade_rtf=float(os.environ.get("VIBEVOICE_ADAPTIVE_UP_RTF", "0.35")),
+            max_backlog=int(os.environ.get("VIBEVOICE_ADAPTIVE_MAX_BACKLOG", "2")),
+            window=int(os.environ.get("VIBEVOICE_ADAPTIVE_WINDOW", "4")),
+            cooldown_s=float(os.environ.get("VIBEVOICE_ADAPTIVE_COOLDOWN_S", "30")),
+        )
+
+    @property
+    def name(self) -> str:
+        """Name of the level in use."""
+        return self.levels[self.level][0]
+
+    @property
+    def current(self):
+        """Transcriber to use for the next decode."""
+        return self.levels[self.level][1]
+
+    def add_level(self, name: str, transcriber):
+        """Append a cheaper level, e.g. once a fallback model has loaded in the background."""
+        with self._lock:
+            self.levels.append((name, transcriber))
+
+    def observe(self, audio_s: float, decode_s: float, backlog: int = 0) -> Optional[Dict]:
+        """
+        Record one decode and switch levels if needed.
+
+        Args:
+            audio_s: Seconds of audio decoded
+            decode_s: Seconds the decode took
+            backlog: Phrases still waiting to be decoded
+
+        Returns:
+            The decision record when the level changed, else None
+        """
+        if audio_s <= 0:
+            return None
+        with self._lock:
+            self._rtfs.append(decode_s / audio_s)
+            telemetry.observe("model_rtf", decode_s / audio_s)
+            # A growing backlog is acted on sooner, but the current level still
+            # gets two decodes: the queue does not drain the moment it switches
+            needed = self.window if backlog <= self.max_backlog else min(2, self.window)
+            if len(self._rtfs) < needed:
+                return None
+            rtf = sum(self._rtfs) / len(self._rtfs)
+
+            if rtf > self.downgrade_rtf or backlog > self.max_backlog:
+                if self.level + 1 >= len(self.levels):
+                    return None
+                self._left_at[self.level] = self.clock()
+                reason = f"rtf {rtf:.2f} > {self.downgrade_rtf}" if rtf > self.downgrade_rtf else f"backlog {backlog} > {self.max_backlog}"
+                return self._switch(self.level + 1, reason, rtf, backlog)
+
+            if rtf < self.upgrade_rtf and backlog == 0 and self.level > 0:
+                left_at = self._left_at.get(self.level - 1)
+                if left_at is not None and self.clock() - left_at < self.cooldown_s:
+                    return None
+                return self._switch(self.level - 1, f"rtf {rtf:.2f} < {self.upgrade_rtf}", rtf, backlog)
+            return None
+
+    def _switch(self, level: int, reason: str, rtf: float, backlog: int) -> Dict:
+        decision = {
+            "type": "model_switch",
+            "time": time.time(),
+            "from": self.name,
+            "to": self.levels[level][0],
+            "reason": reason,
+            "rtf": rtf,
+            "backlog": backlog,
+        }
+        self.level = level
+        self._rtfs.clear()
+        self.decisions.append(decision)
+        telemetry.count("model_switches")
+        telemetry.record(decision)
+        print(f"Model: {decision['from']} -> {decision['to']} ({reason})")
+        return decision
+
+
+def decode_levels(model_size: str, transcriber) -> List:
+    """
+    Levels on the already loaded model: its own decoding, then greedy
+    decoding if the backend runs a beam search.
+
+    Args:
+        model_size: Size of the loaded model
+        transcriber: StreamingTranscriber holding it
+
+    Returns:
+        List of (name, transcriber) levels, most expensive first
+    """
+    levels = [(model_size, transcriber)]
+    backend = transcriber.backend
+    if backend.BEAM_SEARCH and backend.options.get("beam_size", 1) > 1:
+        # Cheaper decoding profile on the same model, no extra memory
+        levels.append((f"{model_size} beam 1", transcriber.with_options(beam_size=1)))
+    return levels
+
+
+def fallback_sizes(model_size: str, sizes: List[str]) -> List[str]:
+    """
+    Model sizes to preload as cheaper levels, from WHISPER_FALLBACK_MODELS.
+
+    Args:
+        model_size: Primary model size
+        sizes: All sizes, smallest first (e.g. ``StreamingTranscriber.MODELS``)
+
+    Returns:
+        Sizes smaller than ``model_size``, largest first; by default only the
+        next smaller size
+    """
+    rank = {size: i for i, size in enumerate(sizes)}
+    configured = os.environ.get("WHISPER_FALLBACK_MODELS")
+    if configured is None:
+        index = rank.get(model_size, 0)
+        return [sizes[index - 1]] if index > 0 else []
+    chosen = [size.strip() for size in configured.split(",") if size.strip()]
+    for size in chosen:
+        if size not in rank:
+            raise ValueError(f"Unknown fallback model {size}, use one of: {list(sizes)}")
+    return sorted((size for size in chosen if rank[size] < rank.get(model_size, 0)), key=rank.get, reverse=True)
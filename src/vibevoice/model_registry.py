@@ -0,0 +1,160 @@
+"""Lazily loaded, memory-bounded registry of Whisper models for the server."""
+
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from vibevoice.backends import FasterWhisperBackend
+
+
+class ModelRegistry:
+    """
+    Loads faster-whisper models by (size, compute_type, device) on first use.
+
+    Loaded models are kept in least-recently-used order. A model being loaded
+    reserves its estimated size against the memory budget until it is
+    loaded. When loading a model would exceed the budget, the least recently
+    used models are evicted first. Jobs already holding an evicted model keep
+    it alive until they finish.
+    """
+
+    # Approximate parameter counts (millions) per model size
+    MODEL_PARAMS_M = {
+        "tiny": 39,
+        "base": 74,
+        "small": 244,
+        "medium": 769,
+        "large": 1550,
+    }
+
+    # Approximate bytes per parameter per CTranslate2 compute type. "auto"
+    # and "default" resolve on load (the fastest type for the device, or the
+    # model's saved type), so they are budgeted as float32.
+    BYTES_PER_PARAM = {
+        "int8": 1,
+        "int8_float16": 1,
+        "int8_bfloat16": 1,
+        "int8_float32": 1,
+        "int16": 2,
+        "float16": 2,
+        "bfloat16": 2,
+        "float32": 4,
+        "auto": 4,
+        "default": 4,
+    }
+
+    # Devices CTranslate2 accepts
+    DEVICES = ("cpu", "cuda", "auto")
+
+    # Runtime buffers on top of the weights
+    OVERHEAD = 1.3
+
+    def __init__(self, memory_budget_mb: float = 4096, backend_options: Optional[Dict] = None):
+        """
+        Initialize the registry (no model is loaded yet).
+
+        Args:
+            memory_budget_mb: Total estimated memory the loaded models may use
+            backend_options: Engine options shared by all models (cpu_threads, num_workers, ...)
+        """
+        self.memory_budget_mb = memory_budget_mb
+        self.backend_options = dict(backend_options or {})
+
+        self._models: "OrderedDict[Tuple[str, str, str], FasterWhisperBackend]" = OrderedDict()
+        self._loading: Dict[Tuple[str, str, str], threading.Lock] = {}
+        self._reserved: Dict[Tuple[str, str, str], float] = {}  # Estimates of in-flight loads
+        self._lock = threading.Lock()
+        self.loads = 0
+        self.evictions = 0
+
+    @classmethod
+    def estimate_memory_mb(cls, size: str, compute_type: str) -> float:
+        """Estimated resident memory of one model in MB."""
+        params = cls.MODEL_PARAMS_M.get(size, cls.MODEL_PARAMS_M["large"])
+        return params * cls.BYTES_PER_PARAM.get(compute_type, 4) * cls.OVERHEAD
+
+    @property
+    def memory_used_mb(self) -> float:
+        """Estimated memory of the currently loaded models."""
+        return sum(self.estimate_memory_mb(size, compute_type) for size, compute_type, _ in self._models)
+
+    @property
+    def memory_reserved_mb(self) -> float:
+        """Estimated memory of the models being loaded."""
+        return sum(self._reserved.values())
+
+    def get(self, size: str, compute_type: str = "int8", device: str = "cpu") -> FasterWhisperBackend:
+        """
+        Get a loaded model, loading it (and evicting others) if needed.
+
+        Args:
+            size: Model size (tiny, base, small, medium, large)
+            compute_type: CTranslate2 compute type
+            device: "cpu", "cuda" or "auto"
+
+        Returns:
+            Loaded FasterWhisperBackend
+
+        Raises:
+            ValueError: If the model size, compute type or device is unknown
+        """
+        if size not in FasterWhisperBackend.MODELS:
+            raise ValueError(f"Model size must be one of: {list(FasterWhisperBackend.MODELS.keys())}")
+        if compute_type not in self.BYTES_PER_PARAM:
+            raise ValueError(f"Compute type must be one of: {list(self.BYTES_PER_PARAM.keys())}")
+        if device not in self.DEVICES:
+            raise ValueError(f"Device must be one of: {list(self.DEVICES)}")
+
+        key = (size, compute_type, device)
+        with self._lock:
+            if key in self._models:
+                self._models.move_to_end(key)
+                return self._models[key]
+            load_lock = self._loading.setdefault(key, threading.Lock())
+
+        # Load outside the registry lock so other models stay available;
+        # concurrent requests for the same model wait for one load.
+        with load_lock:
+            with self._lock:
+                if key in self._models:
+                    self._models.move_to_end(key)
+                    return self._models[key]
+                # Make room before loading to keep the peak within budget,
+                # counting other models still loading
+                needed = self.estimate_memory_mb(size, compute_type)
+                self._evict_for(needed)
+                self._reserved[key] = needed
+
+            try:
+                options = dict(self.backend_options, compute_type=compute_type, device=device)
+                engine = FasterWhisperBackend(size, **options)
+                print(f"Loading faster-whisper model: {size} ({compute_type}, {device})")
+                engine.load()
+            finally:
+                with self._lock:
+                    self._reserved.pop(key, None)
+                    self._loading.pop(key, None)
+
+            with self._lock:
+                self._models[key] = engine
+                self.loads += 1
+        return engine
+
+    def _evict_for(self, needed_mb: float):
+        """Evict least recently used models until ``needed_mb`` fits the budget next to in-flight loads."""
+        while self._models and self.memory_used_mb + self.memory_reserved_mb + needed_mb > self.memory_budget_mb:
+            key, _ = self._models.popitem(last=False)
+            self.evictions += 1
+            print(f"Evicting faster-whisper model: {key[0]} ({key[1]}, {key[2]})")
+
+    def stats(self) -> dict:
+        """Loaded models (most recently used last) and memory accounting."""
+        with self._lock:
+            return {
+                "loaded": ["/".join(key) for key in self._models],
+                "memory_used_mb": round(self.memory_used_mb),
+                "memory_reserved_mb": round(self.memory_reserved_mb),
+                "memory_budget_mb": self.memory_budget_mb,
+                "loads": self.loads,
+                "evictions": self.evictions,
+            }
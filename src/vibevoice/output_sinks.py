@@ -0,0 +1,292 @@
+"""Destinations for transcribed text: keystrokes, clipboard paste, stdout, files and sockets."""
+
+import codecs
+import os
+import platform
+import shutil
+import socket
+import subprocess
+import sys
+import threading
+import time
+from abc import ABC, abstractmethod
+from queue import Queue
+from typing import Callable, Optional
+
+
+class OutputSink(ABC):
+    """Where transcribed text goes. ``write`` may block; run it through a TypingQueue."""
+
+    @abstractmethod
+    def write(self, text: str):
+        """Emit ``text`` at the destination."""
+
+    def close(self):
+        pass
+
+
+class KeystrokeSink(OutputSink):
+    """
+    Types text character by character with pynput.
+
+    Works everywhere keystrokes do, but long texts take a while. With
+    ``chars_per_second`` set, characters are paced so slow applications do
+    not drop keystrokes.
+    """
+
+    def __init__(self, chars_per_second: float = 0):
+        """
+        Initialize the sink.
+
+        Args:
+            chars_per_second: Typing rate limit (0 types as fast as pynput can)
+        """
+        from pynput.keyboard import Controller
+
+        self.controller = Controller()
+        self.interval = 1.0 / chars_per_second if chars_per_second > 0 else 0
+
+    def write(self, text: str):
+        if not self.interval:
+            self.controller.type(text)
+            return
+        next_time = time.perf_counter()
+        for char in text:
+            delay = next_time - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            self.controller.type(char)
+            next_time += self.interval
+
+
+class ClipboardSink(OutputSink):
+    """
+    Inserts text in one step by putting it on the clipboard and pressing paste.
+
+    The previous clipboard text is restored after ``restore_delay`` seconds,
+    once the target application has read the pasted text.
+    """
+
+    # (copy command, paste command) per clipboard tool, in order of preference
+    TOOLS = {
+        "Darwin": [(["pbcopy"], ["pbpaste"])],
+        "Windows": [(
+            ["clip"],
+            # UTF-8 output without a trailing newline, so the clipboard restores unchanged
+            [
+                "powershell", "-NoProfile", "-Command",
+                "[Console]::OutputEncoding = New-Object Text.UTF8Encoding $false; "
+                "[Console]::Out.Write((Get-Clipboard -Raw))",
+            ],
+        )],
+        "Linux": [
+            (["wl-copy"], ["wl-paste", "--no-newline"]),
+            (["xclip", "-selection", "clipboard"], ["xclip", "-selection", "clipboard", "-o"]),
+            (["xsel", "--clipboard", "--input"], ["xsel", "--clipboard", "--output"]),
+        ],
+    }
+
+    def __init__(self, restore_delay: float = 0.3):
+        """
+        Initialize the sink.
+
+        Args:
+            restore_delay: Seconds to wait before restoring the previous clipboard (0 keeps the text)
+
+        Raises:
+            RuntimeError: If no clipboard tool is available
+        """
+        from pynput.keyboard import Controller, Key
+
+        system = platform.system()
+        for copy_cmd, paste_cmd in self.TOOLS.get(system, []):
+            if shutil.which(copy_cmd[0]):
+                self.copy_cmd, self.paste_cmd = copy_cmd, paste_cmd
+                break
+        else:
+            raise RuntimeError(f"No clipboard tool found for {system} (install wl-clipboard, xclip or xsel)")
+
+        self.controller = Controller()
+        self.modifier = Key.cmd if system == "Darwin" else Key.ctrl
+        self.restore_delay = restore_delay
+
+    def _get_clipboard(self) -> Optional[str]:
+        try:
+            result = subprocess.run(self.paste_cmd, capture_output=True, timeout=1)
+        except (OSError, subprocess.TimeoutExpired):
+            return None
+        return result.stdout.decode("utf-8", errors="replace") if result.returncode == 0 else None
+
+    def _set_clipboard(self, text: str):
+        if self.copy_cmd[0] == "clip":
+            # clip reads UTF-8 in the console code page; UTF-16LE with a BOM is taken as Unicode
+            data = codecs.BOM_UTF16_LE + text.encode("utf-16-le")
+        else:
+            data = text.encode("utf-8")
+        subprocess.run(self.copy_cmd, input=data, timeout=1, check=True)
+
+    def write(self, text: str):
+        previous = self._get_clipboard() if self.restore_delay else None
+        self._set_clipboard(text)
+        with self.controller.pressed(self.modifier):
+            self.controller.press("v")
+            self.controller.release("v")
+        if previous is not None:
+            time.sleep(self.restore_delay)
+            self._set_clipboard(previous)
+
+
+class StreamSink(OutputSink):
+    """Writes text to a file object (stdout by default) or appends it to a file path."""
+
+    def __init__(self, target=None):
+        """
+        Initialize the sink.
+
+        Args:
+            target: File path to append to, or a text stream (default: sys.stdout)
+        """
+        if isinstance(target, str):
+            self.stream = open(target, "a", encoding="utf-8")
+            self._owned = True
+        else:
+            self.stream = target or sys.stdout
+            self._owned = False
+
+    def write(self, text: str):
+        self.stream.write(text)
+        self.stream.flush()
+
+    def close(self):
+        if self._owned:
+            self.stream.close()
+
+
+class SocketSink(OutputSink):
+    """Sends UTF-8 text over TCP ("host:port") or a Unix socket (path), reconnecting on failure."""
+
+    def __init__(self, address: str, unix: bool = False):
+        """
+        Initialize the sink (connects on first write).
+
+        Args:
+            address: "host:port" for TCP, or a socket path for Unix sockets
+            unix: Whether ``address`` is a Unix socket path
+        """
+        self.address = address
+        self.unix = unix
+        self._sock = None
+
+    def _connect(self):
+        if self.unix:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.connect(self.address)
+        else:
+            host, port = self.address.rsplit(":", 1)
+            sock = socket.create_connection((host, int(port)), timeout=5)
+        return sock
+
+    def write(self, text: str):
+        data = text.encode("utf-8")
+        for attempt in range(2):
+            try:
+                if self._sock is None:
+                    self._sock = self._connect()
+                self._sock.sendall(data)
+                return
+            except OSError:
+                self.close()
+                if attempt:
+                    raise
+
+    def close(self):
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+
+class TypingQueue:
+    """
+    Emits text through a sink on a dedicated thread, in submission order.
+
+    ``put`` never waits for keystrokes, so transcription can move on to the
+    next phrase while the previous one is still being typed.
+    """
+
+    def __init__(self, sink: OutputSink):
+        self.sink = sink
+        self._queue = Queue()
+        self._thread = threading.Thread(target=self._run, name="typing", daemon=True)
+        self._thread.start()
+
+    def put(self, text: str, on_done: Optional[Callable[[], None]] = None):
+        """
+        Queue text for output.
+
+        Args:
+            text: Text to emit
+            on_done: Called on the typing thread once the text has been emitted
+        """
+        self._queue.put((text, on_done))
+
+    def flush(self):
+        """Block until everything queued so far has been emitted."""
+        self._queue.join()
+
+    def close(self):
+        """Emit what is queued, stop the thread and close the sink."""
+        self._queue.put(None)
+        self._thread.join()
+        self.sink.close()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                text, on_done = item
+                try:
+                    self.sink.write(text)
+                except Exception as e:
+                    print(f"Output error: {e}")
+                if on_done is not None:
+                    on_done()
+            finally:
+                self._queue.task_done()
+
+
+def create_sink(spec: Optional[str] = None) -> OutputSink:
+    """
+    Build a sink from a VIBEVOICE_OUTPUT-style spec.
+
+    Specs: "keyboard" (default), "clipboard", "stdout", "file:PATH",
+    "tcp:HOST:PORT" and "unix:PATH". VIBEVOICE_TYPING_CPS limits the keyboard
+    typing rate. If no clipboard tool is available, "clipboard" falls back
+    to the keyboard.
+
+    Args:
+        spec: Sink spec (default: $VIBEVOICE_OUTPUT or "keyboard")
+
+    Returns:
+        OutputSink
+    """
+    spec = spec or os.environ.get("VIBEVOICE_OUTPUT", "keyboard")
+    kind, _, target = spec.partition(":")
+    if kind == "clipboard":
+        try:
+            return ClipboardSink()
+        except RuntimeError as e:
+            print(f"{e}, typing instead")
+            kind = "keyboard"
+    if kind == "keyboard":
+        return KeystrokeSink(float(os.environ.get("VIBEVOICE_TYPING_CPS", "0")))
+    if kind == "stdout":
+        return StreamSink()
+    if kind == "file":
+        return StreamSink(target)
+    if kind == "tcp":
+        return SocketSink(target)
+    if kind == "unix":
+        return SocketSink(target, unix=True)
+    raise ValueError(f"Unknown output: {spec} (use keyboard, clipboard, stdout, file:PATH, tcp:HOST:PORT or unix:PATH)")
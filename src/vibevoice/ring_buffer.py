@@ -0,0 +1,133 @@
+"""Preallocated single-producer/single-consumer ring buffer for audio samples."""
+
+import numpy as np
+from typing import Optional, Tuple
+
+
+class AudioRingBuffer:
+    """
+    Fixed-capacity audio ring buffer shared between the audio callback and readers.
+
+    The PortAudio callback is the only writer: it copies each block into the
+    preallocated storage and then publishes the new write position. Readers
+    address samples by absolute position (samples written since the last reset)
+    and get zero-copy views as long as the range does not wrap around the end of
+    the storage. Nothing on the write path allocates or takes a lock.
+
+    When the writer laps a slow reader the oldest samples are overwritten;
+    ``oldest_pos`` tells the reader which positions are still available.
+    """
+
+    def __init__(self, capacity: int, channels: int = 1, dtype=np.float32):
+        """
+        Initialize the ring buffer.
+
+        Args:
+            capacity: Number of samples (frames) the buffer can hold
+            channels: Number of audio channels (mono is stored as a 1-D array)
+            dtype: Sample dtype (float32 or int16)
+        """
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+
+        self.capacity = capacity
+        self.channels = channels
+        self.dtype = np.dtype(dtype)
+
+        shape = (capacity,) if channels == 1 else (capacity, channels)
+        self._data = np.zeros(shape, dtype=self.dtype)
+        self._write_pos = 0
+
+    @property
+    def write_pos(self) -> int:
+        """Absolute position one past the last written sample."""
+        return self._write_pos
+
+    @property
+    def oldest_pos(self) -> int:
+        """Absolute position of the oldest sample still held by the buffer."""
+        return max(0, self._write_pos - self.capacity)
+
+    def reset(self):
+        """Forget all samples. Must not race with ``write``."""
+        self._write_pos = 0
+
+    def write(self, frames: np.ndarray) -> int:
+        """
+        Copy a block of frames into the buffer (producer side).
+
+        Args:
+            frames: Block of shape (n,) or (n, channels) as delivered by sounddevice
+
+        Returns:
+            Number of samples written
+        """
+        if self.channels == 1 and frames.ndim > 1:
+            frames = frames.reshape(-1)
+
+        n = len(frames)
+        if n == 0:
+            return 0
+
+        # Only the newest `capacity` samples can survive a single oversized write
+        if n > self.capacity:
+            skipped = n - self.capacity
+            frames = frames[skipped:]
+            self._write_pos += skipped
+            n = self.capacity
+
+        start = self._write_pos % self.capacity
+        first = min(n, self.capacity - start)
+        self._data[start:start + first] = frames[:first]
+        if first < n:
+            self._data[:n - first] = frames[first:]
+
+        # Publish only after the samples are in place
+        self._write_pos += n
+        return n
+
+    def views(self, start: int, end: Optional[int] = None) -> Tuple[np.ndarray, ...]:
+        """
+        Get zero-copy views over an absolute sample range (consumer side).
+
+        Args:
+            start: Absolute start position (clamped to ``oldest_pos``)
+            end: Absolute end position (default: current write position)
+
+        Returns:
+            One view, or two views when the range wraps around the storage
+        """
+        end = self._write_pos if end is None else min(end, self._write_pos)
+        start = max(start, end - self.capacity, 0)
+        if start >= end:
+            return (self._data[:0],)
+
+        first = start % self.capacity
+        n = end - start
+        if first + n <= self.capacity:
+            return (self._data[first:first + n],)
+        return (self._data[first:], self._data[:first + n - self.capacity])
+
+    def read(self, start: int, end: Optional[int] = None, copy: bool = False) -> np.ndarray:
+        """
+        Get an absolute sample range as a single array.
+
+        The result is a view when the range is contiguous in storage and a
+        copy when it wraps around.
+
+        Args:
+            start: Absolute start position (clamped to ``oldest_pos``)
+            end: Absolute end position (default: current write position)
+            copy: Always return an array that owns its samples (copied exactly once)
+
+        Returns:
+            Audio samples as numpy array
+        """
+        parts = self.views(start, end)
+        if len(parts) == 1:
+            return parts[0].copy() if copy else parts[0]
+        return np.concatenate(parts, axis=0)
+
+    def __len__(self) -> int:
+        """Number of samples currently held."""
+        return self._write_pos - self.oldest_pos
@@ -0,0 +1,135 @@
+"""Screenshot capture for AI command mode, prepared while the command is spoken."""
+
+import base64
+import hashlib
+import io
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+from vibevoice.telemetry import telemetry
+
+
+class ScreenshotPrefetcher:
+    """
+    Captures, downscales and encodes the screen on a background thread.
+
+    ``start`` is called when the command key goes down, so the work overlaps
+    with speaking and transcription; ``result`` then returns the base64
+    payload, normally without waiting. The downscaled pixels are hashed and
+    an unchanged screen reuses the previous encoding.
+    """
+
+    def __init__(
+        self,
+        max_side: int = 1024,
+        image_format: str = "jpeg",
+        quality: int = 80,
+        grab: Optional[Callable] = None,
+    ):
+        """
+        Initialize the prefetcher.
+
+        Args:
+            max_side: Longest side screenshots are downscaled to (aspect ratio kept, never upscaled)
+            image_format: "jpeg" (smaller, faster to upload) or "png" (lossless)
+            quality: JPEG quality (1-95)
+            grab: Callable returning a PIL image of the screen (default: PIL.ImageGrab.grab)
+        """
+        self.max_side = max_side
+        self.image_format = image_format.lower()
+        self.quality = quality
+        self.grab = grab
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="screenshot")
+        self._future = None
+        self._last_digest = None
+        self._last_payload = None
+        self.reused = 0
+
+    @classmethod
+    def from_env(cls) -> Optional["ScreenshotPrefetcher"]:
+        """
+        Build a prefetcher from INCLUDE_SCREENSHOT, SCREENSHOT_MAX_SIDE and SCREENSHOT_FORMAT.
+
+        SCREENSHOT_MAX_WIDTH is still read when SCREENSHOT_MAX_SIDE is unset.
+
+        Returns:
+            ScreenshotPrefetcher, or None when screenshots are disabled
+        """
+        if os.environ.get("INCLUDE_SCREENSHOT", "true").lower() != "true":
+            return None
+        return cls(
+            max_side=int(os.environ.get("SCREENSHOT_MAX_SIDE") or os.environ.get("SCREENSHOT_MAX_WIDTH", "1024")),
+            image_format=os.environ.get("SCREENSHOT_FORMAT", "jpeg"),
+        )
+
+    def start(self):
+        """Begin capturing the screen in the background (no-op while a capture is running)."""
+        if self._future is not None and not self._future.done():
+            return
+        self._future = self._executor.submit(self.capture)
+
+    def result(self, timeout: float = 2.0) -> Optional[str]:
+        """
+        Get the payload of the capture started by ``start``.
+
+        Args:
+            timeout: Longest time to wait for a capture still in progress (s)
+
+        Returns:
+            Base64-encoded image, or None if the capture failed, timed out or was never started
+        """
+        future, self._future = self._future, None
+        if future is None:
+            return None
+        try:
+            return future.result(timeout=timeout)
+        except Exception as e:
+            print(f"Screenshot error: {e}")
+            return None
+
+    def capture(self) -> str:
+        """
+        Capture the screen now and return it downscaled and base64-encoded.
+
+        Returns:
+            Base64-encoded JPEG or PNG
+        """
+        from PIL import Image
+
+        start = time.perf_counter()
+        image = self._grab()
+        scale = self.max_side / max(image.width, image.height)
+        if scale < 1:
+            size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+            # reducing_gap first shrinks by an integer factor, much faster than filtering at full size
+            image = image.resize(size, Image.Resampling.BILINEAR, reducing_gap=2.0)
+        if self.image_format == "jpeg" and image.mode != "RGB":
+            image = image.convert("RGB")
+        telemetry.observe("screenshot_capture", time.perf_counter() - start)
+
+        digest = hashlib.blake2b(image.tobytes(), digest_size=16).digest()
+        if digest == self._last_digest:
+            self.reused += 1
+            telemetry.count("screenshot_reused")
+            return self._last_payload
+
+        start = time.perf_counter()
+        buffer = io.BytesIO()
+        if self.image_format == "jpeg":
+            image.save(buffer, format="JPEG", quality=self.quality)
+        else:
+            image.save(buffer, format="PNG", compress_level=1)
+        payload = base64.b64encode(buffer.getvalue()).decode("ascii")
+        telemetry.observe("screenshot_encode", time.perf_counter() - start)
+
+        self._last_digest, self._last_payload = digest, payload
+        return payload
+
+    def _grab(self):
+        if self.grab is not None:
+            return self.grab()
+        from PIL import ImageGrab
+
+        return ImageGrab.grab()
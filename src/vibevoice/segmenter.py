@@ -0,0 +1,359 @@
+"""Phrase segmentation worker that runs off the PortAudio callback thread."""
+
+import numpy as np
+import threading
+import time
+from queue import Queue, Full
+from typing import Callable, Optional
+
+from vibevoice.ring_buffer import AudioRingBuffer
+from vibevoice.telemetry import TracedPhrase, telemetry
+
+
+class PhraseSegmenter:
+    """
+    Background stage between the audio callback and the phrase queue.
+
+    The callback only copies samples into the shared ring buffer and submits the
+    new write position through a bounded queue; it never blocks, allocates
+    arrays or touches the VAD. When the device runs at another rate (see
+    ``set_capture_buffer``) the callback writes into a native-rate ring and
+    this worker resamples the new frames into ``audio_buffer`` first. It then
+    runs them once through a StreamingVAD and emits each completed
+    speech segment as an array in the ring buffer's sample format (int16 for
+    the capture classes), copied once. If the VAD cannot be loaded it falls
+    back to a simple energy gate.
+
+    Each phrase carries a PhraseTrace (see ``telemetry``) recording when its
+    first and last samples were captured and the VAD time spent on it.
+
+    Counters:
+        callback_overruns: Blocks the callback could not submit (queue full)
+        input_overflows: Blocks PortAudio reported as input overflow
+        lost_samples: Samples overwritten before the worker could read them
+        max_queue_depth: Highest observed depth of the submission queue
+    """
+
+    def __init__(
+        self,
+        audio_buffer: AudioRingBuffer,
+        phrase_queue: Queue,
+        sample_rate: int = 16000,
+        queue_size: int = 256,
+        silence_threshold: float = 0.01,
+        min_silence_ms: int = 400,
+        vad_factory: Optional[Callable] = None,
+    ):
+        """
+        Initialize the segmenter.
+
+        Args:
+            audio_buffer: Ring buffer written by the audio callback
+            phrase_queue: Queue receiving completed phrases (same dtype as the buffer)
+            sample_rate: Sample rate in Hz
+            queue_size: Capacity of the callback submission queue (in blocks)
+            silence_threshold: Energy-gate fallback: mean amplitude below which a block is silent
+            min_silence_ms: Silence needed to close a phrase (ms)
+            vad_factory: Callable returning a SileroVAD-like object (default: SileroVAD)
+        """
+        self.audio_buffer = audio_buffer
+        self.capture_buffer = audio_buffer
+        self.capture_rate = sample_rate
+        self._resampler = None
+        self._capture_pos = 0  # Capture ring position resampled so far
+        self.phrase_queue = phrase_queue
+        self.sample_rate = sample_rate
+        self.silence_threshold = silence_threshold
+        self.min_silence_samples = int(min_silence_ms * sample_rate / 1000)
+        self.min_silence_ms = min_silence_ms
+        self.vad_factory = vad_factory
+        # Amplitude of a full-scale sample in the ring buffer's format
+        self._full_scale = 32768.0 if audio_buffer.dtype == np.int16 else 1.0
+
+        self.last_transcribed_pos = 0
+        self.silence_samples = 0
+        self.speech_start = None
+        self._heard_speech = False  # Energy gate: a loud block since the last phrase
+        self._stream = None
+        self._vad_failed = False
+
+        self._blocks = Queue(maxsize=queue_size)
+        self._generation = 0
+        self._read_pos = 0
+        self._needs_stream_reset = True
+        self._thread = None
+        self._block_time = 0.0   # Capture time of the block being processed
+        self._block_end = 0      # Write position at the end of that block
+        self._vad_time = 0.0     # VAD time since the last emitted phrase
+
+        self.callback_overruns = 0
+        self.input_overflows = 0
+        self.lost_samples = 0
+        self.max_queue_depth = 0
+        self._reported_overflows = 0
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of submitted blocks not yet processed."""
+        return self._blocks.qsize()
+
+    def stats(self) -> dict:
+        """Snapshot of the worker counters."""
+        return {
+            "callback_overruns": self.callback_overruns,
+            "input_overflows": self.input_overflows,
+            "lost_samples": self.lost_samples,
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+        }
+
+    def set_capture_buffer(self, capture_buffer: AudioRingBuffer, capture_rate: int):
+        """
+        Take audio from a ring buffer the callback fills at the device rate.
+
+        New frames are resampled into ``audio_buffer`` on the worker, so the
+        callback never runs the filter. Call while not recording.
+
+        Args:
+            capture_buffer: Mono ring buffer written by the audio callback
+            capture_rate: Rate of ``capture_buffer`` in Hz
+        """
+        from vibevoice.audio_io import StreamResampler
+
+        self.capture_buffer = capture_buffer
+        self.capture_rate = capture_rate
+        self._resampler = StreamResampler(capture_rate, self.sample_rate) if capture_rate != self.sample_rate else None
+
+    def start(self):
+        """Start the worker thread (idempotent)."""
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stop the worker thread after it drains submitted blocks."""
+        if self._thread is not None:
+            self._blocks.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def drain(self):
+        """
+        Block until every block submitted so far has been processed.
+
+        Any phrase closed by those blocks is in the phrase queue on return.
+        """
+        if self._thread is None or not self._thread.is_alive():
+            return
+        done = threading.Event()
+        self._blocks.put(done)
+        done.wait()
+
+    def take_tail(self) -> np.ndarray:
+        """
+        Flush the in-flight phrase at the end of a recording.
+
+        Call after ``drain`` once the callback has stopped submitting. With
+        the VAD the tail is the open speech segment, if any; with the energy
+        gate it is everything after the last emitted phrase, unless that was
+        all silence.
+
+        Returns:
+            Untranscribed tail as numpy array (buffer dtype), possibly empty
+        """
+        if self._resampler is not None:
+            # Samples the filter still holds back
+            self._write_resampled(self._resampler.flush())
+        end = self.audio_buffer.write_pos
+        if self._stream is not None:
+            start = self.speech_start if self.speech_start is not None else end
+        else:
+            start = self.last_transcribed_pos if self._heard_speech else end
+        start = max(start, self.last_transcribed_pos)
+
+        self.last_transcribed_pos = max(self.last_transcribed_pos, end)
+        self.speech_start = None
+        self.silence_samples = 0
+        self._heard_speech = False
+        self._needs_stream_reset = True
+        return self._traced(self.audio_buffer.read(start, end, copy=True), start, end)
+
+    def reset(self):
+        """Start a new recording; blocks submitted before the reset are ignored."""
+        self._generation += 1
+        self._read_pos = 0
+        self._capture_pos = 0
+        if self._resampler is not None:
+            self.set_capture_buffer(self.capture_buffer, self.capture_rate)
+        self._vad_time = 0.0
+        self.last_transcribed_pos = 0
+        self.silence_samples = 0
+        self.speech_start = None
+        self._heard_speech = False
+        self._needs_stream_reset = True
+
+    def submit(self, status=None):
+        """
+        Hand the latest capture ring write position to the worker.
+
+        Called from the audio callback: never blocks.
+
+        Args:
+            status: sounddevice CallbackFlags for the block, if any
+        """
+        if status is not None and status.input_overflow:
+            self.input_overflows += 1
+        try:
+            self._blocks.put_nowait((self._generation, self.capture_buffer.write_pos, time.monotonic()))
+        except Full:
+            # The samples are still in the ring buffer; the next submission
+            # covers them as long as the worker catches up before a full lap.
+            self.callback_overruns += 1
+
+    def _get_stream(self):
+        """
+        Lazy-load the VAD on the worker thread and open a stream on it.
+
+        Returns:
+            StreamingVAD instance, or None when falling back to the energy gate
+        """
+        if self._stream is None and not self._vad_failed:
+            try:
+                if self.vad_factory is not None:
+                    vad = self.vad_factory()
+                else:
+                    from vibevoice.vad import SileroVAD
+                    vad = SileroVAD(min_silence_ms=self.min_silence_ms)
+                self._stream = vad.stream()
+            except Exception as e:
+                print(f"VAD error: {e}, using energy-based detection")
+                self._vad_failed = True
+        return self._stream
+
+    def _run(self):
+        """Worker loop: process blocks until a stop sentinel arrives."""
+        while True:
+            item = self._blocks.get()
+            if item is None:
+                break
+            if isinstance(item, threading.Event):
+                item.set()
+                continue
+
+            depth = self._blocks.qsize() + 1
+            if depth > self.max_queue_depth:
+                self.max_queue_depth = depth
+
+            generation, end, captured = item
+            if generation != self._generation:
+                continue
+            if self._resampler is not None:
+                end = self._resample(end)
+            self._block_time, self._block_end = captured, end
+            self._process(end)
+
+            if self.input_overflows != self._reported_overflows:
+                self._reported_overflows = self.input_overflows
+                print(f"Audio callback status: input overflow ({self.input_overflows} total)")
+
+    def _resample(self, end: int) -> int:
+        """
+        Resample captured frames up to ``end`` into ``audio_buffer``.
+
+        Returns:
+            New write position of ``audio_buffer``
+        """
+        oldest = self.capture_buffer.oldest_pos
+        if self._capture_pos < oldest:
+            self.lost_samples += round((oldest - self._capture_pos) * self.sample_rate / self.capture_rate)
+            self._capture_pos = oldest
+        for part in self.capture_buffer.views(self._capture_pos, end):
+            self._write_resampled(self._resampler.process(part))
+        self._capture_pos = max(self._capture_pos, end)
+        return self.audio_buffer.write_pos
+
+    def _write_resampled(self, out: np.ndarray):
+        """Append resampler output to ``audio_buffer`` in its sample format."""
+        if self.audio_buffer.dtype == np.int16:
+            np.rint(out, out=out)
+            np.clip(out, -32768, 32767, out=out)
+        self.audio_buffer.write(out)
+
+    def _process(self, end: int):
+        """Feed new frames to the boundary detector and emit closed phrases."""
+        stream = self._get_stream()
+
+        oldest = self.audio_buffer.oldest_pos
+        if self._read_pos < oldest:
+            self.lost_samples += oldest - self._read_pos
+            self._read_pos = oldest
+            self._needs_stream_reset = True
+        if self.last_transcribed_pos < oldest:
+            self.last_transcribed_pos = oldest
+
+        start = self._read_pos
+        if start >= end:
+            return
+        self._read_pos = end
+
+        if stream is None:
+            self._energy_gate(start, end)
+            return
+
+        if self._needs_stream_reset:
+            self._needs_stream_reset = False
+            self.speech_start = None
+            stream.reset(position=start)
+
+        for part in self.audio_buffer.views(start, end):
+            vad_start = time.perf_counter()
+            events = stream.process(part)
+            self._vad_time += time.perf_counter() - vad_start
+            for event in events:
+                if 'start' in event:
+                    self.speech_start = max(event['start'], self.last_transcribed_pos)
+                    self._vad_time = 0.0  # Count VAD time from the start of speech
+                elif self.speech_start is not None:
+                    self._emit(self.speech_start, event['end'])
+                    self.speech_start = None
+
+    def _energy_gate(self, start: int, end: int):
+        """Fallback boundary detection: close a phrase after enough low-energy audio following speech."""
+        energy = sum(float(np.abs(part, dtype=np.float32).sum()) for part in self.audio_buffer.views(start, end))
+        if energy / (end - start) < self.silence_threshold * self._full_scale:
+            self.silence_samples += end - start
+        else:
+            self.silence_samples = 0
+            self._heard_speech = True
+
+        if self.silence_samples >= self.min_silence_samples:
+            self.silence_samples = 0
+            if self._heard_speech:
+                self._heard_speech = False
+                self._emit(self.last_transcribed_pos, end)
+            else:
+                # Silence only: skip it instead of queueing audio Whisper would hallucinate on
+                self.last_transcribed_pos = end
+
+    def _emit(self, start: int, end: int):
+        """Queue the audio between ``start`` and ``end`` as a phrase (one copy out of the ring buffer)."""
+        self.last_transcribed_pos = max(self.last_transcribed_pos, end)
+        if end <= start:
+            return
+        self.phrase_queue.put(self._traced(self.audio_buffer.read(start, end, copy=True), start, end))
+
+    def _captured_at(self, pos: int) -> float:
+        """Approximate monotonic time at which the sample at ``pos`` was captured."""
+        return self._block_time - (self._block_end - pos) / self.sample_rate
+
+    def _traced(self, audio: np.ndarray, start: int, end: int) -> np.ndarray:
+        """Attach a PhraseTrace to phrase audio covering ``start``..``end``."""
+        phrase = audio.view(TracedPhrase)
+        phrase.trace = telemetry.start_phrase(
+            audio_s=len(audio) / self.sample_rate,
+            speech_start_t=self._captured_at(start),
+            speech_end_t=self._captured_at(end),
+            vad_s=self._vad_time,
+        )
+        self._vad_time = 0.0
+        return phrase
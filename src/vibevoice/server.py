@@ -1,43 +1,466 @@
 """FastAPI server for Whisper transcription"""
 
+import asyncio
+import io
+import json
+import os
+import wave
+import numpy as np
 import uvicorn
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
-from faster_whisper import WhisperModel
+from starlette.concurrency import run_in_threadpool
+from typing import Optional
+
+from vibevoice.audio_io import int16_to_float32, iter_windows, open_audio
+from vibevoice.backends import FasterWhisperBackend, backend_options_from_env
+from vibevoice.cache import cache_from_env
+from vibevoice.inference_pool import InferencePool, QueueFullError
+from vibevoice.model_registry import ModelRegistry
+from vibevoice.telemetry import telemetry
 
 app = FastAPI()
 
-# Use CPU for macOS (CUDA is for NVIDIA GPUs)
-#model = WhisperModel("large", device="cuda", compute_type="float16")
-model = WhisperModel("small", device="cpu", compute_type="int8")
+# Inference workers: SERVER_WORKERS concurrent model calls behind a queue of
+# SERVER_QUEUE_SIZE jobs; concurrent short requests are batched up to
+# SERVER_BATCH_SIZE, waiting at most SERVER_BATCH_WAIT_MS for a batch to fill.
+SERVER_WORKERS = int(os.environ.get("SERVER_WORKERS", "1"))
+SERVER_QUEUE_SIZE = int(os.environ.get("SERVER_QUEUE_SIZE", "16"))
+SERVER_BATCH_SIZE = int(os.environ.get("SERVER_BATCH_SIZE", "4"))
+SERVER_BATCH_WAIT_MS = float(os.environ.get("SERVER_BATCH_WAIT_MS", "10"))
+
+# Models are loaded on first use and evicted least-recently-used first once
+# their estimated memory exceeds SERVER_MODEL_MEMORY_MB. Defaults come from
+# WHISPER_MODEL, WHISPER_COMPUTE_TYPE and WHISPER_DEVICE; engine options
+# (WHISPER_CPU_THREADS, WHISPER_NUM_WORKERS) are shared by the CLI
+# (e.g. WHISPER_DEVICE=cuda WHISPER_COMPUTE_TYPE=float16 on NVIDIA GPUs).
+ENGINE_OPTIONS = backend_options_from_env({
+    "device": "cpu",
+    "compute_type": "int8",
+    # One CTranslate2 worker per pool thread so model calls run in parallel
+    "num_workers": SERVER_WORKERS,
+})
+DEFAULT_MODEL = os.environ.get("WHISPER_MODEL", "small")
+DEFAULT_COMPUTE_TYPE = ENGINE_OPTIONS.pop("compute_type")
+DEFAULT_DEVICE = ENGINE_OPTIONS.pop("device")
+
+registry = ModelRegistry(
+    memory_budget_mb=float(os.environ.get("SERVER_MODEL_MEMORY_MB", "4096")),
+    backend_options=ENGINE_OPTIONS,
+)
+
+# Results of repeated audio are served from a cache keyed on the samples and
+# decoding parameters (SERVER_CACHE=false disables it, SERVER_CACHE_DIR adds
+# an on-disk tier; sizes via SERVER_CACHE_MB and SERVER_CACHE_DISK_MB)
+cache = cache_from_env("SERVER", enabled_by_default=True)
+
+SAMPLE_RATE = 16000
 
-class TranscribeRequest(BaseModel):
+# Default decoding options; language, beam_size and vad_filter can be
+# overridden per request
+DECODE_OPTIONS = dict(
+    language="fr",
+    beam_size=1,
+    best_of=1,
+    no_speech_threshold=0.1,  # Lowered from 0.6 to be less aggressive
+    vad_filter=False,  # Disable VAD filter to prevent false negatives
+    condition_on_previous_text=False,
+)
+
+class DecodeSettings(BaseModel):
+    """Per-request model and decoding overrides (None keeps the server default)."""
+    model: Optional[str] = None
+    compute_type: Optional[str] = None
+    device: Optional[str] = None
+    language: Optional[str] = None  # "auto" for language detection
+    beam_size: Optional[int] = None
+    vad_filter: Optional[bool] = None
+
+class TranscribeRequest(DecodeSettings):
     file_path: str
 
+
+def resolve_settings(settings: DecodeSettings):
+    """
+    Merge request overrides with the server defaults.
+
+    Returns:
+        Tuple of (model key, decode options)
+
+    Raises:
+        HTTPException: 400 if the model size, compute type or device is unknown
+    """
+    size = settings.model or DEFAULT_MODEL
+    if size not in FasterWhisperBackend.MODELS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Model must be one of: {list(FasterWhisperBackend.MODELS.keys())}",
+        )
+    compute_type = settings.compute_type or DEFAULT_COMPUTE_TYPE
+    if compute_type not in ModelRegistry.BYTES_PER_PARAM:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Compute type must be one of: {list(ModelRegistry.BYTES_PER_PARAM.keys())}",
+        )
+    device = settings.device or DEFAULT_DEVICE
+    if device not in ModelRegistry.DEVICES:
+        raise HTTPException(status_code=400, detail=f"Device must be one of: {list(ModelRegistry.DEVICES)}")
+    model_key = (size, compute_type, device)
+
+    options = dict(DECODE_OPTIONS)
+    if settings.language is not None:
+        options["language"] = None if settings.language == "auto" else settings.language
+    if settings.beam_size is not None:
+        options["beam_size"] = settings.beam_size
+    if settings.vad_filter is not None:
+        options["vad_filter"] = settings.vad_filter
+    return model_key, options
+
+
+def decode_audio_bytes(data: bytes) -> np.ndarray:
+    """
+    Decode an uploaded body into float32 samples at 16kHz.
+
+    Args:
+        data: WAV file (16-bit PCM) or raw 16kHz mono int16 little-endian PCM
+
+    Returns:
+        Mono float32 audio normalized to [-1, 1]
+    """
+    if data[:4] == b"RIFF":
+        with wave.open(io.BytesIO(data)) as wav:
+            if wav.getsampwidth() != 2:
+                raise ValueError("Only 16-bit PCM WAV files are supported")
+            channels = wav.getnchannels()
+            rate = wav.getframerate()
+            pcm = np.frombuffer(wav.readframes(wav.getnframes()), dtype="<i2")
+        if channels > 1:
+            audio = pcm.reshape(-1, channels).mean(axis=1, dtype=np.float32)
+            audio *= 1.0 / 32768
+        else:
+            audio = int16_to_float32(pcm)
+        if rate != SAMPLE_RATE:
+            from math import gcd
+            from scipy.signal import resample_poly
+            g = gcd(rate, SAMPLE_RATE)
+            audio = resample_poly(audio, SAMPLE_RATE // g, rate // g).astype(np.float32)
+        return audio
+
+    if len(data) % 2:
+        raise ValueError("Raw PCM body must contain whole int16 samples")
+    return int16_to_float32(np.frombuffer(data, dtype="<i2"))
+
+
+def transcribe_text(audio, model_key, options) -> str:
+    """Transcribe audio (array or file path) to a single string."""
+    engine = registry.get(*model_key)
+    segments = engine.transcribe_segments(audio, **options)
+    return " ".join(segment.text.strip() for segment in segments)
+
+
+def transcribe_file_text(path: str, model_key, options) -> str:
+    """
+    Transcribe a file window by window, never holding more than a batch of windows.
+
+    Every window is decoded with the request's full decode options; windows
+    go through the engine's padded batch, which applies the same checks as
+    sequential decoding.
+    """
+    engine = registry.get(*model_key)
+    texts = []
+    windows = []
+    for _, window in iter_windows(open_audio(path).blocks()):
+        windows.append(window)
+        if len(windows) == SERVER_BATCH_SIZE:
+            texts.extend(engine.transcribe_batch(windows, **options))
+            windows = []
+    if windows:
+        texts.extend(engine.transcribe_batch(windows, **options))
+    return " ".join(text.strip() for text in texts if text.strip())
+
+
+def read_short_file(path: str) -> Optional[np.ndarray]:
+    """Read a file that fits in one Whisper window; None for longer files or unknown durations."""
+    reader = open_audio(path)
+    if reader.duration is None or reader.duration * SAMPLE_RATE > FasterWhisperBackend.MAX_BATCH_SAMPLES:
+        return None
+    blocks = list(reader.blocks())
+    return np.concatenate(blocks) if blocks else np.zeros(0, dtype=np.float32)
+
+
+def run_batch(key, audios):
+    """Pool batch function: one padded decode for several short clips."""
+    model_key, options = key
+    engine = registry.get(*model_key)
+    return engine.transcribe_batch(audios, **dict(options))
+
+
+pool = InferencePool(
+    run_batch,
+    workers=SERVER_WORKERS,
+    queue_size=SERVER_QUEUE_SIZE,
+    max_batch_size=SERVER_BATCH_SIZE,
+    max_wait=SERVER_BATCH_WAIT_MS / 1000,
+)
+
+
+def result_key(audio: np.ndarray, model_key, options, kind: str) -> Optional[str]:
+    """Cache key for a result of ``kind`` ("text" or "segments"), None if caching is off."""
+    if cache is None:
+        return None
+    return cache.key(audio, model=model_key, options=options, kind=kind)
+
+
+def busy_error() -> HTTPException:
+    return HTTPException(status_code=503, detail="Server busy, retry later", headers={"Retry-After": "1"})
+
+
+async def transcribe_in_pool(audio, model_key, options) -> str:
+    """
+    Transcribe on the inference pool without blocking the event loop.
+
+    Clips that fit in one Whisper window may be batched with concurrent
+    requests for the same model and decode options.
+
+    Raises:
+        QueueFullError: If the inference queue is full
+    """
+    batchable = (
+        isinstance(audio, np.ndarray)
+        and len(audio) <= FasterWhisperBackend.MAX_BATCH_SAMPLES
+        and not options["vad_filter"]
+        and options["language"] is not None
+    )
+    if batchable:
+        key = (model_key, tuple(sorted(options.items())))
+        future = pool.submit_batched(key, audio)
+    else:
+        future = pool.submit(transcribe_text, audio, model_key, options)
+    return await asyncio.wrap_future(future)
+
+
+def start_segment_stream(audio, model_key, options, cache_key: Optional[str] = None) -> asyncio.Queue:
+    """
+    Start decoding on the inference pool and return a queue of segment events.
+
+    The queue receives the events of ``segment_events`` as they are decoded,
+    then None (or the exception that stopped decoding). With a cache key,
+    cached events are replayed without touching the model, and a completed
+    decode is stored for next time.
+
+    Raises:
+        QueueFullError: If the inference queue is full
+    """
+    loop = asyncio.get_running_loop()
+    events = asyncio.Queue()
+
+    cached = cache.get(cache_key) if cache_key is not None else None
+    if cached is not None:
+        for event in cached:
+            events.put_nowait(event)
+        events.put_nowait(None)
+        return events
+
+    def produce():
+        produced = []
+        try:
+            for event in segment_events(audio, model_key, options):
+                produced.append(event)
+                loop.call_soon_threadsafe(events.put_nowait, event)
+        except Exception as e:
+            loop.call_soon_threadsafe(events.put_nowait, e)
+            raise
+        if cache_key is not None:
+            cache.put(cache_key, produced)
+        loop.call_soon_threadsafe(events.put_nowait, None)
+
+    pool.submit(produce)
+    return events
+
+
+async def iterate_events(events: asyncio.Queue):
+    """Yield events from ``start_segment_stream`` until the end marker."""
+    while True:
+        event = await events.get()
+        if event is None:
+            return
+        if isinstance(event, Exception):
+            raise event
+        yield event
+
+
+def segment_events(audio, model_key, options):
+    """
+    Transcribe audio and yield one result dict per segment as it is decoded.
+
+    Args:
+        audio: float32 numpy array or file path
+        model_key: (size, compute_type, device) of the model to use
+        options: Decode options
+
+    Yields:
+        {"start", "end", "text"} per segment, then {"done": True, "text"}
+    """
+    texts = []
+    engine = registry.get(*model_key)
+    for segment in engine.transcribe_segments(audio, **options):
+        text = segment.text.strip()
+        texts.append(text)
+        yield {"start": segment.start, "end": segment.end, "text": text}
+    yield {"done": True, "text": " ".join(texts)}
+
 @app.get("/health")
 def health_check():
     return {"status": "ok"}
 
+@app.get("/stats")
+def stats():
+    """Throughput (requests/sec), p50/p99 latency, queue, batching, model and cache counters."""
+    return {
+        **pool.get_stats(),
+        "models": registry.stats(),
+        "cache": cache.stats() if cache is not None else None,
+    }
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Prometheus exposition: queue wait/inference histograms, request counters and gauges."""
+    pool_stats = pool.get_stats()
+    models = registry.stats()
+    gauges = {
+        "server_requests_completed": pool_stats["completed"],
+        "server_requests_failed": pool_stats["failed"],
+        "server_requests_rejected": pool_stats["rejected"],
+        "server_requests_per_second": pool_stats["requests_per_sec"],
+        "server_latency_p50_seconds": pool_stats["p50_ms"] / 1000 if pool_stats["p50_ms"] is not None else None,
+        "server_latency_p99_seconds": pool_stats["p99_ms"] / 1000 if pool_stats["p99_ms"] is not None else None,
+        "server_queue_depth": pool_stats["queue_depth"],
+        "server_batches": pool_stats["batches"],
+        "server_models_loaded": len(models["loaded"]),
+        "server_model_memory_mb": models["memory_used_mb"],
+    }
+    if cache is not None:
+        cache_stats = cache.stats()
+        gauges["server_cache_hits"] = cache_stats["memory_hits"] + cache_stats["disk_hits"]
+        gauges["server_cache_misses"] = cache_stats["misses"]
+    return telemetry.prometheus(gauges)
+
 @app.post("/transcribe/")
 async def transcribe(request: TranscribeRequest):
     print(f"DEBUG: Transcribing file: {request.file_path}")
-    segments, info = model.transcribe(
-        request.file_path,
-        language="fr",
-        beam_size=1,
-        best_of=1,
-        no_speech_threshold=0.1,  # Lowered from 0.6 to be less aggressive
-        vad_filter=False,  # Disable VAD filter to prevent false negatives
-        condition_on_previous_text=False
-    )
-    print(f"DEBUG: Info: {info}")
-    segments_list = list(segments)  # Convert generator to list
-    print(f"DEBUG: Number of segments: {len(segments_list)}")
-    all_text = [segment.text.strip() for segment in segments_list]
-    print(f"DEBUG: Segments text: {all_text}")
-    text = " ".join(all_text)
+    model_key, options = resolve_settings(request)
+    if pool.queue_depth >= SERVER_QUEUE_SIZE:
+        raise busy_error()
+
+    key = None
+    if cache is not None:
+        key = await run_in_threadpool(
+            cache.file_key, request.file_path, model=model_key, options=options, kind="text"
+        )
+        text = cache.get(key)
+        if text is not None:
+            return {"text": text}
+    try:
+        audio = await run_in_threadpool(read_short_file, request.file_path)
+        if audio is not None:
+            # Short files may be batched with concurrent requests
+            text = await transcribe_in_pool(audio, model_key, options)
+        else:
+            # Long files are streamed through bounded windows inside the job
+            text = await asyncio.wrap_future(pool.submit(transcribe_file_text, request.file_path, model_key, options))
+    except QueueFullError:
+        raise busy_error()
+    if key is not None:
+        cache.put(key, text)
+    print(f"DEBUG: Text: {text}")
     return {"text": text}
 
+@app.post("/transcribe/raw")
+async def transcribe_raw(request: Request, settings: DecodeSettings = Depends()):
+    """
+    Transcribe an uploaded WAV or raw 16kHz int16 PCM body.
+
+    The body may be sent with chunked transfer encoding. Segments are
+    streamed back as NDJSON lines as soon as they are decoded. Model and
+    decoding overrides are passed as query parameters.
+    """
+    model_key, options = resolve_settings(settings)
+    body = bytearray()
+    async for chunk in request.stream():
+        body.extend(chunk)
+
+    def load(data):
+        audio = decode_audio_bytes(data)
+        return audio, result_key(audio, model_key, options, "segments")
+
+    try:
+        audio, key = await run_in_threadpool(load, bytes(body))
+    except (ValueError, wave.Error) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        events = start_segment_stream(audio, model_key, options, key)
+    except QueueFullError:
+        raise busy_error()
+
+    async def lines():
+        async for event in iterate_events(events):
+            yield json.dumps(event) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+@app.websocket("/ws/transcribe")
+async def transcribe_websocket(websocket: WebSocket, settings: DecodeSettings = Depends()):
+    """
+    Streaming transcription over a WebSocket.
+
+    The client sends binary messages of 16kHz mono int16 PCM frames and the
+    text message "end" to have the audio received so far transcribed.
+    Segment results are sent back as JSON as they are decoded, followed by
+    {"done": true, "text": ...}; the connection then accepts the next
+    utterance. Sending "close" ends the session. Model and decoding
+    overrides are passed as query parameters of the connection URL.
+    """
+    try:
+        model_key, options = resolve_settings(settings)
+    except HTTPException as e:
+        await websocket.close(code=1008, reason=e.detail)
+        return
+    await websocket.accept()
+    buffer = bytearray()
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            if message.get("bytes") is not None:
+                buffer.extend(message["bytes"])
+                continue
+
+            command = (message.get("text") or "").strip()
+            if command == "close":
+                await websocket.close()
+                break
+            if command != "end":
+                await websocket.send_json({"error": f"Unknown command: {command}"})
+                continue
+
+            # An odd trailing byte cannot form a sample
+            usable = len(buffer) - len(buffer) % 2
+            audio = int16_to_float32(np.frombuffer(bytes(buffer[:usable]), dtype="<i2"))
+            buffer.clear()
+            key = await run_in_threadpool(result_key, audio, model_key, options, "segments")
+            try:
+                events = start_segment_stream(audio, model_key, options, key)
+            except QueueFullError:
+                await websocket.send_json({"error": "Server busy, retry later"})
+                continue
+            async for event in iterate_events(events):
+                await websocket.send_json(event)
+    except WebSocketDisconnect:
+        pass
+
 def run_server():
     uvicorn.run(app, host="0.0.0.0", port=4242)
 
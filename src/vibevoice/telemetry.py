@@ -0,0 +1,199 @@
+"""Per-phrase latency spans and Prometheus-style metrics for the pipeline."""
+
+import itertools
+import json
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+import numpy as np
+
+# Histogram bucket upper bounds in seconds
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class PhraseTrace:
+    """
+    Timing of one phrase from its first speech frame until its text is typed.
+
+    Timestamps are ``time.monotonic()`` values; durations are in seconds.
+    """
+
+    __slots__ = (
+        "id", "audio_s", "speech_start_t", "speech_end_t", "vad_s",
+        "emitted_t", "dequeued_t", "decode_s", "typing_s", "chars",
+    )
+
+    def __init__(self, trace_id: int, audio_s: float, speech_start_t: float, speech_end_t: float, vad_s: float):
+        self.id = trace_id
+        self.audio_s = audio_s
+        self.speech_start_t = speech_start_t  # When the first speech sample was captured
+        self.speech_end_t = speech_end_t      # When the last phrase sample was captured
+        self.vad_s = vad_s                    # VAD processing time spent on the phrase
+        self.emitted_t = time.monotonic()     # When the segmenter queued the phrase
+        self.dequeued_t = None
+        self.decode_s = None
+        self.typing_s = None
+        self.chars = 0
+
+    def to_dict(self) -> dict:
+        """Stage durations of the phrase (None for stages it did not reach)."""
+        finished = time.monotonic()
+        return {
+            "phrase": self.id,
+            "audio_s": self.audio_s,
+            "segmentation_s": self.emitted_t - self.speech_end_t,
+            "vad_s": self.vad_s,
+            "queue_wait_s": self.dequeued_t - self.emitted_t if self.dequeued_t is not None else None,
+            "decode_s": self.decode_s,
+            "typing_s": self.typing_s,
+            "speech_end_to_text_s": finished - self.speech_end_t,
+            "total_s": finished - self.speech_start_t,
+            "chars": self.chars,
+        }
+
+
+class TracedPhrase(np.ndarray):
+    """Phrase audio (a view, no copy) carrying its PhraseTrace through the phrase queue."""
+
+    trace = None
+
+
+def trace_of(audio) -> Optional[PhraseTrace]:
+    """The trace attached to phrase audio, if any."""
+    return getattr(audio, "trace", None)
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus exposition model."""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Telemetry:
+    """
+    Process-wide latency histograms and counters, with optional JSONL span records.
+
+    Components record into the shared ``telemetry`` instance; the CLI writes
+    one JSONL record per phrase when VIBEVOICE_TELEMETRY_FILE is set and the
+    server exposes everything at ``/metrics``.
+    """
+
+    def __init__(self, prefix: str = "vibevoice"):
+        self.prefix = prefix
+        self._histograms: Dict[str, Histogram] = {}
+        self._counters: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._file = None
+        self._ids = itertools.count(1)
+
+    def configure(self, path: Optional[str]):
+        """
+        Start appending span records to a JSONL file.
+
+        Args:
+            path: File path, None to stop writing records
+        """
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+            self._file = open(path, "a", encoding="utf-8") if path else None
+
+    def observe(self, name: str, seconds: float):
+        """Add a duration to the ``<prefix>_<name>_seconds`` histogram."""
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram()
+            histogram.observe(seconds)
+
+    def count(self, name: str, value: float = 1):
+        """Increase the ``<prefix>_<name>_total`` counter."""
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    @contextmanager
+    def span(self, name: str):
+        """Time the enclosed block into the ``name`` histogram."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def record(self, record: dict):
+        """Write one JSONL record if a file is configured."""
+        if self._file is None:
+            return
+        line = json.dumps(record)
+        with self._lock:
+            if self._file is not None:
+                self._file.write(line + "\n")
+                self._file.flush()
+
+    def start_phrase(self, audio_s: float, speech_start_t: float, speech_end_t: float, vad_s: float) -> PhraseTrace:
+        """Open the trace of a phrase the segmenter is about to queue."""
+        return PhraseTrace(next(self._ids), audio_s, speech_start_t, speech_end_t, vad_s)
+
+    def finish_phrase(self, trace: PhraseTrace):
+        """Close a phrase trace: update the stage histograms and write its record."""
+        record = trace.to_dict()
+        for stage in ("segmentation", "vad", "queue_wait", "decode", "typing", "speech_end_to_text", "total"):
+            value = record[f"{stage}_s"]
+            if value is not None:
+                self.observe(f"phrase_{stage}", value)
+        self.count("phrases")
+        self.record({"type": "phrase", "time": time.time(), **record})
+
+    def prometheus(self, gauges: Optional[Dict[str, float]] = None) -> str:
+        """
+        Render all metrics in the Prometheus text exposition format.
+
+        Args:
+            gauges: Extra point-in-time values (name without prefix -> value)
+
+        Returns:
+            Exposition text
+        """
+        lines = []
+        with self._lock:
+            for name, histogram in sorted(self._histograms.items()):
+                metric = f"{self.prefix}_{name}_seconds"
+                lines.append(f"# TYPE {metric} histogram")
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f'{metric}_bucket{{le="{bound}"}} {cumulative}')
+                lines.append(f'{metric}_bucket{{le="+Inf"}} {histogram.count}')
+                lines.append(f"{metric}_sum {histogram.sum}")
+                lines.append(f"{metric}_count {histogram.count}")
+            for name, value in sorted(self._counters.items()):
+                metric = f"{self.prefix}_{name}_total"
+                lines.append(f"# TYPE {metric} counter")
+                lines.append(f"{metric} {value}")
+        for name, value in sorted((gauges or {}).items()):
+            if value is None:
+                continue
+            metric = f"{self.prefix}_{name}"
+            lines.append(f"# TYPE {metric} gauge")
+            lines.append(f"{metric} {float(value)}")
+        return "\n".join(lines) + "\n"
+
+
+# Shared by every component of the process; entry points call configure()
+telemetry = Telemetry()
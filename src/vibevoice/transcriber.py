@@ -1,44 +1,115 @@
-"""Streaming transcriber using MLX Whisper for M1 Mac optimization."""
+"""Streaming transcriber with pluggable Whisper backends (MLX, faster-whisper)."""
 
-import mlx_whisper
+import copy
 import numpy as np
 import os
-from typing import Dict, Optional
+import re
+import time
+from typing import Dict, List, Optional
+
+from vibevoice.audio_io import int16_to_float32
+from vibevoice.backends import MLXWhisperBackend, create_backend
+from vibevoice.cache import TranscriptionCache
+from vibevoice.telemetry import telemetry
 
 
 class StreamingTranscriber:
-    """Real-time speech transcription using MLX Whisper."""
+    """Real-time speech transcription on a persistent Whisper backend."""
 
     # Available models: tiny, base, small, medium, large
-    MODELS = {
-        "tiny": "mlx-community/whisper-tiny",
-        "base": "mlx-community/whisper-base",
-        "small": "mlx-community/whisper-small",
-        "medium": "mlx-community/whisper-medium",
-        "large": "mlx-community/whisper-large-v3",
-    }
+    MODELS = MLXWhisperBackend.MODELS
 
-    def __init__(self, model_size: str = "small", language: Optional[str] = None):
+    def __init__(
+        self,
+        model_size: str = "small",
+        language: Optional[str] = None,
+        warmup_seconds: float = 1.0,
+        backend: Optional[str] = None,
+        backend_options: Optional[Dict] = None,
+        cache: Optional[TranscriptionCache] = None,
+    ):
         """
-        Initialize the transcriber.
+        Initialize the transcriber and load the model.
+
+        The model is loaded once and held for the lifetime of the transcriber,
+        then exercised with a warm-up pass on silence so the first real phrase
+        does not pay for weight loading or graph compilation.
 
         Args:
             model_size: Model size (tiny, base, small, medium, large)
             language: Language code (e.g., 'en', 'fr'). None for auto-detect.
+            warmup_seconds: Length of the silent warm-up clip (0 disables warm-up)
+            backend: Backend name ("mlx", "faster-whisper"), None for the platform default
+            backend_options: Engine options (compute_type, cpu_threads, num_workers, ...)
+            cache: Result cache consulted before decoding (None disables caching)
         """
         if model_size not in self.MODELS:
             raise ValueError(f"Model size must be one of: {list(self.MODELS.keys())}")
 
-        self.model_path = self.MODELS[model_size]
+        self.model_size = model_size
         self.language = language
-        print(f"Loading MLX Whisper model: {model_size}")
+        self.backend = create_backend(backend, model_size, **(backend_options or {}))
+        self.model_path = self.backend.model_path
+        self.cache = cache
+
+        # Load metrics (seconds); warmup_decode_s stays None without a warm-up pass
+        self.load_time = None
+        self.warmup_decode_s = None
+
+        print(f"Loading {self.backend.name} Whisper model: {model_size}")
+        start = time.perf_counter()
+        self.model = self.backend.load()
+        self.load_time = time.perf_counter() - start
+
+        if warmup_seconds > 0:
+            self.warmup(warmup_seconds)
+
+    def with_options(self, **options) -> "StreamingTranscriber":
+        """
+        A transcriber sharing this one's loaded model with different decode options.
+
+        Args:
+            **options: Backend options to override (e.g. beam_size=1 for a cheaper profile)
+
+        Returns:
+            StreamingTranscriber (nothing is reloaded)
+        """
+        other = copy.copy(self)
+        other.backend = copy.copy(self.backend)
+        other.backend.options = {**self.backend.options, **options}
+        return other
+
+    def warmup(self, seconds: float = 1.0):
+        """
+        Run one transcription on silence to compile and cache the decode graph.
+
+        The time of the whole decode is kept in ``warmup_decode_s``.
+
+        Args:
+            seconds: Length of the silent clip
+        """
+        silence = np.zeros(int(16000 * seconds), dtype=np.float32)
+        # Straight to the backend: a cached warm-up result would skip the warm-up
+        start = time.perf_counter()
+        self.backend.transcribe(silence, language=self.language)
+        self.warmup_decode_s = time.perf_counter() - start
+
+    def _cache_key(self, audio_data: np.ndarray) -> str:
+        """Cache key for a phrase decoded with this transcriber's model and settings."""
+        return self.cache.key(
+            audio_data,
+            backend=self.backend.name,
+            model=self.model_path,
+            language=self.language,
+            options=self.backend.options,
+        )
 
     def transcribe(self, audio_data: np.ndarray) -> str:
         """
         Transcribe audio data to text.
 
         Args:
-            audio_data: Audio data as numpy array (float32, normalized to [-1, 1])
+            audio_data: Audio data as numpy array (int16 capture samples, or float32 in [-1, 1])
 
         Returns:
             Transcribed text
@@ -46,28 +117,270 @@ class StreamingTranscriber:
         if len(audio_data) == 0:
             return ""
 
-        # Ensure audio data is float32 and normalized
-        if audio_data.dtype != np.float32:
-            audio_data = audio_data.astype(np.float32)
+        audio_data = self.normalize_audio(audio_data)
 
-        # Transcribe using MLX Whisper
-        result = mlx_whisper.transcribe(
-            audio_data,
-            path_or_hf_repo=self.model_path,
+        key = None
+        if self.cache is not None:
+            key = self._cache_key(audio_data)
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+
+        start = time.perf_counter()
+        text = self.backend.transcribe(audio_data, language=self.language)
+        elapsed = time.perf_counter() - start
+        self._record_decode(elapsed, len(audio_data))
+
+        if key is not None:
+            self.cache.put(key, text)
+        return text
+
+    def transcribe_batch(self, audio_list: List[np.ndarray]) -> List[str]:
+        """
+        Transcribe several phrases in one call, batched when the backend supports it.
+
+        Args:
+            audio_list: Audio phrases as numpy arrays (int16, or float32 in [-1, 1])
+
+        Returns:
+            Transcribed texts in the same order as the input
+        """
+        if len(audio_list) == 1:
+            return [self.transcribe(audio_list[0])]
+
+        texts = [""] * len(audio_list)
+        indices = []
+        audios = []
+        keys = {}
+        for i, audio in enumerate(audio_list):
+            if len(audio) == 0:
+                continue
+            audio = self.normalize_audio(audio)
+            if self.cache is not None:
+                keys[i] = self._cache_key(audio)
+                cached = self.cache.get(keys[i])
+                if cached is not None:
+                    texts[i] = cached
+                    continue
+            indices.append(i)
+            audios.append(audio)
+        if not indices:
+            return texts
+
+        start = time.perf_counter()
+        results = self.backend.transcribe_batch(audios, language=self.language)
+        elapsed = time.perf_counter() - start
+        self._record_decode(elapsed, sum(len(audio) for audio in audios))
+
+        for i, text in zip(indices, results):
+            texts[i] = text
+            if i in keys:
+                self.cache.put(keys[i], text)
+        return texts
+
+    @staticmethod
+    def _record_decode(seconds: float, samples: int):
+        """Decode latency histogram plus audio/decode totals (their ratio is the real-time factor)."""
+        telemetry.observe("decode", seconds)
+        telemetry.count("decode_seconds", seconds)
+        telemetry.count("decoded_audio_seconds", samples / 16000)
+
+    def transcribe_words(self, audio_data: np.ndarray, initial_prompt: Optional[str] = None) -> List:
+        """
+        Transcribe audio into timed words.
+
+        Args:
+            audio_data: Audio data as numpy array (int16, or float32 in [-1, 1])
+            initial_prompt: Text preceding the audio, used as decoder context
+
+        Returns:
+            List of (start_seconds, end_seconds, word) tuples
+        """
+        if len(audio_data) == 0:
+            return []
+        return self.backend.transcribe_words(
+            self.normalize_audio(audio_data),
             language=self.language,
+            initial_prompt=initial_prompt,
         )
 
-        return result.get("text", "").strip()
+    def start_partial(self, context: str = "", max_window_s: float = 15.0) -> "PartialTranscription":
+        """
+        Start a streaming session for one utterance.
+
+        Args:
+            context: Text typed before this utterance (passed as prompt)
+            max_window_s: Window length after which committed audio is trimmed
+
+        Returns:
+            PartialTranscription session
+        """
+        return PartialTranscription(self, context=context, max_window_s=max_window_s)
 
     @staticmethod
-    def normalize_audio(audio_int16: np.ndarray) -> np.ndarray:
+    def normalize_audio(audio: np.ndarray) -> np.ndarray:
         """
-        Convert int16 audio to normalized float32.
+        Convert audio to the float32 the engines take, at the model boundary.
+
+        Capture keeps samples int16 all the way here, so this is the only
+        conversion a phrase goes through: one fused cast-and-scale by 1/32768,
+        the exact inverse of PortAudio's int16 mapping. float32 input is
+        passed through without a copy.
 
         Args:
-            audio_int16: Audio data as int16
+            audio: Audio data as int16, or float32 already in [-1, 1]
 
         Returns:
             Normalized float32 audio in range [-1, 1]
         """
-        return audio_int16.astype(np.float32) / 32768.0
+        # asarray drops the TracedPhrase subclass: engines get a plain array
+        if audio.dtype == np.int16:
+            return int16_to_float32(audio)
+        return np.asarray(audio, dtype=np.float32)
+
+
+class PartialTranscription:
+    """
+    LocalAgreement-2 streaming over one growing utterance.
+
+    Each ``update`` re-decodes the current window and commits the longest word
+    prefix on which the last two hypotheses agree. Committed words are never
+    revised, so they can be typed right away; each decode is aligned to them
+    by text (then by timestamps), so a later decode that merges or splits an
+    already committed word neither retypes nor drops anything. When the window grows past
+    ``max_window_s`` it is trimmed after the last committed word (when the
+    backend provides word timestamps) and the trimmed text joins the prompt
+    context, which keeps every re-decode bounded.
+    """
+
+    SAMPLE_RATE = 16000
+    PROMPT_CHARS = 200
+
+    def __init__(self, transcriber: StreamingTranscriber, context: str = "", max_window_s: float = 15.0):
+        """
+        Initialize the session.
+
+        Args:
+            transcriber: Transcriber used for the re-decodes
+            context: Text typed before this utterance (passed as prompt)
+            max_window_s: Window length after which committed audio is trimmed
+        """
+        self.transcriber = transcriber
+        self.context = context
+        self.max_window_s = max_window_s
+
+        self.committed: List[str] = []
+        self._window_offset = 0          # Samples trimmed from the utterance start
+        self._window_committed = []      # Committed (start, end, word) in the current window
+        self._previous = []              # Previous hypothesis for the current window
+
+    @property
+    def text(self) -> str:
+        """All text committed so far."""
+        return " ".join(self.committed)
+
+    def update(self, audio: np.ndarray) -> str:
+        """
+        Re-decode the utterance so far and commit the agreed prefix.
+
+        Args:
+            audio: Utterance audio from its start (int16, or float32 in [-1, 1])
+
+        Returns:
+            Newly committed text (empty if nothing new is stable)
+        """
+        words = self._decode(audio)
+        pending = words[self._committed_end(words):]
+        previous = self._previous[self._committed_end(self._previous):]
+
+        agreed = 0
+        while (
+            agreed < len(pending)
+            and agreed < len(previous)
+            and self._key(pending[agreed][2]) == self._key(previous[agreed][2])
+        ):
+            agreed += 1
+        self._previous = words
+
+        new_words = pending[:agreed]
+        self._window_committed.extend(new_words)
+        self._commit(new_words)
+        self._maybe_trim(len(audio))
+        return " ".join(word for _, _, word in new_words)
+
+    def finish(self, audio: np.ndarray) -> str:
+        """
+        Decode the complete utterance and commit everything not yet committed.
+
+        Args:
+            audio: Complete utterance audio from its start (int16, or float32 in [-1, 1])
+
+        Returns:
+            Remaining text after the committed prefix
+        """
+        words = self._decode(audio)
+        words = words[self._committed_end(words):]
+        self._commit(words)
+        return " ".join(word for _, _, word in words)
+
+    def _decode(self, audio: np.ndarray) -> List:
+        # Prompt with text whose audio is no longer in the window
+        trimmed = self.committed[:len(self.committed) - len(self._window_committed)]
+        prompt = " ".join([self.context] + trimmed).strip()[-self.PROMPT_CHARS:]
+        return self.transcriber.transcribe_words(audio[self._window_offset:], initial_prompt=prompt or None)
+
+    def _committed_end(self, words: List) -> int:
+        """
+        Find where the words committed in the current window end in a decode.
+
+        The committed text is matched first, ignoring word boundaries, so
+        merged or split words line up; when the text was revised, words
+        centred before the end of the last committed word count as committed.
+
+        Args:
+            words: (start, end, word) tuples of a decode of the current window
+
+        Returns:
+            Index of the first word after the committed ones
+        """
+        if not self._window_committed:
+            return 0
+        target = "".join(self._key(word) for _, _, word in self._window_committed)
+        text = ""
+        fallback = len(words)
+        for i, (_, _, word) in enumerate(words):
+            text += self._key(word)
+            if len(text) >= len(target):
+                if text == target:
+                    return i + 1
+                fallback = i + 1
+                break
+
+        last_end = self._window_committed[-1][1]
+        if last_end is not None and all(start is not None and end is not None for start, end, _ in words):
+            end = 0
+            while end < len(words) and (words[end][0] + words[end][1]) / 2 <= last_end:
+                end += 1
+            return end
+        # No timing: as many words as cover the committed text's length
+        return fallback
+
+    def _commit(self, words: List):
+        self.committed.extend(word for _, _, word in words if word)
+
+    def _maybe_trim(self, total_samples: int):
+        """Drop committed audio from the window once it grows past max_window_s."""
+        window_s = (total_samples - self._window_offset) / self.SAMPLE_RATE
+        if window_s <= self.max_window_s or not self._window_committed:
+            return
+        last_end = self._window_committed[-1][1]
+        if last_end is None:
+            return  # No word timing from this backend: keep the full window
+        self._window_offset += int(last_end * self.SAMPLE_RATE)
+        self._window_committed = []
+        self._previous = []
+
+    @staticmethod
+    def _key(word: str) -> str:
+        """Comparison key that ignores case and punctuation."""
+        return re.sub(r"[^\w']", "", word.lower())
@@ -1,39 +1,198 @@
 """Voice Activity Detection using Silero VAD."""
 
-import torch
+import importlib.util
 import numpy as np
 import os
+import sys
+import time
 from typing import List, Dict, Optional
 import threading
 
+from vibevoice.audio_io import int16_to_float32
+from vibevoice.telemetry import telemetry
+
+# File name of the Silero VAD ONNX export (silero-vad repo and pip package)
+ONNX_NAME = "silero_vad.onnx"
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident memory of this process in MB (None where unsupported)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+class OnnxVADModel:
+    """Silero VAD ONNX export run with ONNX Runtime, without importing torch."""
+
+    def __init__(self, path: str):
+        """
+        Load the model.
+
+        Args:
+            path: Path to a Silero VAD v4 or v5 .onnx file
+
+        Raises:
+            ImportError: If onnxruntime is not installed
+        """
+        import onnxruntime
+
+        options = onnxruntime.SessionOptions()
+        options.inter_op_num_threads = 1
+        options.intra_op_num_threads = 1
+        self.session = onnxruntime.InferenceSession(path, sess_options=options, providers=["CPUExecutionProvider"])
+        # v5 keeps one "state" tensor and expects the previous chunk's tail as context; v4 keeps h and c
+        self._v5 = "state" in {i.name for i in self.session.get_inputs()}
+        self.reset_states()
+
+    def reset_states(self):
+        """Reset the recurrent state before a new stream."""
+        if self._v5:
+            self._state = np.zeros((2, 1, 128), dtype=np.float32)
+        else:
+            self._h = np.zeros((2, 1, 64), dtype=np.float32)
+            self._c = np.zeros((2, 1, 64), dtype=np.float32)
+        self._context = None
+
+    def __call__(self, chunk: np.ndarray, sample_rate: int = 16000) -> float:
+        """Speech probability of one 512-sample (16kHz) float32 chunk."""
+        x = chunk.reshape(1, -1).astype(np.float32, copy=False)
+        sr = np.array(sample_rate, dtype=np.int64)
+        if not self._v5:
+            out, self._h, self._c = self.session.run(None, {"input": x, "h": self._h, "c": self._c, "sr": sr})
+            return float(out.reshape(-1)[0])
+
+        context_size = 64 if sample_rate == 16000 else 32
+        if self._context is None:
+            self._context = np.zeros((1, context_size), dtype=np.float32)
+        x = np.concatenate((self._context, x), axis=1)
+        out, self._state = self.session.run(None, {"input": x, "state": self._state, "sr": sr})
+        self._context = x[:, -context_size:]
+        return float(out.reshape(-1)[0])
+
+
+class TorchVADModel:
+    """TorchScript Silero VAD (local file or torch.hub) behind the same numpy interface."""
+
+    def __init__(self, model):
+        import torch
+
+        self._torch = torch
+        self.model = model
+
+    def reset_states(self):
+        """Reset the recurrent state before a new stream."""
+        self.model.reset_states()
+
+    def __call__(self, chunk: np.ndarray, sample_rate: int = 16000) -> float:
+        """Speech probability of one 512-sample (16kHz) float32 chunk."""
+        return self.model(self._torch.from_numpy(chunk), sample_rate).item()
+
 
 class SileroVAD:
     """
     Voice Activity Detection using Silero VAD.
     Enterprise-grade, ultra-fast (<1ms per 32ms chunk).
+
+    The model is loaded from a local file when one is found (see
+    ``find_local_model``): ONNX files run on ONNX Runtime without torch,
+    TorchScript files on torch. Only when no local file exists is it
+    fetched with torch.hub.
     """
 
     _model = None
     _utils = None
     _lock = threading.Lock()
 
+    # Source, path, load time, whether torch got imported and peak RSS of the last load
+    load_stats = None
+
+    @staticmethod
+    def find_local_model() -> Optional[str]:
+        """
+        Find a Silero VAD file that loads without network access.
+
+        Looks at VIBEVOICE_VAD_MODEL (.onnx or TorchScript .jit), then the
+        ``silero-vad`` pip package and finally a torch.hub checkout of
+        snakers4/silero-vad. No model file ships with vibevoice.
+
+        Returns:
+            Path to the model file, or None
+
+        Raises:
+            FileNotFoundError: If VIBEVOICE_VAD_MODEL points to a missing file
+        """
+        path = os.environ.get("VIBEVOICE_VAD_MODEL")
+        if path:
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"VIBEVOICE_VAD_MODEL not found: {path}")
+            return path
+
+        candidates = []
+
+        # Locate the pip package without importing it (its __init__ imports torch)
+        spec = importlib.util.find_spec("silero_vad")
+        if spec is not None and spec.submodule_search_locations:
+            candidates.append(os.path.join(list(spec.submodule_search_locations)[0], "data", ONNX_NAME))
+
+        cache_home = os.environ.get("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache"))
+        torch_home = os.environ.get("TORCH_HOME", os.path.join(cache_home, "torch"))
+        candidates.append(
+            os.path.join(torch_home, "hub", "snakers4_silero-vad_master", "src", "silero_vad", "data", ONNX_NAME)
+        )
+
+        for candidate in candidates:
+            if os.path.exists(candidate):
+                return candidate
+        return None
+
     @classmethod
     def load_model(cls):
         """Load Silero VAD model (lazy loading, cached)."""
         with cls._lock:
             if cls._model is None:
                 print("Loading Silero VAD model...")
+                start = time.perf_counter()
+                path = cls.find_local_model()
+                source = None
                 try:
-                    cls._model, cls._utils = torch.hub.load(
-                        repo_or_dir='snakers4/silero-vad',
-                        model='silero_vad',
-                        force_reload=False,
-                        verbose=False
-                    )
-                    print("Silero VAD loaded!")
+                    if path is not None and path.endswith(".onnx"):
+                        try:
+                            cls._model = OnnxVADModel(path)
+                            source = "onnx"
+                        except ImportError:
+                            print("onnxruntime is not installed, loading Silero VAD with torch")
+                    elif path is not None:
+                        import torch
+                        cls._model = TorchVADModel(torch.jit.load(path))
+                        source = "torchscript"
+
+                    if cls._model is None:
+                        import torch
+                        model, cls._utils = torch.hub.load(
+                            repo_or_dir='snakers4/silero-vad',
+                            model='silero_vad',
+                            force_reload=False,
+                            verbose=False
+                        )
+                        cls._model = TorchVADModel(model)
+                        source, path = "torch.hub", None
                 except Exception as e:
                     print(f"Failed to load Silero VAD: {e}")
                     raise
+
+                cls.load_stats = {
+                    "source": source,
+                    "path": path,
+                    "load_time": time.perf_counter() - start,
+                    "torch_loaded": "torch" in sys.modules,
+                    "peak_rss_mb": peak_rss_mb(),
+                }
+                print(f"Silero VAD loaded! ({source}, {cls.load_stats['load_time'] * 1000:.0f} ms)")
         return cls._model, cls._utils
 
     def __init__(self, threshold: float = 0.5, min_silence_ms: int = 400):
@@ -47,7 +206,8 @@ class SileroVAD:
         self.threshold = threshold
         self.min_silence_ms = min_silence_ms
         self.model, self.utils = self.load_model()
-        self.get_speech_timestamps = self.utils[0]
+        # torch.hub utilities; models loaded from a file use the streaming detector
+        self.get_speech_timestamps = self.utils[0] if self.utils else None
 
     def detect_speech(self, audio: np.ndarray) -> List[Dict]:
         """
@@ -62,28 +222,51 @@ class SileroVAD:
         if len(audio) == 0:
             return []
 
-        # Convert to int16 for Silero VAD (expects 16kHz, int16)
-        if audio.dtype != np.int16:
-            audio_int16 = (audio * 32768).astype(np.int16)
-        else:
-            audio_int16 = audio
+        if self.get_speech_timestamps is None:
+            # The streaming detector scales int16 chunk by chunk: no full-array conversion
+            try:
+                with telemetry.span("vad_detect"):
+                    return self._detect_streaming(audio)
+            except Exception as e:
+                print(f"VAD error: {e}")
+                return []
+
+        import torch
 
-        # Silero VAD expects int16 tensor at 16kHz
-        audio_tensor = torch.from_numpy(audio_int16)
+        # Silero's torch utilities expect a float32 tensor at 16kHz
+        if audio.dtype == np.int16:
+            audio = int16_to_float32(audio)
+        audio_tensor = torch.from_numpy(np.asarray(audio, dtype=np.float32))
 
         # Get speech timestamps
         try:
-            timestamps = self.get_speech_timestamps(
-                audio_tensor,
-                self.model,
-                threshold=self.threshold,
-                sampling_rate=16000
-            )
+            with telemetry.span("vad_detect"):
+                timestamps = self.get_speech_timestamps(
+                    audio_tensor,
+                    self.model.model,
+                    threshold=self.threshold,
+                    min_silence_duration_ms=self.min_silence_ms,
+                    sampling_rate=16000
+                )
             return timestamps
         except Exception as e:
             print(f"VAD error: {e}")
             return []
 
+    def _detect_streaming(self, audio: np.ndarray) -> List[Dict]:
+        """Speech timestamps from one pass of the streaming detector."""
+        stream = self.stream()
+        stream.reset()
+        timestamps = []
+        start = None
+        for event in stream.process(audio) + stream.flush():
+            if 'start' in event:
+                start = event['start']
+            elif start is not None:
+                timestamps.append({'start': start, 'end': min(event['end'], len(audio))})
+                start = None
+        return timestamps
+
     def get_phrases(self, audio: np.ndarray) -> List[np.ndarray]:
         """
         Split audio into phrases based on VAD-detected speech segments.
@@ -121,6 +304,35 @@ class SileroVAD:
         """
         return len(self.detect_speech(audio)) > 0
 
+    def speech_probability(self, chunk: np.ndarray, sample_rate: int = 16000) -> float:
+        """
+        Run one chunk through the model, advancing its recurrent state.
+
+        Args:
+            chunk: 512 float32 samples in [-1, 1] (at 16kHz)
+            sample_rate: Sample rate in Hz
+
+        Returns:
+            Speech probability for the chunk
+        """
+        return self.model(chunk, sample_rate)
+
+    def reset_states(self):
+        """Reset the model's recurrent state before a new stream."""
+        self.model.reset_states()
+
+    def stream(self, speech_pad_ms: int = 30) -> "StreamingVAD":
+        """
+        Create an incremental detector sharing this VAD's model.
+
+        Args:
+            speech_pad_ms: Padding added around detected speech (ms)
+
+        Returns:
+            StreamingVAD instance
+        """
+        return StreamingVAD(self, speech_pad_ms=speech_pad_ms)
+
     @staticmethod
     def ms_to_samples(ms: int, sample_rate: int = 16000) -> int:
         """Convert milliseconds to sample count."""
@@ -130,3 +342,154 @@ class SileroVAD:
     def samples_to_ms(samples: int, sample_rate: int = 16000) -> int:
         """Convert sample count to milliseconds."""
         return int(samples * 1000 / sample_rate)
+
+
+class StreamingVAD:
+    """
+    Incremental speech boundary detector.
+
+    Audio is fed in arbitrary block sizes and run through the model once, in
+    512-sample chunks, keeping the model's recurrent state between chunks.
+    Speech start and end boundaries are emitted as soon as they are known,
+    honoring the VAD's ``threshold`` and ``min_silence_ms``.
+
+    The model state lives in the shared SileroVAD model, so only one stream
+    per process should be active at a time, and ``detect_speech`` must not be
+    called on the same model while a stream is running.
+    """
+
+    CHUNK_SIZE = 512
+
+    def __init__(self, vad: SileroVAD, sample_rate: int = 16000, speech_pad_ms: int = 30):
+        """
+        Initialize the stream.
+
+        Args:
+            vad: SileroVAD providing the model, threshold and min_silence_ms
+            sample_rate: Sample rate in Hz (16kHz for 512-sample chunks)
+            speech_pad_ms: Padding added around detected speech (ms)
+        """
+        self.vad = vad
+        self.sample_rate = sample_rate
+        self.threshold = vad.threshold
+        self.neg_threshold = max(vad.threshold - 0.15, 0.01)
+        self.min_silence_samples = SileroVAD.ms_to_samples(vad.min_silence_ms, sample_rate)
+        self.speech_pad_samples = SileroVAD.ms_to_samples(speech_pad_ms, sample_rate)
+
+        self._chunk = np.zeros(self.CHUNK_SIZE, dtype=np.float32)
+        self.reset()
+
+    def reset(self, position: int = 0):
+        """
+        Reset the speech/silence state and the model state.
+
+        Args:
+            position: Absolute sample position of the next sample fed in
+        """
+        self.vad.reset_states()
+        self.position = position
+        self.triggered = False
+        self.speech_start = None
+        self._temp_end = 0
+        self._filled = 0
+
+    def process(self, audio: np.ndarray) -> List[Dict]:
+        """
+        Feed audio and collect speech boundaries completed by it.
+
+        Args:
+            audio: Audio data as numpy array (int16 or float32)
+
+        Returns:
+            List of events, each {'start': pos} or {'end': pos} in absolute samples
+        """
+        events = []
+        audio = audio.reshape(-1)
+        scale = 1.0 / 32768 if audio.dtype == np.int16 else 1.0
+
+        offset = 0
+        while offset < len(audio):
+            n = min(self.CHUNK_SIZE - self._filled, len(audio) - offset)
+            np.multiply(audio[offset:offset + n], scale,
+                        out=self._chunk[self._filled:self._filled + n], casting='unsafe')
+            self._filled += n
+            offset += n
+
+            if self._filled == self.CHUNK_SIZE:
+                self._filled = 0
+                self.position += self.CHUNK_SIZE
+                event = self._update(self.vad.speech_probability(self._chunk, self.sample_rate))
+                if event is not None:
+                    events.append(event)
+
+        return events
+
+    def flush(self) -> List[Dict]:
+        """
+        Close an open speech segment at the current position.
+
+        Returns:
+            List with an 'end' event if speech was in progress, else empty
+        """
+        end = self.position + self._filled
+        self._filled = 0
+        if not self.triggered:
+            return []
+        self.triggered = False
+        self._temp_end = 0
+        return [{'end': end}]
+
+    def _update(self, prob: float) -> Optional[Dict]:
+        """Advance the speech/silence state machine by one chunk."""
+        if prob >= self.threshold and self._temp_end:
+            self._temp_end = 0
+
+        if prob >= self.threshold and not self.triggered:
+            self.triggered = True
+            self.speech_start = max(0, self.position - self.CHUNK_SIZE - self.speech_pad_samples)
+            return {'start': self.speech_start}
+
+        if prob < self.neg_threshold and self.triggered:
+            if not self._temp_end:
+                self._temp_end = self.position
+            if self.position - self._temp_end < self.min_silence_samples:
+                return None
+            end = self._temp_end + self.speech_pad_samples
+            self._temp_end = 0
+            self.triggered = False
+            return {'end': end}
+
+        return None
+
+
+def main():
+    """Report Silero VAD load time, torch usage, peak RSS and per-chunk latency."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Measure Silero VAD cold start")
+    parser.add_argument("--model", help="Model file (.onnx or .jit), overrides VIBEVOICE_VAD_MODEL")
+    args = parser.parse_args()
+    if args.model:
+        os.environ["VIBEVOICE_VAD_MODEL"] = args.model
+
+    baseline = peak_rss_mb()
+    vad = SileroVAD()
+    stats = SileroVAD.load_stats
+
+    chunk = np.zeros(StreamingVAD.CHUNK_SIZE, dtype=np.float32)
+    vad.reset_states()
+    start = time.perf_counter()
+    for _ in range(100):
+        vad.speech_probability(chunk)
+    per_chunk = (time.perf_counter() - start) / 100
+
+    print(f"source:       {stats['source']} ({stats['path'] or 'downloaded'})")
+    print(f"load time:    {stats['load_time'] * 1000:.0f} ms")
+    print(f"torch loaded: {stats['torch_loaded']}")
+    if baseline is not None:
+        print(f"peak RSS:     {stats['peak_rss_mb']:.0f} MB (+{stats['peak_rss_mb'] - baseline:.0f} MB for the VAD)")
+    print(f"per chunk:    {per_chunk * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Tests for block-wise audio file reading and windowing."""
+
+import os
+import sys
+import wave
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+
+import numpy as np
+from scipy.signal import resample_poly
+
+from vibevoice.audio_io import PCMReader, StreamResampler, iter_windows, open_audio
+
+
+def write_wav(path, pcm, rate, channels=1):
+    with wave.open(str(path), "wb") as wav:
+        wav.setnchannels(channels)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(pcm.astype("<i2").tobytes())
+
+
+def test_stream_resampler_matches_resample_poly():
+    x = np.random.default_rng(0).standard_normal(44100 * 2).astype(np.float32)
+    resampler = StreamResampler(44100)
+    parts = [resampler.process(x[i:i + 1000]) for i in range(0, len(x), 1000)]
+    parts.append(resampler.flush())
+
+    expected = resample_poly(x, 160, 441)
+    result = np.concatenate(parts)
+    assert len(result) == len(expected)
+    np.testing.assert_allclose(result, expected, atol=1e-5)
+
+
+def test_wav_is_memory_mapped_and_read_in_blocks(tmp_path):
+    pcm = np.random.default_rng(1).integers(-20000, 20000, 16000 * 3)
+    write_wav(tmp_path / "a.wav", pcm, 16000)
+
+    reader = open_audio(str(tmp_path / "a.wav"))
+    assert isinstance(reader, PCMReader)
+    assert isinstance(reader._pcm, np.memmap)
+    blocks = list(reader.blocks(4000))
+    assert max(len(block) for block in blocks) == 4000
+    np.testing.assert_allclose(np.concatenate(blocks), pcm / 32768.0)
+
+
+def test_windows_are_bounded_and_cover_the_signal():
+    audio = np.random.default_rng(2).standard_normal(16000 * 70).astype(np.float32)
+    blocks = (audio[i:i + 16000] for i in range(0, len(audio), 16000))
+
+    windows = list(iter_windows(blocks, max_window_s=30.0))
+    assert all(len(window) <= 16000 * 30 for _, window in windows)
+    np.testing.assert_array_equal(np.concatenate([window for _, window in windows]), audio)
+    assert [start for start, _ in windows][0] == 0
+    # Windows outlive the ring buffer they were read from
+    assert all(window.flags.owndata for _, window in windows)
+
+
+def test_long_stretch_is_cut_at_the_quietest_point_near_the_limit():
+    audio = np.random.default_rng(3).standard_normal(16000 * 40).astype(np.float32)
+    audio[16000 * 29:16000 * 29 + 640] = 0  # Pause 1 s before the limit
+    audio[16000 * 20:16000 * 20 + 640] = 0  # Outside the searched region
+    blocks = (audio[i:i + 16000] for i in range(0, len(audio), 16000))
+
+    windows = list(iter_windows(blocks, max_window_s=30.0, cut_search_s=2.0))
+    assert [start for start, _ in windows] == [0, 16000 * 29]
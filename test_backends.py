@@ -0,0 +1,151 @@
+"""Tests that batched and sequential faster-whisper decoding agree, on a stub model."""
+
+import os
+import sys
+import zlib
+from types import ModuleType, SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+
+import numpy as np
+import pytest
+
+from vibevoice.backends import FasterWhisperBackend, MLXWhisperBackend, TranscriptionBackend
+
+# Clip id -> temperature-0 result (text, avg_logprob, no_speech_prob) and the
+# text the temperature fallback settles on
+SCRIPT = {
+    1: (("Bonjour tout le monde.", -0.2, 0.01), None),
+    2: (("Merci.", -1.5, 0.9), "Merci."),              # Silence
+    3: (("Oui.", -0.3, 0.9), None),                    # Likely silence, but confident
+    4: ((" ".join(["la"] * 40), -0.4, 0.05), "la la la."),  # Too repetitive
+    5: (("Euh bon ben.", -1.4, 0.1), "Eh bien."),      # Too improbable
+}
+
+
+class StubWhisperModel:
+    """Sequential WhisperModel.transcribe as faster-whisper implements it, on scripted clips."""
+
+    def __init__(self):
+        self.calls = []
+
+    def transcribe(self, audio, language=None, **options):
+        self.calls.append(dict(options, language=language))
+        (text, avg_logprob, no_speech_prob), fallback = SCRIPT[int(audio[0])]
+        no_speech_threshold = options.get("no_speech_threshold", 0.6)
+        log_prob_threshold = options.get("log_prob_threshold", -1.0)
+
+        # generate_with_fallback
+        ratio = len(text.encode()) / len(zlib.compress(text.encode()))
+        ratio_threshold = options.get("compression_ratio_threshold", 2.4)
+        retry = (ratio_threshold is not None and ratio > ratio_threshold) or avg_logprob < log_prob_threshold
+        if no_speech_prob > no_speech_threshold and avg_logprob < log_prob_threshold:
+            retry = False
+        if retry:
+            text, avg_logprob, no_speech_prob = fallback, -0.5, 0.0
+
+        # generate_segments: skip windows without speech
+        if no_speech_prob > no_speech_threshold and not avg_logprob > log_prob_threshold:
+            return iter([]), None
+        return iter([SimpleNamespace(text=" " + text)]), None
+
+
+class StubBackend(FasterWhisperBackend):
+    def __init__(self, **options):
+        super().__init__("small", **options)
+        self.model = StubWhisperModel()
+        self.batches = []
+
+    def _generate_batch(self, audios, language, decode_options):
+        self.batches.append(decode_options["beam_size"])
+        return [SCRIPT[int(audio[0])][0] for audio in audios]
+
+
+def clip(clip_id):
+    return np.full(16000, clip_id, dtype=np.float32)
+
+
+@pytest.mark.parametrize("options", [{}, {"no_speech_threshold": 0.95}, {"compression_ratio_threshold": None}])
+def test_batched_and_sequential_decodes_agree(options):
+    audios = [clip(clip_id) for clip_id in SCRIPT]
+    backend = StubBackend()
+
+    batched = backend.transcribe_batch(audios, language="fr", beam_size=5, **options)
+    assert backend.batches == [5]
+    sequential = [backend.transcribe_batch([audio], language="fr", beam_size=5, **options)[0] for audio in audios]
+
+    assert batched == sequential
+    assert batched[1] == ("Merci." if options.get("no_speech_threshold") == 0.95 else "")
+    assert batched[3] == ("la la la." if options.get("compression_ratio_threshold", 2.4) else SCRIPT[4][0][0])
+    # Every decode the model ran got the request's options
+    assert all(call["beam_size"] == 5 and call["language"] == "fr" for call in backend.model.calls)
+    assert all(call.get(name) == value for call in backend.model.calls for name, value in options.items())
+
+
+def test_single_clip_and_unbatchable_options_keep_the_options():
+    backend = StubBackend(beam_size=3)
+
+    assert backend.transcribe_batch([clip(1)], language="fr") == ["Bonjour tout le monde."]
+    assert backend.model.calls[-1]["beam_size"] == 3
+
+    backend.transcribe_batch([clip(1), clip(4)], language="fr", vad_filter=True, best_of=2)
+    assert backend.batches == []
+    assert [call["vad_filter"] for call in backend.model.calls[-2:]] == [True, True]
+    assert backend.model.calls[-1]["best_of"] == 2
+
+
+@pytest.fixture
+def fake_mlx(monkeypatch):
+    """mlx_whisper modules whose transcribe() reports which model decoded."""
+    loads = []
+
+    class ModelHolder:
+        model = None
+        model_path = None
+
+        @classmethod
+        def get_model(cls, model_path, dtype):
+            if cls.model is None or model_path != cls.model_path:
+                cls.model, cls.model_path = load_model(model_path, dtype=dtype), model_path
+            return cls.model
+
+    def load_model(path, dtype=None):
+        loads.append(path)
+        return f"model:{path}"
+
+    def transcribe(audio, path_or_hf_repo, **options):
+        return {"text": ModelHolder.get_model(path_or_hf_repo, "float16")}
+
+    modules = {
+        "mlx": ModuleType("mlx"),
+        "mlx.core": SimpleNamespace(float16="float16"),
+        "mlx_whisper": SimpleNamespace(transcribe=transcribe),
+        "mlx_whisper.load_models": SimpleNamespace(load_model=load_model),
+        "mlx_whisper.transcribe": SimpleNamespace(ModelHolder=ModelHolder),
+    }
+    for name, module in modules.items():
+        monkeypatch.setitem(sys.modules, name, module)
+    return loads
+
+
+def test_mlx_backends_of_different_sizes_stay_loaded(fake_mlx):
+    small, base = MLXWhisperBackend("small"), MLXWhisperBackend("base")
+    small.load()
+    base.load()
+
+    audio = np.zeros(16000, dtype=np.float32)
+    for _ in range(2):
+        assert small.transcribe(audio) == "model:mlx-community/whisper-small"
+        assert base.transcribe(audio) == "model:mlx-community/whisper-base"
+    assert fake_mlx == ["mlx-community/whisper-small", "mlx-community/whisper-base"]
+
+
+def test_backend_must_implement_load_and_transcribe():
+    class Incomplete(TranscriptionBackend):
+        MODELS = {"small": "stub/small"}
+
+        def load(self):
+            return None
+
+    with pytest.raises(TypeError):
+        Incomplete("small")
@@ -0,0 +1,86 @@
+"""Tests for resuming offline batches from the manifest, with in-process fake workers."""
+
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+
+import pytest
+
+from vibevoice import batch
+
+
+class FakeWorkers:
+    """Replaces the process pool and transcribe_file; fails the files in ``failing``."""
+
+    def __init__(self, monkeypatch):
+        self.transcribed = []
+        self.failing = set()
+        monkeypatch.setattr(batch, "ProcessPoolExecutor", self.executor)
+        monkeypatch.setattr(batch, "transcribe_file", self.transcribe_file)
+
+    @staticmethod
+    def executor(max_workers, mp_context=None, initializer=None, initargs=()):
+        return ThreadPoolExecutor(max_workers=max_workers)
+
+    def transcribe_file(self, path):
+        self.transcribed.append(os.path.basename(path))
+        if path in self.failing:
+            raise RuntimeError("decode failed")
+        segments = [{"start": 0.0, "end": 1.5, "text": os.path.basename(path)}]
+        return {"path": path, "duration": 1.5, "segments": segments, "text": segments[0]["text"]}
+
+
+@pytest.fixture
+def workers(monkeypatch):
+    return FakeWorkers(monkeypatch)
+
+
+def manifest_paths(output_dir):
+    with open(os.path.join(output_dir, batch.MANIFEST_NAME), encoding="utf-8") as f:
+        return [os.path.basename(json.loads(line)["path"]) for line in f if line.strip().endswith("}")]
+
+
+def test_resume_skips_finished_files_and_redoes_failed_ones(workers, tmp_path):
+    audio_dir = tmp_path / "audio"
+    audio_dir.mkdir()
+    for name in ("a.wav", "b.wav", "c.wav", "notes.txt"):
+        (audio_dir / name).write_bytes(b"")
+    output_dir = tmp_path / "out"
+    output_dir.mkdir()
+    a, b, c = (str(audio_dir / name) for name in ("a.wav", "b.wav", "c.wav"))
+
+    # a finished in an earlier run; the run was interrupted while writing b's line
+    with open(output_dir / batch.MANIFEST_NAME, "w", encoding="utf-8") as f:
+        f.write(json.dumps({"path": a, "duration": 1.0, "segments": [], "text": ""}) + "\n")
+        f.write(json.dumps({"path": b})[:12])
+    assert batch.completed_files(str(output_dir)) == {a}
+
+    workers.failing.add(c)
+    assert batch.run_batch([str(audio_dir)], str(output_dir), formats=("jsonl", "srt"), jobs=2) == 1
+    assert sorted(workers.transcribed) == ["b.wav", "c.wav"]
+    assert manifest_paths(output_dir) == ["a.wav", "b.wav"]
+    assert os.path.exists(batch.srt_path(str(output_dir), b))
+
+    # The failed file is the only one left
+    workers.transcribed.clear()
+    workers.failing.clear()
+    assert batch.run_batch([str(audio_dir)], str(output_dir)) == 0
+    assert workers.transcribed == ["c.wav"]
+    assert manifest_paths(output_dir) == ["a.wav", "b.wav", "c.wav"]
+    assert batch.completed_files(str(output_dir)) == {a, b, c}
+
+    workers.transcribed.clear()
+    assert batch.run_batch([str(audio_dir)], str(output_dir)) == 0
+    assert workers.transcribed == []
+
+
+def test_srt_times_and_layout(tmp_path):
+    path = str(tmp_path / "out.srt")
+    batch.write_srt(path, [{"start": 0.0, "end": 1.5, "text": "one"}, {"start": 3661.25, "end": 3662.0, "text": "two"}])
+
+    with open(path, encoding="utf-8") as f:
+        assert f.read() == "1\n00:00:00,000 --> 00:00:01,500\none\n\n2\n01:01:01,250 --> 01:01:02,000\ntwo\n\n"
+    assert not os.path.exists(path + ".tmp")
@@ -0,0 +1,103 @@
+"""Tests for the transcription result cache and its use by StreamingTranscriber."""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+
+import numpy as np
+
+from vibevoice import transcriber as transcriber_module
+from vibevoice.cache import TranscriptionCache
+from vibevoice.transcriber import StreamingTranscriber
+
+
+def test_key_changes_with_audio_model_and_options():
+    audio = np.arange(1600, dtype=np.int16)
+    base = TranscriptionCache.key(audio, model="small", options={"beam_size": 1})
+
+    assert TranscriptionCache.key(audio.copy(), model="small", options={"beam_size": 1}) == base
+    assert TranscriptionCache.key(audio, model="base", options={"beam_size": 1}) != base
+    assert TranscriptionCache.key(audio, model="small", options={"beam_size": 5}) != base
+    assert TranscriptionCache.key(audio, model="small", options={"beam_size": 1}, language="de") != base
+    assert TranscriptionCache.key(audio.astype(np.float32), model="small", options={"beam_size": 1}) != base
+    changed = audio.copy()
+    changed[-1] += 1
+    assert TranscriptionCache.key(changed, model="small", options={"beam_size": 1}) != base
+
+
+def test_memory_tier_evicts_least_recently_used_at_the_byte_limit():
+    # Each value is stored as its 12-byte JSON string
+    cache = TranscriptionCache(max_memory_bytes=36)
+    for name in "abc":
+        cache.put(name, name * 10)
+    assert cache.get("a") == "a" * 10  # Now the most recently used
+
+    cache.put("d", "d" * 10)
+    assert cache.get("b") is None
+    assert [cache.get(name) for name in "acd"] == ["a" * 10, "c" * 10, "d" * 10]
+    stats = cache.stats()
+    assert stats["memory_entries"] == 3 and stats["memory_bytes"] == 36
+    assert stats["memory_hits"] == 4 and stats["misses"] == 1
+
+
+def test_disk_tier_persists_and_trims(tmp_path):
+    cache = TranscriptionCache(max_memory_bytes=1024, cache_dir=str(tmp_path), max_disk_bytes=36)
+    for name in "abc":
+        cache.put(name, name * 10)
+
+    # A new instance (a restarted server) reads the disk tier and promotes hits to memory
+    reopened = TranscriptionCache(max_memory_bytes=1024, cache_dir=str(tmp_path), max_disk_bytes=36)
+    assert reopened.get("a") == "a" * 10
+    assert reopened.get("a") == "a" * 10
+    assert reopened.stats()["disk_hits"] == 1 and reopened.stats()["memory_hits"] == 1
+
+    # Over the disk budget the least recently accessed entry goes: b
+    reopened.put("d", "d" * 10)
+    stats = reopened.stats()
+    assert stats["disk_entries"] == 3 and stats["disk_bytes"] == 36
+    fresh = TranscriptionCache(cache_dir=str(tmp_path), max_disk_bytes=36)
+    assert fresh.get("b") is None
+    assert [fresh.get(name) for name in "acd"] == ["a" * 10, "c" * 10, "d" * 10]
+
+
+class CountingBackend:
+    """Backend stub counting decodes (copies made by with_options share the count)."""
+
+    name = "stub"
+    model_path = "stub/small"
+
+    def __init__(self):
+        self.options = {"beam_size": 1}
+        self.decoded_lengths = []
+
+    def load(self):
+        return self
+
+    def transcribe(self, audio, language=None):
+        self.decoded_lengths.append(len(audio))
+        return f"text {len(audio)}"
+
+    def transcribe_batch(self, audios, language=None):
+        self.decoded_lengths.extend(len(audio) for audio in audios)
+        return [f"text {len(audio)}" for audio in audios]
+
+
+def test_cache_hit_skips_the_backend(monkeypatch):
+    backend = CountingBackend()
+    monkeypatch.setattr(transcriber_module, "create_backend", lambda *args, **kwargs: backend)
+    transcriber = StreamingTranscriber(warmup_seconds=0, cache=TranscriptionCache())
+
+    phrase = np.full(8000, 100, dtype=np.int16)
+    assert transcriber.transcribe(phrase) == "text 8000"
+    assert transcriber.transcribe(phrase.copy()) == "text 8000"
+    assert len(backend.decoded_lengths) == 1
+
+    # In a batch only the phrases not cached yet reach the backend
+    other = np.full(4000, 50, dtype=np.int16)
+    assert transcriber.transcribe_batch([phrase, other]) == ["text 8000", "text 4000"]
+    assert backend.decoded_lengths == [8000, 4000]
+
+    # Other decode options miss the cache
+    assert transcriber.with_options(beam_size=5).transcribe(phrase) == "text 8000"
+    assert len(backend.decoded_lengths) == 3
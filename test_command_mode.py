@@ -0,0 +1,128 @@
+"""Tests for the streaming Ollama command-mode client against a local fake server."""
+
+import io
+import json
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+
+from vibevoice.command_mode import CommandMode, NDJSONParser, OllamaClient, TokenBuffer
+from vibevoice.output_sinks import StreamSink, TypingQueue
+
+TOKENS = ["Hel", "lo", " wor", "ld", "!"]
+
+
+class FakeOllama(BaseHTTPRequestHandler):
+    """Streams TOKENS as chunked NDJSON, split mid-line, like /api/generate."""
+
+    protocol_version = "HTTP/1.1"
+    connections = 0
+    requests = []
+    bad_line = None  # Written after the second token when set
+
+    def setup(self):
+        super().setup()
+        FakeOllama.connections += 1
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        FakeOllama.requests.append(body)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        lines = [{"response": token, "done": False} for token in TOKENS]
+        lines.append({"response": "", "done": True, "eval_count": 5, "eval_duration": 250_000_000})
+        encoded = [json.dumps(line).encode() + b"\n" for line in lines]
+        if FakeOllama.bad_line is not None:
+            encoded.insert(2, FakeOllama.bad_line + b"\n")
+        data = b"".join(encoded)
+        for i in range(0, len(data), 7):
+            chunk = data[i:i + 7]
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+            self.wfile.flush()
+        self.wfile.write(b"0\r\n\r\n")
+
+
+def serve():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeOllama)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def test_parser_handles_lines_split_across_chunks():
+    parser = NDJSONParser()
+    data = b'{"a": 1}\n\n{"b": "x\\ny"}\n{"c"'
+    objects = [obj for i in range(len(data)) for obj in parser.feed(data[i:i + 1])]
+    objects += parser.feed(b": 3}") + parser.flush()
+    assert objects == [{"a": 1}, {"b": "x\ny"}, {"c": 3}]
+
+
+def test_streams_tokens_to_typing_queue_over_one_connection():
+    server = serve()
+    FakeOllama.connections = 0
+    FakeOllama.requests = []
+    try:
+        out = io.StringIO()
+        typing_queue = TypingQueue(StreamSink(out))
+        client = OllamaClient(url=f"http://127.0.0.1:{server.server_port}", model="fake", keep_alive="5m")
+        command_mode = CommandMode(typing_queue, client)
+
+        first = command_mode.run("say hello")
+        second = command_mode.run("again", images=["aW1n"])
+        typing_queue.flush()
+    finally:
+        server.shutdown()
+
+    assert first.text == "Hello world!"
+    assert first.tokens == 5
+    assert first.tokens_per_second == 20.0
+    assert 0 < first.ttft <= first.total
+    assert out.getvalue() == "Hello world!" * 2
+
+    assert FakeOllama.connections == 1
+    assert FakeOllama.requests[0]["keep_alive"] == "5m"
+    assert FakeOllama.requests[0]["stream"] is True
+    assert FakeOllama.requests[1]["images"] == ["aW1n"]
+
+
+def test_parser_skips_malformed_lines():
+    parser = NDJSONParser()
+    objects = parser.feed(b'{"a": 1}\n{"respon\n[1, 2]\n{"b": 2}\n') + parser.feed(b'{"c": ') + parser.flush()
+    assert objects == [{"a": 1}, {"b": 2}]
+    assert parser.bad_lines == 3
+
+
+def test_token_buffer_emits_words_at_leading_spaces():
+    emitted = []
+    buffer = TokenBuffer(emitted.append, max_delay=60)
+    for token in ["Hel", "lo", " wor", "ld", "!", " How", " are", " you?\n", "Fine"]:
+        buffer.add(token)
+    assert emitted == ["Hello", " world!", " How", " are", " you?\n"]
+    buffer.flush()
+    assert emitted[-1] == "Fine"
+
+
+def test_malformed_line_does_not_end_the_command():
+    server = serve()
+    FakeOllama.bad_line = b'{"response": "tru'
+    try:
+        out = io.StringIO()
+        typing_queue = TypingQueue(StreamSink(out))
+        client = OllamaClient(url=f"http://127.0.0.1:{server.server_port}", model="fake")
+        result = CommandMode(typing_queue, client).run("say hello")
+        typing_queue.flush()
+    finally:
+        FakeOllama.bad_line = None
+        server.shutdown()
+
+    assert result is not None
+    assert result.text == "Hello world!"
+    assert out.getvalue() == "Hello world!"
@@ -0,0 +1,121 @@
+"""Tests for the server inference pool: batching by key, max-wait flush, backpressure, errors."""
+
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+
+import pytest
+
+from vibevoice.inference_pool import InferencePool, QueueFullError
+
+
+class Recorder:
+    """Batch function that records each call."""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, key, items):
+        self.calls.append((key, list(items)))
+        return [f"{key}:{item}" for item in items]
+
+
+def block_worker(pool: InferencePool) -> threading.Event:
+    """Occupy the pool's only worker until the returned event is set."""
+    started, release = threading.Event(), threading.Event()
+
+    def hold():
+        started.set()
+        release.wait(5)
+
+    pool.submit(hold)
+    assert started.wait(5)
+    return release
+
+
+def test_batches_by_key_and_leaves_other_keys_queued():
+    recorder = Recorder()
+    pool = InferencePool(recorder, workers=1, queue_size=16, max_batch_size=3, max_wait=0.05)
+    release = block_worker(pool)
+
+    futures = [pool.submit_batched(key, i) for i, key in enumerate("aabaab")]
+    assert pool.queue_depth == 6
+    release.set()
+
+    assert [future.result(5) for future in futures] == ["a:0", "a:1", "b:2", "a:3", "a:4", "b:5"]
+    # The oldest waiting job starts the next batch
+    assert recorder.calls == [("a", [0, 1, 3]), ("b", [2, 5]), ("a", [4])]
+    assert pool.get_stats()["batches"] == 3
+
+
+def test_other_keys_stay_available_to_idle_workers():
+    release_a = threading.Event()
+
+    def run(key, items):
+        if key == "a":
+            release_a.wait(5)
+        return [f"{key}:{item}" for item in items]
+
+    pool = InferencePool(run, workers=2, queue_size=16, max_batch_size=4, max_wait=0.01)
+
+    # While one worker is busy with "a", "b" runs on the other one instead of
+    # being pulled into the first worker's backlog
+    first = pool.submit_batched("a", 0)
+    time.sleep(0.05)
+    assert pool.submit_batched("b", 1).result(5) == "b:1"
+    assert not first.done()
+    release_a.set()
+    assert first.result(5) == "a:0"
+
+
+def test_flushes_partial_batch_after_max_wait():
+    recorder = Recorder()
+    pool = InferencePool(recorder, workers=1, max_batch_size=8, max_wait=0.05)
+
+    start = time.monotonic()
+    assert pool.submit_batched("a", 0).result(5) == "a:0"
+    elapsed = time.monotonic() - start
+    assert 0.04 <= elapsed < 1.0
+    assert recorder.calls == [("a", [0])]
+
+
+def test_rejects_when_queue_is_full():
+    pool = InferencePool(Recorder(), workers=1, queue_size=2, max_wait=0)
+    release = block_worker(pool)
+
+    pool.submit(lambda: 1)
+    pool.submit_batched("a", 0)
+    with pytest.raises(QueueFullError):
+        pool.submit(lambda: 2)
+    assert pool.queue_depth == 2
+    assert pool.get_stats()["rejected"] == 1
+
+    release.set()
+    deadline = time.monotonic() + 5
+    while pool.queue_depth and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert pool.submit(lambda: 3).result(5) == 3
+
+
+def test_errors_reach_every_future():
+    def fail(key, items):
+        raise RuntimeError("decode failed")
+
+    def crash():
+        raise ValueError("bad input")
+
+    pool = InferencePool(fail, workers=1, max_batch_size=2, max_wait=0.05)
+    release = block_worker(pool)
+    batched = [pool.submit_batched("a", i) for i in range(2)]
+    plain = pool.submit(crash)
+    release.set()
+
+    for future in batched:
+        with pytest.raises(RuntimeError, match="decode failed"):
+            future.result(5)
+    with pytest.raises(ValueError, match="bad input"):
+        plain.result(5)
+    assert pool.get_stats()["failed"] == 3
@@ -0,0 +1,145 @@
+"""Tests for the int16 sample path from capture to the model boundary."""
+
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+
+import numpy as np
+
+from vibevoice.audio_capture import StreamingAudioCapture
+from vibevoice.transcriber import StreamingTranscriber
+from vibevoice.vad import StreamingVAD
+
+BLOCK = 512
+
+
+class EnergyVAD:
+    """Loudness-based stand-in for SileroVAD."""
+
+    threshold = 0.5
+    min_silence_ms = 400
+
+    def speech_probability(self, chunk, sample_rate=16000):
+        return min(1.0, float(np.sqrt(np.mean(chunk * chunk))) * 20)
+
+    def reset_states(self):
+        pass
+
+    def stream(self, speech_pad_ms=30):
+        return StreamingVAD(self, speech_pad_ms=speech_pad_ms)
+
+
+def speech_pcm():
+    """0.5 s silence, 2 s of noise bursts, 1 s silence as int16."""
+    rng = np.random.default_rng(0)
+    speech = rng.integers(-12000, 12000, 32000)
+    return np.concatenate([np.zeros(8000), speech, np.zeros(16000)]).astype(np.int16)
+
+
+def record(capture, pcm):
+    callback = capture.get_callback()
+    capture.start_recording()
+    for pos in range(0, len(pcm), BLOCK):
+        callback(pcm[pos:pos + BLOCK].reshape(-1, 1), BLOCK, None, None)
+    capture.stop_recording()
+    return list(capture.iter_phrases())
+
+
+def test_phrases_are_bit_exact_int16():
+    capture = StreamingAudioCapture(max_seconds=10, vad_factory=EnergyVAD)
+    pcm = speech_pcm()
+    phrases = record(capture, pcm)
+
+    assert len(phrases) == 1
+    phrase = phrases[0]
+    assert phrase.dtype == np.int16
+    start = 8000 - int(np.flatnonzero(phrase)[0])  # Speech starts at 8000
+    np.testing.assert_array_equal(phrase, pcm[start:start + len(phrase)])
+
+    audio = StreamingTranscriber.normalize_audio(phrase)
+    assert type(audio) is np.ndarray and audio.dtype == np.float32
+    np.testing.assert_array_equal(audio, phrase / 32768.0)
+
+
+def test_allocations_per_phrase():
+    capture = StreamingAudioCapture(max_seconds=10, vad_factory=EnergyVAD)
+    pcm = speech_pcm()
+    record(capture, pcm)  # Load the VAD and warm up
+
+    tracemalloc.start()
+    try:
+        phrase = record(capture, pcm)[0]
+        _, capture_peak = tracemalloc.get_traced_memory()
+
+        tracemalloc.reset_peak()
+        before, _ = tracemalloc.get_traced_memory()
+        audio = StreamingTranscriber.normalize_audio(phrase)
+        _, normalize_peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    # Capture copies the phrase out of the ring buffer once, as int16
+    assert capture_peak < phrase.nbytes + 64 * 1024
+    # The model-boundary conversion allocates its float32 result plus
+    # numpy's fixed-size casting buffer, no full-size temporaries
+    assert normalize_peak - before < audio.nbytes + 64 * 1024
+
+
+def test_native_rate_capture_is_resampled_to_16k_int16():
+    from scipy.signal import resample_poly
+
+    from vibevoice.audio_capture import AudioCapture
+
+    pcm = (np.sin(np.arange(48000) * 2 * np.pi * 440 / 48000) * 16000).astype(np.int16)
+    capture = AudioCapture(max_seconds=2)
+    capture.set_capture_rate(48000)
+    capture.start_recording()
+    callback = capture.get_callback()
+    for pos in range(0, len(pcm), 1536):
+        callback(pcm[pos:pos + 1536].reshape(-1, 1), 1536, None, None)
+    audio = capture.stop_recording()
+
+    assert audio.dtype == np.int16
+    expected = resample_poly(pcm.astype(np.float64), 1, 3)
+    assert len(audio) == len(expected)
+    assert np.abs(audio - expected).max() <= 1
+
+
+def test_streaming_capture_resamples_on_the_segmenter_worker():
+    from scipy.signal import resample_poly
+
+    from vibevoice.audio_capture import StreamingAudioCapture
+
+    def no_vad():
+        raise ImportError("no VAD here")
+
+    rng = np.random.default_rng(0)
+    pcm = np.concatenate([
+        (np.sin(np.arange(48000) * 2 * np.pi * 440 / 48000) * 16000).astype(np.int16),
+        rng.integers(-3, 3, 48000).astype(np.int16),
+    ])
+    capture = StreamingAudioCapture(vad_factory=no_vad)
+    capture.set_capture_rate(48000)
+    capture.start_recording()
+    callback = capture.get_callback()
+    try:
+        for pos in range(0, len(pcm), 1536):
+            block = pcm[pos:pos + 1536].reshape(-1, 1)
+            callback(block, len(block), None, None)
+            # The callback only copies into the native-rate ring
+            assert capture.capture_buffer.write_pos == pos + len(block)
+        tail = capture.stop_recording()
+        phrases = capture.get_pending_phrases()
+    finally:
+        capture.segmenter.stop()
+
+    audio = np.concatenate(phrases + [tail])
+    assert audio.dtype == np.int16
+    expected = resample_poly(pcm.astype(np.float64), 1, 3)
+    assert capture.audio_buffer.write_pos == len(expected)
+    assert capture.segmenter.lost_samples == 0
+    # The tone is one phrase, emitted once the quiet second closes it
+    assert len(phrases) == 1 and len(phrases[0]) >= 16000
+    assert np.abs(phrases[0] - expected[:len(phrases[0])]).max() <= 1
@@ -0,0 +1,99 @@
+"""Tests for adaptive model selection."""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+
+import pytest
+
+from vibevoice.backends import FasterWhisperBackend, MLXWhisperBackend
+from vibevoice.model_controller import ModelController, decode_levels, fallback_sizes
+from vibevoice.transcriber import StreamingTranscriber
+
+SIZES = ["tiny", "base", "small", "medium", "large"]
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_controller(clock):
+    levels = [("small", "S"), ("small beam 1", "S1"), ("base", "B")]
+    return ModelController(levels, downgrade_rtf=0.8, upgrade_rtf=0.3, max_backlog=2, window=3, cooldown_s=10, clock=clock)
+
+
+def test_steps_down_when_lagging_and_up_after_cooldown():
+    clock = Clock()
+    controller = make_controller(clock)
+
+    # Slow but not lagging: no decision inside the hysteresis band
+    for _ in range(5):
+        assert controller.observe(2.0, 1.0) is None
+    assert controller.current == "S"
+
+    # Rolling mean over the window: 0.5, 0.5, 1.0 stays below 0.8, then 0.5, 1.0, 1.0 does not
+    assert controller.observe(2.0, 2.0) is None
+    decision = controller.observe(2.0, 2.0)
+    assert decision["from"] == "small" and decision["to"] == "small beam 1"
+    assert controller.current == "S1"
+
+    # Headroom, but the level just left is still cooling down
+    for _ in range(3):
+        assert controller.observe(2.0, 0.2) is None
+    clock.now = 11
+    decision = controller.observe(2.0, 0.2)
+    assert decision["to"] == "small"
+    assert [d["to"] for d in controller.decisions] == ["small beam 1", "small"]
+
+
+def test_backlog_triggers_fallback_after_two_decodes():
+    controller = make_controller(Clock())
+
+    assert controller.observe(2.0, 0.5, backlog=4) is None
+    decision = controller.observe(2.0, 0.5, backlog=4)
+    assert decision["to"] == "small beam 1"
+    assert "backlog" in decision["reason"]
+
+    controller.observe(2.0, 0.5, backlog=5)
+    controller.observe(2.0, 0.5, backlog=5)
+    assert controller.current == "B"
+    # Nothing cheaper to fall back to
+    assert controller.observe(2.0, 0.5, backlog=9) is None
+    assert controller.observe(2.0, 0.5, backlog=9) is None
+    assert controller.current == "B"
+
+
+def test_fallback_sizes(monkeypatch):
+    monkeypatch.delenv("WHISPER_FALLBACK_MODELS", raising=False)
+    assert fallback_sizes("small", SIZES) == ["base"]
+    assert fallback_sizes("tiny", SIZES) == []
+
+    monkeypatch.setenv("WHISPER_FALLBACK_MODELS", "tiny,base,large")
+    assert fallback_sizes("medium", SIZES) == ["base", "tiny"]
+
+    monkeypatch.setenv("WHISPER_FALLBACK_MODELS", "huge")
+    with pytest.raises(ValueError):
+        fallback_sizes("small", SIZES)
+
+
+def loaded(backend):
+    """A transcriber wrapping ``backend`` without loading a model."""
+    transcriber = StreamingTranscriber.__new__(StreamingTranscriber)
+    transcriber.backend = backend
+    return transcriber
+
+
+def test_greedy_level_only_where_the_backend_runs_beam_search():
+    beam = loaded(FasterWhisperBackend("small", beam_size=5))
+    levels = decode_levels("small", beam)
+    assert [name for name, _ in levels] == ["small", "small beam 1"]
+    assert levels[0][1] is beam and levels[1][1].backend.options == {"beam_size": 1}
+
+    assert [name for name, _ in decode_levels("small", loaded(FasterWhisperBackend("small", beam_size=1)))] == ["small"]
+    # mlx_whisper decodes greedily whatever beam_size says
+    assert [name for name, _ in decode_levels("small", loaded(MLXWhisperBackend("small", beam_size=5)))] == ["small"]
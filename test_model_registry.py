@@ -0,0 +1,118 @@
+"""Tests for the server's model registry: LRU eviction under the memory budget and in-flight loads."""
+
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+
+import pytest
+
+from vibevoice import model_registry
+from vibevoice.backends import FasterWhisperBackend
+from vibevoice.model_registry import ModelRegistry
+
+
+class FakeBackend:
+    """Loader stand-in; ``load`` waits on the gate registered for its size, if any."""
+
+    MODELS = FasterWhisperBackend.MODELS
+    gates = {}
+    failing = set()
+
+    def __init__(self, size, **options):
+        self.size = size
+        self.options = options
+
+    def load(self):
+        gate = self.gates.get(self.size)
+        if gate is not None:
+            gate.wait(5)
+        if self.size in self.failing:
+            raise RuntimeError("load failed")
+
+
+@pytest.fixture(autouse=True)
+def fake_backend(monkeypatch):
+    FakeBackend.gates = {}
+    FakeBackend.failing = set()
+    monkeypatch.setattr(model_registry, "FasterWhisperBackend", FakeBackend)
+
+
+def mb(size, compute_type="int8"):
+    return ModelRegistry.estimate_memory_mb(size, compute_type)
+
+
+def test_least_recently_used_model_is_evicted_at_the_budget():
+    registry = ModelRegistry(memory_budget_mb=mb("tiny") + mb("base") + mb("small") + 1)
+    tiny = registry.get("tiny")
+    registry.get("base")
+    registry.get("small")
+    assert registry.evictions == 0
+
+    assert registry.get("tiny") is tiny  # Cached, and now the most recently used
+    registry.get("base", device="cuda")
+
+    stats = registry.stats()
+    assert stats["loaded"] == ["small/int8/cpu", "tiny/int8/cpu", "base/int8/cuda"]
+    assert registry.evictions == 1 and registry.loads == 4
+    assert registry.memory_used_mb <= registry.memory_budget_mb
+
+
+def test_unknown_compute_type_or_device_is_rejected():
+    registry = ModelRegistry()
+    with pytest.raises(ValueError):
+        registry.get("tiny", compute_type="int4")
+    with pytest.raises(ValueError):
+        registry.get("tiny", device="tpu")
+    assert registry.loads == 0
+
+
+def wait_until(condition):
+    deadline = time.monotonic() + 5
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.001)
+
+
+def test_in_flight_load_reserves_its_memory():
+    registry = ModelRegistry(memory_budget_mb=mb("tiny") + mb("small") + 1)
+    registry.get("tiny")
+
+    FakeBackend.gates["small"] = threading.Event()
+    loader = threading.Thread(target=registry.get, args=("small",))
+    loader.start()
+    wait_until(lambda: registry.stats()["memory_reserved_mb"] == round(mb("small")))
+
+    # Loaded tiny plus the reserved small leave no room for base
+    registry.get("base")
+    assert registry.stats()["loaded"] == ["base/int8/cpu"]
+    assert registry.evictions == 1
+
+    FakeBackend.gates["small"].set()
+    loader.join()
+    stats = registry.stats()
+    assert stats["loaded"] == ["base/int8/cpu", "small/int8/cpu"]
+    assert stats["memory_reserved_mb"] == 0
+
+
+def test_concurrent_requests_share_one_load_and_failures_release_the_reservation():
+    registry = ModelRegistry()
+    FakeBackend.gates["base"] = threading.Event()
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(registry.get("base"))) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    wait_until(lambda: registry.memory_reserved_mb > 0)
+    FakeBackend.gates["base"].set()
+    for thread in threads:
+        thread.join()
+    assert len(results) == 3 and all(engine is results[0] for engine in results)
+    assert registry.loads == 1
+
+    FakeBackend.failing.add("small")
+    with pytest.raises(RuntimeError):
+        registry.get("small")
+    assert registry.memory_reserved_mb == 0
+    assert registry.stats()["loaded"] == ["base/int8/cpu"]
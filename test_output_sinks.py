@@ -0,0 +1,127 @@
+"""Tests for the typing queue and output sinks, with fake sinks."""
+
+import codecs
+import io
+import os
+import sys
+import threading
+from types import ModuleType, SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+
+import pytest
+
+from vibevoice import output_sinks
+from vibevoice.output_sinks import ClipboardSink, OutputSink, StreamSink, TypingQueue, create_sink
+
+
+class RecordingSink(OutputSink):
+    """Records writes; the first write waits for ``release`` and writes of "bad" fail."""
+
+    def __init__(self):
+        self.writes = []
+        self.release = threading.Event()
+        self.closed = False
+
+    def write(self, text):
+        if not self.writes:
+            self.release.wait(5)
+        if text == "bad":
+            self.writes.append(None)
+            raise OSError("target went away")
+        self.writes.append(text)
+
+    def close(self):
+        self.closed = True
+
+
+def test_typing_queue_emits_in_order_without_blocking_put():
+    sink = RecordingSink()
+    typing = TypingQueue(sink)
+    done = []
+
+    # The first write is stuck, yet put returns at once
+    for i in range(5):
+        typing.put(f"phrase {i} ", on_done=lambda i=i: done.append(i))
+    assert done == []
+
+    sink.release.set()
+    typing.flush()
+    assert sink.writes == [f"phrase {i} " for i in range(5)]
+    assert done == list(range(5))
+
+    typing.close()
+    assert sink.closed
+
+
+def test_sink_error_does_not_stop_the_queue():
+    sink = RecordingSink()
+    sink.release.set()
+    typing = TypingQueue(sink)
+    done = []
+    for text in ("one ", "bad", "two "):
+        typing.put(text, on_done=lambda text=text: done.append(text))
+    typing.close()
+
+    assert sink.writes == ["one ", None, "two "]
+    assert done == ["one ", "bad", "two "]
+
+
+def test_stream_and_file_sinks(tmp_path):
+    stream = io.StringIO()
+    StreamSink(stream).write("hello ")
+    assert stream.getvalue() == "hello "
+
+    path = tmp_path / "out.txt"
+    sink = create_sink(f"file:{path}")
+    sink.write("a ")
+    sink.write("b ")
+    sink.close()
+    assert path.read_text(encoding="utf-8") == "a b "
+
+
+def test_unknown_sink_spec():
+    with pytest.raises(ValueError):
+        create_sink("pigeon:home")
+
+
+def test_sink_must_implement_write():
+    class Silent(OutputSink):
+        pass
+
+    with pytest.raises(TypeError):
+        Silent()
+
+
+@pytest.fixture
+def clipboard_tools(monkeypatch):
+    """Fake pynput and subprocess; returns the (command, input) of every clipboard call."""
+    keyboard = SimpleNamespace(Controller=lambda: None, Key=SimpleNamespace(cmd="cmd", ctrl="ctrl"))
+    monkeypatch.setitem(sys.modules, "pynput", ModuleType("pynput"))
+    monkeypatch.setitem(sys.modules, "pynput.keyboard", keyboard)
+    monkeypatch.setattr(output_sinks.shutil, "which", lambda name: None if name == "wl-copy" else name)
+    calls = []
+
+    def run(cmd, input=None, **kwargs):
+        calls.append((cmd, input))
+        return SimpleNamespace(returncode=0, stdout="précédent".encode("utf-8"))
+
+    monkeypatch.setattr(output_sinks.subprocess, "run", run)
+    return calls
+
+
+@pytest.mark.parametrize("system, copy_cmd, encoded", [
+    ("Windows", ["clip"], codecs.BOM_UTF16_LE + "héllo € ".encode("utf-16-le")),
+    ("Darwin", ["pbcopy"], "héllo € ".encode("utf-8")),
+    ("Linux", ["xclip", "-selection", "clipboard"], "héllo € ".encode("utf-8")),
+])
+def test_clipboard_command_and_encoding_per_platform(clipboard_tools, monkeypatch, system, copy_cmd, encoded):
+    monkeypatch.setattr(output_sinks.platform, "system", lambda: system)
+    sink = ClipboardSink()
+    assert sink.copy_cmd == copy_cmd
+
+    sink._set_clipboard("héllo € ")
+    assert clipboard_tools[-1] == (copy_cmd, encoded)
+    # Every paste command hands back UTF-8
+    assert sink._get_clipboard() == "précédent"
+    assert clipboard_tools[-1][0] == sink.paste_cmd
@@ -0,0 +1,141 @@
+"""Tests for LocalAgreement-2 partial transcription, with a stub transcriber returning scripted words."""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+
+import numpy as np
+
+from vibevoice.transcriber import PartialTranscription
+
+RATE = 16000
+
+
+class ScriptedTranscriber:
+    """Returns the next scripted hypothesis per decode and records what it was given."""
+
+    def __init__(self, hypotheses):
+        self.hypotheses = list(hypotheses)
+        self.calls = []
+
+    def transcribe_words(self, audio, initial_prompt=None):
+        self.calls.append((len(audio), initial_prompt))
+        return self.hypotheses.pop(0)
+
+
+def timed(*words, start=0.0):
+    """(start, end, word) tuples, half a second per word."""
+    return [(start + i * 0.5, start + (i + 1) * 0.5, word) for i, word in enumerate(words)]
+
+
+def audio(seconds):
+    return np.zeros(int(seconds * RATE), dtype=np.int16)
+
+
+def test_words_commit_only_once_two_hypotheses_agree():
+    stub = ScriptedTranscriber([
+        timed("hello", "word"),
+        timed("Hello,", "world", "this"),
+        timed("hello", "world", "is", "it"),
+    ])
+    partial = PartialTranscription(stub, context="Before.")
+
+    assert partial.update(audio(1)) == ""  # Nothing to agree with yet
+    # Agreement ignores case and punctuation; the committed spelling is the newest
+    assert partial.update(audio(1.5)) == "Hello,"
+    assert partial.update(audio(2)) == "world"
+    assert partial.committed == ["Hello,", "world"]
+    # The window still holds the committed words, so only the context is prompted
+    assert [prompt for _, prompt in stub.calls] == ["Before."] * 3
+
+
+def test_finish_does_not_re_emit_committed_words():
+    stub = ScriptedTranscriber([
+        timed("one", "two"),
+        timed("one", "two", "three"),
+        timed("one", "two", "three", "four"),
+    ])
+    partial = PartialTranscription(stub)
+    partial.update(audio(1))
+    assert partial.update(audio(1.5)) == "one two"
+
+    assert partial.finish(audio(2)) == "three four"
+    assert partial.text == "one two three four"
+
+
+def test_window_is_trimmed_after_the_last_committed_word():
+    stub = ScriptedTranscriber([
+        timed("a", "b", "c"),
+        timed("a", "b", "c", "d"),
+        # Decoded from the trimmed window: timestamps restart at its start
+        timed("d", "e"),
+        timed("d", "e", "f"),
+    ])
+    partial = PartialTranscription(stub, context="ctx", max_window_s=1.0)
+
+    partial.update(audio(1.5))
+    assert partial.update(audio(2.0)) == "a b c"
+    # The window (2 s) passed max_window_s: it now starts where "c" ended
+    assert partial._window_offset == int(1.5 * RATE)
+
+    assert partial.update(audio(2.5)) == ""
+    assert partial.update(audio(3.0)) == "d e"
+    assert partial.text == "a b c d e"
+    # Decodes after the trim see only the new window, prompted with the trimmed text
+    assert stub.calls[2:] == [(RATE, "ctx a b c"), (int(1.5 * RATE), "ctx a b c")]
+
+
+def test_window_is_kept_without_word_timestamps():
+    untimed = [(None, None, word) for word in ("x", "y")]
+    stub = ScriptedTranscriber([untimed, untimed, untimed])
+    partial = PartialTranscription(stub, max_window_s=0.5)
+
+    partial.update(audio(1))
+    assert partial.update(audio(2)) == "x y"
+    assert partial._window_offset == 0
+    assert partial.finish(audio(2)) == ""
+
+
+def test_final_decode_merging_committed_words_drops_nothing():
+    stub = ScriptedTranscriber([
+        timed("twenty", "five"),
+        timed("twenty", "five", "dollars"),
+        # The final decode writes the committed words as one
+        timed("twenty-five", "dollars", "please"),
+    ])
+    partial = PartialTranscription(stub)
+    partial.update(audio(1))
+    assert partial.update(audio(1.5)) == "twenty five"
+
+    assert partial.finish(audio(2)) == "dollars please"
+    assert partial.text == "twenty five dollars please"
+
+
+def test_decode_splitting_a_committed_word_types_nothing_twice():
+    stub = ScriptedTranscriber([
+        timed("I", "cannot", "go"),
+        timed("I", "cannot", "go", "now"),
+        timed("I", "can", "not", "go", "now"),
+        timed("I", "can", "not", "go", "now", "sadly"),
+    ])
+    partial = PartialTranscription(stub)
+    partial.update(audio(1.5))
+    assert partial.update(audio(2)) == "I cannot go"
+    # Agreement after the split compares only the words past the committed ones
+    assert partial.update(audio(2.5)) == "now"
+    assert partial.finish(audio(3)) == "sadly"
+    assert partial.text == "I cannot go now sadly"
+
+
+def test_revised_committed_text_is_aligned_by_timestamps():
+    stub = ScriptedTranscriber([
+        timed("over", "their"),
+        timed("over", "their", "now"),
+        # "their" is revised: the text no longer matches, the timing does
+        [(0.0, 0.5, "over"), (0.5, 1.0, "there"), (1.0, 1.5, "now"), (1.5, 2.0, "then")],
+    ])
+    partial = PartialTranscription(stub)
+    partial.update(audio(1))
+    assert partial.update(audio(1.5)) == "over their"
+    assert partial.finish(audio(2)) == "now then"
@@ -0,0 +1,42 @@
+"""Tests for the preallocated audio ring buffer."""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+
+import numpy as np
+
+from vibevoice.ring_buffer import AudioRingBuffer
+
+
+def test_write_and_read_contiguous_view():
+    buf = AudioRingBuffer(capacity=8)
+    buf.write(np.arange(5, dtype=np.float32).reshape(-1, 1))
+
+    view = buf.read(1)
+    assert np.shares_memory(view, buf._data)
+    np.testing.assert_array_equal(view, [1, 2, 3, 4])
+    assert buf.write_pos == 5
+
+
+def test_wraparound_keeps_newest_samples():
+    buf = AudioRingBuffer(capacity=8)
+    for start in range(0, 12, 3):
+        buf.write(np.arange(start, start + 3, dtype=np.float32))
+
+    assert buf.write_pos == 12
+    assert buf.oldest_pos == 4
+    assert len(buf.views(4)) == 2
+    np.testing.assert_array_equal(buf.read(0), np.arange(4, 12))
+    np.testing.assert_array_equal(buf.read(6, 10), np.arange(6, 10))
+
+
+def test_oversized_write_and_reset():
+    buf = AudioRingBuffer(capacity=4, dtype=np.int16)
+    buf.write(np.arange(10, dtype=np.int16))
+
+    np.testing.assert_array_equal(buf.read(0), [6, 7, 8, 9])
+    buf.reset()
+    assert len(buf) == 0
+    assert len(buf.read(0)) == 0
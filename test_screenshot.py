@@ -0,0 +1,61 @@
+"""Tests for the background screenshot prefetcher."""
+
+import base64
+import io
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+
+import pytest
+
+Image = pytest.importorskip("PIL.Image")
+
+from vibevoice.screenshot import ScreenshotPrefetcher
+
+
+def test_downscales_encodes_once_and_reuses_unchanged_screen():
+    screens = [Image.new("RGB", (2560, 1440), "white")] * 2 + [Image.new("RGB", (2560, 1440), "black")]
+    grabs = iter(screens)
+    prefetcher = ScreenshotPrefetcher(max_side=1024, grab=lambda: next(grabs))
+
+    payloads = []
+    for _ in screens:
+        prefetcher.start()
+        payloads.append(prefetcher.result())
+
+    image = Image.open(io.BytesIO(base64.b64decode(payloads[0])))
+    assert image.format == "JPEG"
+    assert image.size == (1024, 576)
+    assert payloads[1] is payloads[0]
+    assert payloads[2] != payloads[0]
+    assert prefetcher.reused == 1
+
+
+@pytest.mark.parametrize("screen, expected", [
+    ((1080, 2400), (461, 1024)),  # Portrait: the height is the limit
+    ((800, 600), (800, 600)),  # Never upscaled
+])
+def test_longest_side_is_limited(screen, expected):
+    prefetcher = ScreenshotPrefetcher(max_side=1024, image_format="png", grab=lambda: Image.new("RGB", screen))
+    image = Image.open(io.BytesIO(base64.b64decode(prefetcher.capture())))
+    assert image.size == expected
+
+
+def test_max_side_from_env(monkeypatch):
+    monkeypatch.setenv("INCLUDE_SCREENSHOT", "true")
+    monkeypatch.delenv("SCREENSHOT_MAX_SIDE", raising=False)
+    monkeypatch.setenv("SCREENSHOT_MAX_WIDTH", "800")
+    assert ScreenshotPrefetcher.from_env().max_side == 800
+    monkeypatch.setenv("SCREENSHOT_MAX_SIDE", "640")
+    assert ScreenshotPrefetcher.from_env().max_side == 640
+
+
+def test_result_without_capture_or_after_failure():
+    def fail():
+        raise OSError("no display")
+
+    prefetcher = ScreenshotPrefetcher(grab=fail)
+    assert prefetcher.result() is None
+    prefetcher.start()
+    assert prefetcher.result() is None
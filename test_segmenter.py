@@ -0,0 +1,215 @@
+"""Tests for the phrase segmenter worker and the streaming VAD state machine."""
+
+import os
+import sys
+from queue import Empty, Queue
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+
+import numpy as np
+import pytest
+
+from vibevoice.audio_capture import StreamingAudioCapture
+from vibevoice.ring_buffer import AudioRingBuffer
+from vibevoice.segmenter import PhraseSegmenter
+from vibevoice.vad import StreamingVAD
+
+BLOCK = 512
+RATE = 16000
+
+
+class EnergyVAD:
+    """Loudness-based stand-in for SileroVAD."""
+
+    threshold = 0.5
+    min_silence_ms = 400
+
+    def speech_probability(self, chunk, sample_rate=16000):
+        return min(1.0, float(np.sqrt(np.mean(chunk * chunk))) * 20)
+
+    def reset_states(self):
+        pass
+
+    def stream(self, speech_pad_ms=30):
+        return StreamingVAD(self, speech_pad_ms=speech_pad_ms)
+
+
+def no_vad():
+    raise ImportError("no VAD here")
+
+
+def silence(seconds):
+    return np.zeros(int(seconds * RATE), dtype=np.int16)
+
+
+def speech(seconds, seed=0):
+    """Loud noise with no zero samples, so a phrase's speech can be counted."""
+    rng = np.random.default_rng(seed)
+    n = int(seconds * RATE)
+    return (rng.integers(1000, 12000, n) * rng.choice([-1, 1], n)).astype(np.int16)
+
+
+def make_segmenter(vad_factory=EnergyVAD, capacity=RATE * 20):
+    ring = AudioRingBuffer(capacity, dtype=np.int16)
+    phrases = Queue()
+    return ring, phrases, PhraseSegmenter(ring, phrases, vad_factory=vad_factory, min_silence_ms=400)
+
+
+def feed(ring, segmenter, pcm):
+    """Write ``pcm`` in callback-sized blocks, submitting each like the audio callback."""
+    for pos in range(0, len(pcm), BLOCK):
+        ring.write(pcm[pos:pos + BLOCK])
+        segmenter.submit()
+
+
+def drained(phrases):
+    items = []
+    while not phrases.empty():
+        items.append(phrases.get_nowait())
+    return items
+
+
+def test_streaming_vad_events_do_not_depend_on_block_size():
+    pcm = np.concatenate([silence(0.5), speech(1.0), silence(1.0), speech(0.5, seed=1), silence(0.1)])
+
+    events = []
+    for size in (100, 512, 3000, len(pcm)):
+        stream = EnergyVAD().stream()
+        stream.reset()
+        events.append([e for pos in range(0, len(pcm), size) for e in stream.process(pcm[pos:pos + size])] + stream.flush())
+
+    assert all(run == events[0] for run in events)
+    starts = [e["start"] for e in events[0] if "start" in e]
+    ends = [e["end"] for e in events[0] if "end" in e]
+    # Padded by 30 ms and rounded to 512-sample chunks
+    assert starts[0] <= 8000 < starts[0] + BLOCK + 480 + 1
+    assert 24000 <= ends[0] <= 24000 + 2 * BLOCK + 480
+    assert len(starts) == len(ends) == 2
+    assert ends[1] == len(pcm)  # Closed by flush
+
+
+def test_phrase_boundaries_drain_and_tail():
+    ring, phrases, segmenter = make_segmenter()
+    segmenter.start()
+    try:
+        feed(ring, segmenter, np.concatenate([silence(0.5), speech(1.0), silence(1.0), speech(0.6, seed=1), silence(0.1)]))
+        segmenter.drain()
+
+        # drain() returns once the closed phrase is queued
+        queued = drained(phrases)
+        assert len(queued) == 1
+        first = queued[0]
+        assert first.dtype == np.int16
+        assert np.count_nonzero(first) == RATE  # All of the speech...
+        assert len(first) <= RATE + 2 * (BLOCK + 480)  # ...and little of the silence
+        assert first.trace is not None
+
+        # The second phrase is still open: take_tail returns it once
+        tail = segmenter.take_tail()
+        assert np.count_nonzero(tail) == int(0.6 * RATE)
+        assert len(segmenter.take_tail()) == 0
+    finally:
+        segmenter.stop()
+
+
+def test_reset_discards_blocks_of_the_previous_recording():
+    ring, phrases, segmenter = make_segmenter()
+    # Queued before the worker runs, then superseded by a new recording
+    feed(ring, segmenter, np.concatenate([speech(1.0), silence(1.0)]))
+    ring.reset()
+    segmenter.reset()
+    segmenter.start()
+    try:
+        feed(ring, segmenter, np.concatenate([silence(0.5), speech(0.5, seed=2), silence(1.0)]))
+        segmenter.drain()
+        queued = drained(phrases)
+        assert [np.count_nonzero(phrase) for phrase in queued] == [RATE // 2]
+    finally:
+        segmenter.stop()
+
+
+def test_overrun_counts_lost_samples():
+    ring, phrases, segmenter = make_segmenter(capacity=4096)
+    feed(ring, segmenter, silence(10000 / RATE))
+    segmenter.start()
+    try:
+        segmenter.drain()
+        assert segmenter.lost_samples == 10000 - 4096
+        assert segmenter.stats()["lost_samples"] == 10000 - 4096
+    finally:
+        segmenter.stop()
+
+
+def test_energy_gate_only_emits_after_speech():
+    ring, phrases, segmenter = make_segmenter(vad_factory=no_vad)
+    segmenter.start()
+    try:
+        feed(ring, segmenter, silence(2.0))
+        segmenter.drain()
+        assert drained(phrases) == []
+        assert len(segmenter.take_tail()) == 0
+
+        feed(ring, segmenter, np.concatenate([speech(0.5), silence(0.6), silence(1.0)]))
+        segmenter.drain()
+        queued = drained(phrases)
+        assert [np.count_nonzero(phrase) for phrase in queued] == [RATE // 2]
+        # Only silence since that phrase
+        assert len(segmenter.take_tail()) == 0
+
+        feed(ring, segmenter, np.concatenate([speech(0.3, seed=3), silence(0.1)]))
+        segmenter.drain()
+        assert drained(phrases) == []
+        assert np.count_nonzero(segmenter.take_tail()) == int(0.3 * RATE)
+    finally:
+        segmenter.stop()
+
+
+@pytest.fixture
+def capture():
+    capture = StreamingAudioCapture(vad_factory=EnergyVAD)
+    yield capture
+    capture.segmenter.stop()
+
+
+def record(capture, pcm):
+    """Feed ``pcm`` through the capture callback in stream-sized blocks."""
+    callback = capture.get_callback()
+    for pos in range(0, len(pcm), BLOCK):
+        block = pcm[pos:pos + BLOCK].reshape(-1, 1)
+        callback(block, len(block), None, None)
+
+
+def test_get_phrase_ends_with_the_recording_and_times_out_before(capture):
+    capture.start_recording()
+    with pytest.raises(Empty):
+        capture.get_phrase(timeout=0.01)
+
+    record(capture, np.concatenate([speech(0.5), silence(0.6), speech(0.3, seed=1)]))
+    tail = capture.stop_recording()
+    assert np.count_nonzero(tail) == int(0.3 * RATE)
+
+    assert np.count_nonzero(capture.get_phrase(timeout=1)) == int(0.5 * RATE)
+    assert capture.get_phrase(timeout=1) is capture.END_OF_RECORDING
+    # The end sticks until the next recording, without waiting on the queue
+    assert capture.get_phrase() is capture.END_OF_RECORDING
+    assert capture.get_phrase_batch() is None
+
+    capture.start_recording()
+    assert capture.get_phrase_batch(timeout=0.01) == []
+
+
+def test_get_phrase_batch_takes_queued_phrases_up_to_the_limit(capture):
+    capture.start_recording()
+    pcm = np.concatenate([np.concatenate([speech(0.2, seed=i), silence(0.6)]) for i in range(5)])
+    record(capture, pcm)
+    capture.stop_recording()
+
+    first = capture.get_phrase_batch(max_batch_size=3, max_wait=0.0, timeout=1)
+    rest = capture.get_phrase_batch(max_batch_size=3, max_wait=0.0, timeout=1)
+    assert [len(batch) for batch in (first, rest)] == [3, 2]
+    assert all(np.count_nonzero(phrase) == int(0.2 * RATE) for phrase in first + rest)
+    # Phrases come in the order they were spoken
+    assert [phrase[np.flatnonzero(phrase)[0]] for phrase in first + rest] == [
+        speech(0.2, seed=i)[0] for i in range(5)
+    ]
+    assert capture.get_phrase_batch(timeout=1) is None
@@ -0,0 +1,214 @@
+"""Tests for the transcription server's file endpoint, with a stub engine."""
+
+import asyncio
+import io
+import json
+import os
+import sys
+import wave
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+
+import numpy as np
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("uvicorn")
+
+from vibevoice import server
+
+
+class StubEngine:
+    """Records the options of every decode."""
+
+    def __init__(self):
+        self.calls = []
+
+    def transcribe_batch(self, audios, **options):
+        self.calls.append(("batch", len(audios), options))
+        return [f"w{len(audio)}" for audio in audios]
+
+    def transcribe_segments(self, audio, **options):
+        self.calls.append(("segments", 1, options))
+        return [SimpleNamespace(start=0.0, end=len(audio) / 16000, text=f" w{len(audio)}")]
+
+
+class FullPool:
+    """Inference pool whose queue is always full."""
+
+    queue_depth = server.SERVER_QUEUE_SIZE
+
+    def submit(self, *args, **kwargs):
+        raise server.QueueFullError("full")
+
+    submit_batched = submit
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    engine = StubEngine()
+    monkeypatch.setattr(server, "registry", SimpleNamespace(get=lambda *key: engine))
+    monkeypatch.setattr(server, "cache", None)
+    return engine
+
+
+@pytest.fixture
+def client(engine):
+    from fastapi.testclient import TestClient
+
+    return TestClient(server.app)
+
+
+def noise(seconds):
+    return np.random.default_rng(0).integers(-3000, 3000, int(seconds * 16000), dtype=np.int16)
+
+
+def wav_bytes(pcm, rate=16000):
+    data = io.BytesIO()
+    with wave.open(data, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(pcm.tobytes())
+    return data.getvalue()
+
+
+def write_wav(path, seconds):
+    with open(path, "wb") as f:
+        f.write(wav_bytes(noise(seconds)))
+    return str(path)
+
+
+def ndjson(response):
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+@pytest.mark.parametrize("seconds", [5, 75])
+def test_decode_options_reach_the_decoder(engine, tmp_path, seconds):
+    path = write_wav(tmp_path / "clip.wav", seconds)
+    request = server.TranscribeRequest(file_path=path, beam_size=5, language="de")
+
+    result = asyncio.run(server.transcribe(request))
+
+    assert result["text"]
+    assert engine.calls
+    for _, _, options in engine.calls:
+        assert options == dict(server.DECODE_OPTIONS, beam_size=5, language="de")
+    # Short files go through the batching pool as one clip; long ones window by window
+    assert sum(count for _, count, _ in engine.calls) == (1 if seconds == 5 else 3)
+
+
+def test_unbatchable_short_file_is_decoded_with_full_options(engine, tmp_path):
+    path = write_wav(tmp_path / "clip.wav", 5)
+    request = server.TranscribeRequest(file_path=path, language="auto", vad_filter=True)
+
+    assert asyncio.run(server.transcribe(request)) == {"text": "w80000"}
+    assert engine.calls == [("segments", 1, dict(server.DECODE_OPTIONS, language=None, vad_filter=True))]
+
+
+@pytest.mark.parametrize("override", [{"model": "huge"}, {"compute_type": "int4"}, {"device": "tpu"}])
+def test_unknown_model_settings_are_rejected(engine, tmp_path, override):
+    request = server.TranscribeRequest(file_path=write_wav(tmp_path / "clip.wav", 1), **override)
+
+    with pytest.raises(server.HTTPException) as error:
+        asyncio.run(server.transcribe(request))
+    assert error.value.status_code == 400
+    assert engine.calls == []
+
+
+@pytest.mark.parametrize("compute_type", ["auto", "default", "int16", "int8_float16", "float32"])
+def test_ctranslate2_compute_types_pass_validation(monkeypatch, compute_type):
+    # As set by WHISPER_COMPUTE_TYPE: the server default must be accepted on every request
+    monkeypatch.setattr(server, "DEFAULT_COMPUTE_TYPE", compute_type)
+    model_key, _ = server.resolve_settings(server.DecodeSettings())
+    assert model_key == (server.DEFAULT_MODEL, compute_type, server.DEFAULT_DEVICE)
+    assert server.resolve_settings(server.DecodeSettings(compute_type=compute_type))[0] == model_key
+
+
+def test_env_default_compute_type_passes_validation():
+    assert server.DEFAULT_COMPUTE_TYPE in server.ModelRegistry.BYTES_PER_PARAM
+    assert server.DEFAULT_DEVICE in server.ModelRegistry.DEVICES
+    server.resolve_settings(server.DecodeSettings())
+
+
+def test_raw_wav_body_streams_segments_as_ndjson(client, engine):
+    response = client.post("/transcribe/raw?language=de&beam_size=3", content=wav_bytes(noise(2)))
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    assert ndjson(response) == [
+        {"start": 0.0, "end": 2.0, "text": "w32000"},
+        {"done": True, "text": "w32000"},
+    ]
+    assert engine.calls == [("segments", 1, dict(server.DECODE_OPTIONS, language="de", beam_size=3))]
+
+
+def test_raw_pcm_body_may_be_chunked(client, engine):
+    pcm = noise(1).tobytes()
+
+    def chunks():
+        # Odd chunk sizes split samples across chunks
+        for i in range(0, len(pcm), 999):
+            yield pcm[i:i + 999]
+
+    response = client.post("/transcribe/raw", content=chunks())
+
+    assert response.status_code == 200
+    assert ndjson(response)[-1] == {"done": True, "text": "w16000"}
+
+
+def test_raw_rejects_bad_bodies_and_overrides(client, engine):
+    assert client.post("/transcribe/raw", content=b"\x00" * 3).status_code == 400
+    assert client.post("/transcribe/raw?compute_type=int4", content=b"\x00" * 4).status_code == 400
+    assert client.post("/transcribe/raw?model=huge", content=b"\x00" * 4).status_code == 400
+    assert engine.calls == []
+
+
+def test_websocket_end_transcribes_each_utterance(client, engine):
+    with client.websocket_connect("/ws/transcribe?language=en") as ws:
+        pcm = noise(1).tobytes()
+        ws.send_bytes(pcm[:5001])  # A sample split across messages
+        ws.send_bytes(pcm[5001:])
+        ws.send_text("end")
+        assert ws.receive_json() == {"start": 0.0, "end": 1.0, "text": "w16000"}
+        assert ws.receive_json() == {"done": True, "text": "w16000"}
+
+        # The buffer starts over for the next utterance
+        ws.send_bytes(noise(0.5).tobytes())
+        ws.send_text("end")
+        events = [ws.receive_json(), ws.receive_json()]
+        assert events[-1] == {"done": True, "text": "w8000"}
+
+        ws.send_text("rewind")
+        assert ws.receive_json() == {"error": "Unknown command: rewind"}
+        ws.send_text("close")
+
+    assert [options for _, _, options in engine.calls] == [dict(server.DECODE_OPTIONS, language="en")] * 2
+
+
+def test_websocket_rejects_bad_overrides_with_1008(client):
+    from starlette.websockets import WebSocketDisconnect
+
+    with pytest.raises(WebSocketDisconnect) as error:
+        with client.websocket_connect("/ws/transcribe?device=tpu") as ws:
+            ws.receive_json()
+    assert error.value.code == 1008
+
+
+def test_full_queue_is_reported_as_busy(client, engine, monkeypatch, tmp_path):
+    monkeypatch.setattr(server, "pool", FullPool())
+
+    response = client.post("/transcribe/", json={"file_path": write_wav(tmp_path / "clip.wav", 1)})
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+
+    response = client.post("/transcribe/raw", content=wav_bytes(noise(1)))
+    assert response.status_code == 503
+
+    with client.websocket_connect("/ws/transcribe") as ws:
+        ws.send_bytes(noise(0.5).tobytes())
+        ws.send_text("end")
+        assert ws.receive_json() == {"error": "Server busy, retry later"}
+        ws.send_text("close")
+    assert engine.calls == []
@@ -0,0 +1,99 @@
+"""Tests for startup timing: model load, the warm-up pass and --profile-startup."""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+
+import numpy as np
+import pytest
+
+from vibevoice import cli
+from vibevoice import transcriber as transcriber_module
+from vibevoice.transcriber import StreamingTranscriber
+
+
+class SlowBackend:
+    """Backend stub whose load takes ``LOAD_S`` and which records every decode."""
+
+    LOAD_S = 0.02
+    name = "stub"
+    model_path = "stub/small"
+
+    def __init__(self):
+        self.options = {"beam_size": 1}
+        self.decoded = []
+
+    def load(self):
+        time.sleep(self.LOAD_S)
+        return self
+
+    def transcribe(self, audio, language=None):
+        self.decoded.append(audio)
+        return "text"
+
+    def transcribe_batch(self, audios, language=None):
+        self.decoded.extend(audios)
+        return ["text"] * len(audios)
+
+
+@pytest.fixture
+def backend(monkeypatch):
+    backend = SlowBackend()
+    monkeypatch.setattr(transcriber_module, "create_backend", lambda *args, **kwargs: backend)
+    return backend
+
+
+def test_load_time_and_warm_up_decode_are_measured_separately(backend):
+    transcriber = StreamingTranscriber(warmup_seconds=0.5)
+
+    assert transcriber.load_time >= SlowBackend.LOAD_S
+    # One decode of silence, straight to the backend
+    assert len(backend.decoded) == 1
+    assert backend.decoded[0].dtype == np.float32 and len(backend.decoded[0]) == 8000
+    assert not backend.decoded[0].any()
+    warmup_decode_s = transcriber.warmup_decode_s
+    assert warmup_decode_s is not None
+
+    # Real decodes leave the warm-up time alone
+    transcriber.transcribe(np.full(4000, 100, dtype=np.int16))
+    transcriber.transcribe_batch([np.full(4000, 100, dtype=np.int16)] * 2)
+    assert transcriber.warmup_decode_s == warmup_decode_s
+    assert len(backend.decoded) == 4
+
+
+def test_zero_warm_up_seconds_skips_the_warm_up(backend):
+    # WHISPER_WARMUP_SECONDS=0 reaches the transcriber as warmup_seconds=0
+    transcriber = StreamingTranscriber(warmup_seconds=0)
+
+    assert transcriber.load_time >= SlowBackend.LOAD_S
+    assert backend.decoded == []
+    assert transcriber.warmup_decode_s is None
+
+    transcriber.transcribe(np.full(4000, 100, dtype=np.int16))
+    transcriber.transcribe_batch([np.full(4000, 100, dtype=np.int16)] * 2)
+    assert transcriber.warmup_decode_s is None
+
+
+def test_profile_startup_flag_reaches_dictation(monkeypatch):
+    calls = []
+    monkeypatch.setattr(cli, "dictate", lambda profile_startup=False: calls.append(profile_startup))
+
+    for argv, expected in ((["vibevoice"], False), (["vibevoice", "--profile-startup"], True)):
+        monkeypatch.setattr(sys, "argv", argv)
+        cli.main()
+        assert calls.pop() is expected
+
+
+def test_startup_profile_reports_steps_per_thread():
+    profile = cli.StartupProfile()
+    with profile.step("import numpy"):
+        pass
+    profile.record("model load", 1.5)
+
+    lines = profile.report().splitlines()
+    assert lines[0] == "Startup profile:"
+    assert lines[1].split()[:2] == ["import", "numpy"] and lines[1].endswith("[MainThread]")
+    assert lines[2].split()[:4] == ["model", "load", "1500", "ms"]
+    assert lines[3].split()[:2] == ["ready", "after"]
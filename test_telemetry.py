@@ -0,0 +1,70 @@
+"""Tests for the telemetry registry: Prometheus exposition and phrase stage aggregation."""
+
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+
+from vibevoice.telemetry import Telemetry
+
+
+def test_prometheus_exposition():
+    telemetry = Telemetry(prefix="test")
+    for seconds in (0.003, 0.02, 0.02, 45.0):
+        telemetry.observe("decode", seconds)
+    telemetry.count("phrases")
+    telemetry.count("phrases", 2)
+
+    text = telemetry.prometheus({"queue_depth": 3, "p99_seconds": None})
+    lines = text.splitlines()
+
+    assert "# TYPE test_decode_seconds histogram" in lines
+    # Buckets are cumulative; the 45 s value only lands in +Inf
+    assert 'test_decode_seconds_bucket{le="0.005"} 1' in lines
+    assert 'test_decode_seconds_bucket{le="0.025"} 3' in lines
+    assert 'test_decode_seconds_bucket{le="30.0"} 3' in lines
+    assert 'test_decode_seconds_bucket{le="+Inf"} 4' in lines
+    assert "test_decode_seconds_count 4" in lines
+    assert float(lines[lines.index("test_decode_seconds_count 4") - 1].split()[1]) == 45.043
+
+    assert "# TYPE test_phrases_total counter" in lines
+    assert "test_phrases_total 3" in lines
+    assert "# TYPE test_queue_depth gauge" in lines
+    assert "test_queue_depth 3.0" in lines
+    assert not any("p99" in line for line in lines)
+    assert text.endswith("\n")
+
+
+def test_finished_phrase_updates_stages_and_writes_record(tmp_path):
+    path = tmp_path / "spans.jsonl"
+    telemetry = Telemetry()
+    assert telemetry._file is None  # Nothing is written until an entry point configures a file
+    telemetry.configure(str(path))
+
+    trace = telemetry.start_phrase(audio_s=1.5, speech_start_t=100.0, speech_end_t=101.5, vad_s=0.01)
+    trace.emitted_t = 101.6
+    trace.dequeued_t = 101.7
+    trace.decode_s = 0.2
+    trace.chars = 12
+    telemetry.finish_phrase(trace)
+
+    # A phrase dropped before typing has no typing stage
+    unfinished = telemetry.start_phrase(audio_s=0.5, speech_start_t=200.0, speech_end_t=200.5, vad_s=0.0)
+    telemetry.finish_phrase(unfinished)
+    telemetry.configure(None)
+
+    histograms = telemetry._histograms
+    assert histograms["phrase_segmentation"].count == 2
+    assert histograms["phrase_decode"].count == 1
+    assert abs(histograms["phrase_decode"].sum - 0.2) < 1e-9
+    assert abs(histograms["phrase_queue_wait"].sum - 0.1) < 1e-9
+    assert "phrase_typing" not in histograms
+    assert telemetry._counters["phrases"] == 2
+
+    records = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [record["phrase"] for record in records] == [trace.id, unfinished.id]
+    assert records[0]["type"] == "phrase"
+    assert records[0]["chars"] == 12
+    assert abs(records[0]["segmentation_s"] - 0.1) < 1e-9
+    assert records[1]["decode_s"] is None and records[1]["queue_wait_s"] is None
@@ -0,0 +1,131 @@
+"""Tests for the Silero VAD ONNX wrapper and local model lookup, with a stub ONNX Runtime."""
+
+import os
+import sys
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+
+import numpy as np
+import pytest
+
+from vibevoice import vad
+from vibevoice.vad import OnnxVADModel, SileroVAD
+
+
+class StubSession:
+    """InferenceSession with the v4 (h, c) or v5 (state) input layout; records every feed."""
+
+    def __init__(self, inputs):
+        self.inputs = inputs
+        self.feeds = []
+
+    def get_inputs(self):
+        return [SimpleNamespace(name=name) for name in self.inputs]
+
+    def run(self, outputs, feeds):
+        self.feeds.append({name: np.array(value, copy=True) for name, value in feeds.items()})
+        prob = np.array([[0.25 * len(self.feeds)]], dtype=np.float32)
+        if "state" in feeds:
+            return prob, feeds["state"] + 1
+        return prob, feeds["h"] + 1, feeds["c"] + 2
+
+
+@pytest.fixture
+def session(monkeypatch):
+    """Make OnnxVADModel open a StubSession with the input names in ``session["inputs"]``."""
+    holder = {}
+
+    def make_session(path, sess_options=None, providers=None):
+        holder["session"] = StubSession(holder["inputs"])
+        return holder["session"]
+
+    fake = SimpleNamespace(SessionOptions=lambda: SimpleNamespace(), InferenceSession=make_session)
+    monkeypatch.setitem(sys.modules, "onnxruntime", fake)
+    return holder
+
+
+def chunk(value):
+    return np.full(512, value, dtype=np.float32)
+
+
+def test_v4_layout_carries_h_and_c(session):
+    session["inputs"] = ["input", "sr", "h", "c"]
+    model = OnnxVADModel("silero_vad.onnx")
+
+    assert model(chunk(0.1)) == 0.25
+    assert model(chunk(0.2)) == 0.5
+    first, second = session["session"].feeds
+    assert first["input"].shape == (1, 512)
+    assert first["h"].shape == first["c"].shape == (2, 1, 64)
+    assert not first["h"].any() and not first["c"].any()
+    # The state returned by one call is fed to the next
+    assert (second["h"] == 1).all() and (second["c"] == 2).all()
+    assert int(second["sr"]) == 16000
+
+    model.reset_states()
+    model(chunk(0.3))
+    assert not session["session"].feeds[2]["h"].any()
+
+
+def test_v5_layout_carries_state_and_context(session):
+    session["inputs"] = ["input", "state", "sr"]
+    model = OnnxVADModel("silero_vad.onnx")
+
+    model(chunk(0.1))
+    model(np.linspace(-1, 1, 512, dtype=np.float32))
+    model(chunk(0.3))
+    first, second, third = session["session"].feeds
+
+    assert first["state"].shape == (2, 1, 128) and not first["state"].any()
+    assert (second["state"] == 1).all()
+    # Each chunk is prefixed with the last 64 samples of the previous input
+    assert first["input"].shape == (1, 576)
+    assert not first["input"][0, :64].any()
+    assert np.allclose(second["input"][0, :64], 0.1)
+    assert np.array_equal(third["input"][0, :64], np.linspace(-1, 1, 512, dtype=np.float32)[-64:])
+
+    model.reset_states()
+    model(chunk(0.4))
+    fourth = session["session"].feeds[3]
+    assert not fourth["state"].any() and not fourth["input"][0, :64].any()
+
+
+@pytest.fixture
+def search(monkeypatch, tmp_path):
+    """Empty lookup locations: no env var, no pip package, an empty torch hub."""
+    monkeypatch.delenv("VIBEVOICE_VAD_MODEL", raising=False)
+    monkeypatch.setenv("TORCH_HOME", str(tmp_path / "torch"))
+    packages = {}
+    monkeypatch.setattr(vad.importlib.util, "find_spec", lambda name: packages.get(name))
+    return SimpleNamespace(tmp_path=tmp_path, packages=packages)
+
+
+def touch(path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"")
+    return str(path)
+
+
+def test_find_local_model_search_order(search, monkeypatch):
+    assert SileroVAD.find_local_model() is None
+
+    hub = touch(search.tmp_path / "torch" / "hub" / "snakers4_silero-vad_master" / "src" / "silero_vad" / "data"
+                / "silero_vad.onnx")
+    assert SileroVAD.find_local_model() == hub
+
+    package = search.tmp_path / "site-packages" / "silero_vad"
+    search.packages["silero_vad"] = SimpleNamespace(submodule_search_locations=[str(package)])
+    assert SileroVAD.find_local_model() == hub  # Package without the data file
+    pip = touch(package / "data" / "silero_vad.onnx")
+    assert SileroVAD.find_local_model() == pip
+
+    explicit = touch(search.tmp_path / "custom.jit")
+    monkeypatch.setenv("VIBEVOICE_VAD_MODEL", explicit)
+    assert SileroVAD.find_local_model() == explicit
+
+
+def test_find_local_model_rejects_missing_env_path(search, monkeypatch):
+    monkeypatch.setenv("VIBEVOICE_VAD_MODEL", str(search.tmp_path / "missing.onnx"))
+    with pytest.raises(FileNotFoundError):
+        SileroVAD.find_local_model()